@@ -2,6 +2,7 @@ import os
 import google.generativeai as genai
 from dotenv import load_dotenv
 from pathlib import Path
+from app.api.utils.embeddings import aget_embedding
 
 # Explicitly load .env from app directory if not loaded
 env_path = Path(__file__).resolve().parent.parent / ".env"
@@ -18,22 +19,14 @@ class GeminiClient:
 
     async def embed_content(self, model: str, content: str, task_type: str = "retrieval_query"):
         """
-        Generate embedding for content.
-        Note: The google-generativeai library is currently synchronous for embeddings.
-        We wrap it or just call it directly since it's an HTTP call.
-        For true async, we'd use aiohttp, but strictly wrapping is fine for this scope.
+        Generate embedding for content with the configured EmbeddingProvider
+        (EMBEDDING_PROVIDER; `model` is kept for callers but the provider decides).
+        Goes through the shared async embedding client (bounded pool, batching, retries, cache).
         """
-        try:
-            result = genai.embed_content(
-                model=model,
-                content=content,
-                task_type=task_type,
-                output_dimensionality=768
-            )
-            return result
-        except Exception as e:
-            print(f"Error generating embedding: {e}")
-            raise e
+        embedding = await aget_embedding(content, task_type=task_type)
+        if not embedding:
+            raise RuntimeError("Embedding generation failed")
+        return {"embedding": embedding}
 
 async def get_gemini_client():
     """Dependency for FastAPI"""
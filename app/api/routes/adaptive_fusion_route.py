@@ -8,12 +8,17 @@ from typing import Optional, List, Dict
 from app.search.strategies.adaptive_fusion_strategy import AdaptiveFusionStrategy
 from app.database_async import get_db_pool
 from app.ai.gemini_client import get_gemini_client
+from app.api.utils.responses import SearchRoute
+from app.api.utils.result_cache import cached_strategy
+from app.api.utils.single_flight import single_flight
 
 # Note: Adjusting prefix to match existing patterns if needed, but keeping /search for now
-router = APIRouter(tags=["Search Strategies"])
+router = APIRouter(tags=["Search Strategies"], route_class=SearchRoute)
 
 
 @router.post("/adaptive-fusion")
+@cached_strategy("adaptive-fusion")
+@single_flight("adaptive-fusion")
 async def search_adaptive_fusion(
     query: str = Body(..., description="Search query"),
     filters: Optional[Dict] = Body(None, description="Metadata filters"),
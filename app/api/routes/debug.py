@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 from app.api.utils.database import execute_query
+from app.api.utils.metrics import metrics
 
 router = APIRouter()
 
@@ -28,3 +29,8 @@ def debug_schema():
         }
     except Exception as e:
         return {"error": str(e)}
+
+@router.get("/metrics")
+def debug_metrics():
+    """In-process counters, gauges and latency/payload summaries"""
+    return metrics.snapshot()
@@ -1,15 +1,27 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from app.api.utils.database import execute_query
-from app.api.utils.embeddings import get_embedding
+from app.api.utils import deadline
+from app.api.utils.embeddings import aget_embedding
+from app.api.utils.gemini_scheduler import run_blocking
+from app.api.utils.metrics import metrics
 from app.api.utils.nlp import (
     tokenize_query, 
-    extract_candidate_info, 
     highlight_matches, 
     calculate_keyword_score
 )
+from app.api.utils.profile_index import normalize_term, escape_like, card_metadata, ENTITY_PATTERNS
+from app.api.utils.query_router import route_query, confident, record_agreement
+from app.api.utils.regex_prefilter import build_prefilter_sql
+from app.api.utils.responses import SearchRoute
+from app.api.utils.result_cache import cached_strategy
+from app.api.utils.single_flight import single_flight
+from app.api.utils.vectors import to_vector
+from app.database_async import get_db_pool
+import asyncio
 import psycopg2
+import psycopg2.errors
 from psycopg2.extras import RealDictCursor
 import os
 from dotenv import load_dotenv
@@ -20,10 +32,21 @@ env_path = Path(__file__).resolve().parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# pg_trgm's own default; lower values trade precision for recall on typos
+DEFAULT_SIMILARITY_THRESHOLD = float(os.getenv("FUZZY_SIMILARITY_THRESHOLD", "0.3"))
+
+# Candidates each side of /hybrid retrieves before fusion
+HYBRID_CANDIDATE_DEPTH = int(os.getenv("HYBRID_CANDIDATE_DEPTH", "50"))
+
+# Guards for user-supplied regexes (custom_pattern), which can otherwise pin a backend
+REGEX_STATEMENT_TIMEOUT_MS = int(os.getenv("REGEX_STATEMENT_TIMEOUT_MS", "2000"))
+REGEX_SCAN_BUDGET = int(os.getenv("REGEX_SCAN_BUDGET", "5000"))   # candidate rows the regex may examine
+REGEX_ROW_BUDGET = int(os.getenv("REGEX_ROW_BUDGET", "100"))      # max rows returned
+
 def get_db_connection():
     return psycopg2.connect(DATABASE_URL)
 
-router = APIRouter()
+router = APIRouter(route_class=SearchRoute)
 
 class SearchRequest(BaseModel):
     query: str
@@ -31,6 +54,8 @@ class SearchRequest(BaseModel):
     # Hybrid params
     vector_weight: float = 0.5
     rrf_k: int = 60
+    fusion_method: str = "rrf"  # "rrf" or "weighted"
+    candidate_depth: Optional[int] = Field(None, ge=1, le=1000)  # per-side retrieval depth
     # Filter params
     skills: List[str] = []
     role: Optional[str] = None
@@ -44,8 +69,29 @@ class SearchRequest(BaseModel):
     min_score: float = 0.0
     # Compare params
     strategies: List[str] = []
+    # Fuzzy params (pg_trgm.similarity_threshold, 0-1)
+    similarity_threshold: Optional[float] = Field(None, ge=0.0, le=1.0)
+    # Response params: dotted field projection (e.g. ["id", "score", "metadata.name"]; unknown fields are a 400)
+    # and snippet mode (text trimmed to a window around the match, no highlighted_text)
+    fields: List[str] = []
+    snippet_only: bool = False
+    # Pagination: set page_size to get a next_cursor; send it back to fetch the next page
+    page_size: Optional[int] = Field(None, ge=1, le=100)
+    cursor: Optional[str] = None
+    # Time budget for the whole request (also accepted as the X-Request-Deadline-Ms header);
+    # LLM steps are skipped in favor of their non-LLM result once it runs low
+    deadline_ms: Optional[int] = Field(None, ge=1)
+
+# Request fields each cached strategy reads; its result cache and single-flight keys use only these
+QUERY_FIELDS = ("query", "limit")
+HYBRID_FIELDS = QUERY_FIELDS + ("candidate_depth", "fusion_method", "vector_weight", "rrf_k")
+FILTER_FIELDS = ("role", "skills", "required_skills", "preferred_skills", "min_skill_score", "limit")
+PATTERN_FIELDS = ("custom_pattern", "pattern_type", "limit")
+FUZZY_FIELDS = QUERY_FIELDS + ("similarity_threshold",)
 
 @router.post("/keyword")
+@cached_strategy("keyword", fields=QUERY_FIELDS)
+@single_flight("keyword", fields=QUERY_FIELDS)
 async def search_keyword(request: SearchRequest):
     """
     Strategy 1: Keyword/Lexical Search
@@ -67,7 +113,7 @@ async def search_keyword(request: SearchRequest):
     where_clause = " OR ".join(conditions)
     
     sql = f"""
-        SELECT id, text, metadata
+        SELECT id, text, metadata, profile_card
         FROM student_profiles
         WHERE {where_clause}
         LIMIT %s
@@ -82,12 +128,9 @@ async def search_keyword(request: SearchRequest):
         score = calculate_keyword_score(row['text'], keywords)
         highlighted = highlight_matches(row['text'], keywords)
         
-        # Extract info if metadata is empty or missing keys
-        meta = row['metadata'] or {}
-        if not meta.get('name') or not meta.get('role'):
-            extracted = extract_candidate_info(row['text'])
-            meta.update(extracted)
-            
+        # Fill missing display fields from the persisted profile card
+        meta = card_metadata(row)
+        
         processed_results.append({
             "id": row['id'],
             "text": row['text'],
@@ -104,6 +147,8 @@ async def search_keyword(request: SearchRequest):
     return {"results": processed_results}
 
 @router.post("/vector")
+@cached_strategy("vector", fields=QUERY_FIELDS)
+@single_flight("vector", fields=QUERY_FIELDS)
 async def search_vector(request: SearchRequest):
     """
     Strategy 2: Vector/Semantic Search
@@ -119,34 +164,31 @@ async def search_vector(request: SearchRequest):
         else:
             cleaned_query = request.query
             
-        embedding = get_embedding(cleaned_query)
-        if not embedding:
+        embedding = to_vector(await aget_embedding(cleaned_query))
+        if embedding is None:
             return {"results": []}
         
         # pgvector cosine distance operator is <=>
         # We want similarity, so we can order by distance ASC
         # 1 - distance = similarity (roughly, for normalized vectors)
-        # Changed table to student_profiles and column to embedding
+        # The query vector is bound once ($1, binary float32) and reused in SELECT and ORDER BY
         sql = """
-            SELECT id, text, metadata, 1 - (embedding <=> %s) as score
+            SELECT id, text, metadata, profile_card, 1 - (embedding <=> $1) as score
             FROM student_profiles
-            ORDER BY embedding <=> %s
-            LIMIT %s
+            ORDER BY embedding <=> $1
+            LIMIT $2
         """
         
-        results = execute_query(sql, (str(embedding), str(embedding), request.limit))
+        pool = await get_db_pool()
+        results = [dict(r) for r in await pool.fetch(sql, embedding, request.limit, timeout=deadline.call_timeout())]
         
-        # Extract info for display
+        # Display fields come from the persisted profile card
         processed_results = []
         for row in results:
-            meta = row['metadata'] or {}
-            # student_profiles metadata is already rich, but we ensure fallback
-            if not meta.get('name') or not meta.get('role'):
-                extracted = extract_candidate_info(row['text'])
-                meta.update(extracted)
-                
+            meta = card_metadata(row)
+            
             processed_results.append({
-                "id": row['id'],
+                "id": str(row['id']),
                 "text": row['text'],
                 "metadata": meta,
                 "score": row['score'],
@@ -154,125 +196,134 @@ async def search_vector(request: SearchRequest):
             })
             
         return {"results": processed_results}
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
     except Exception as e:
         print(f"ERROR in search_vector: {e}", flush=True)
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
-# ... (Hybrid search uses search_vector, so it inherits the fix)
-
-# ...
-
-@router.post("/fuzzy")
-async def search_fuzzy(request: SearchRequest):
+@router.post("/hybrid")
+@cached_strategy("hybrid", fields=HYBRID_FIELDS)
+@single_flight("hybrid", fields=HYBRID_FIELDS)
+async def search_hybrid(request: SearchRequest):
     """
-    Strategy 8: Fuzzy Search (Trigram)
-    Use pg_trgm for approximate matching
+    Strategy 3: Hybrid Search (RRF / Weighted)
+    ANN (vector) and full-text retrieval run as CTEs in one SQL statement,
+    each to `candidate_depth`, and are fused in SQL. One round trip returns the fused top-k.
     """
-    # Clean query to get the most significant terms
     keywords = tokenize_query(request.query)
-    if not keywords:
+    cleaned_query = " ".join(keywords) if keywords else request.query
+    ts_query_str = " | ".join(keywords)
+    
+    embedding = to_vector(await aget_embedding(cleaned_query))
+    if embedding is None and not ts_query_str:
         return {"results": []}
         
-    # If query is long (natural language), use the most significant keywords joined
-    if len(request.query.split()) > 3:
-        search_term = " ".join(keywords)
+    depth = max(request.candidate_depth or HYBRID_CANDIDATE_DEPTH, request.limit)
+    params = []
+    
+    def bind(value):
+        params.append(value)
+        return f"${len(params)}"
+    
+    depth_param = bind(depth)
+    
+    if embedding is not None:
+        q = bind(embedding)
+        vector_cte = f"""
+            SELECT id, vector_score, row_number() OVER (ORDER BY vector_score DESC) AS vector_rank
+            FROM (
+                SELECT id, 1 - (embedding <=> {q}) AS vector_score
+                FROM student_profiles
+                ORDER BY embedding <=> {q}
+                LIMIT {depth_param}
+            ) ann
+        """
     else:
-        search_term = request.query
-
-    # similarity() returns a value between 0 and 1
-    # We filter by a threshold (default 0.1 to get some results, can be tuned)
-    # OPTIMIZATION: Instead of searching the full text (which dilutes the score),
-    # we search against a concatenated string of Role + Skills + Name from metadata if available.
-    # This makes the document shorter and denser, improving fuzzy match scores for skills.
-    sql = """
-        SELECT id, text, metadata, 
-               similarity(
-                   COALESCE(metadata->>'role', '') || ' ' || 
-                   COALESCE(metadata->>'skills_text', '') || ' ' || 
-                   COALESCE(metadata->>'name', '') || ' ' || 
-                   text, 
-               %s) as score
-        FROM student_profiles
-        WHERE 
-            COALESCE(metadata->>'role', '') || ' ' || 
-            COALESCE(metadata->>'skills_text', '') || ' ' || 
-            COALESCE(metadata->>'name', '') || ' ' || 
-            text 
-            %% %s
-        ORDER BY score DESC
-        LIMIT %s
+        vector_cte = "SELECT id, NULL::float8 AS vector_score, NULL::bigint AS vector_rank FROM student_profiles LIMIT 0"
+        
+    if ts_query_str:
+        tsq = bind(ts_query_str)
+        text_cte = f"""
+            SELECT id, text_score, row_number() OVER (ORDER BY text_score DESC) AS text_rank
+            FROM (
+                SELECT id, ts_rank(to_tsvector('english', text), to_tsquery('english', {tsq})) AS text_score
+                FROM student_profiles
+                WHERE to_tsvector('english', text) @@ to_tsquery('english', {tsq})
+                ORDER BY text_score DESC
+                LIMIT {depth_param}
+            ) fts
+        """
+    else:
+        text_cte = "SELECT id, NULL::real AS text_score, NULL::bigint AS text_rank FROM student_profiles LIMIT 0"
+        
+    if request.fusion_method == "weighted":
+        # Cosine similarity is already 0-1; ts_rank is normalized by the best text hit
+        w = bind(float(request.vector_weight))
+        score_sql = f"""
+            {w}::float8 * COALESCE(v.vector_score, 0)
+            + (1 - {w}::float8) * COALESCE(t.text_score / NULLIF(max(t.text_score) OVER (), 0), 0)
+        """
+    else:
+        k = bind(int(request.rrf_k))
+        score_sql = f"""
+            COALESCE(1.0::float8 / ({k}::int + v.vector_rank), 0)
+            + COALESCE(1.0::float8 / ({k}::int + t.text_rank), 0)
+        """
+    limit_param = bind(request.limit)
+    
+    sql = f"""
+        WITH vector_hits AS ({vector_cte}),
+        text_hits AS ({text_cte}),
+        fused AS (
+            SELECT COALESCE(v.id, t.id) AS id,
+                   v.vector_rank, t.text_rank,
+                   {score_sql} AS score
+            FROM vector_hits v
+            FULL OUTER JOIN text_hits t ON v.id = t.id
+        )
+        SELECT p.id, p.text, p.metadata, p.profile_card, f.score, f.vector_rank, f.text_rank
+        FROM fused f
+        JOIN student_profiles p ON p.id = f.id
+        ORDER BY f.score DESC
+        LIMIT {limit_param}
     """
     
-    results = execute_query(sql, (search_term, search_term, request.limit))
+    pool = await get_db_pool()
+    try:
+        results = await pool.fetch(sql, *params, timeout=deadline.call_timeout())
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
     
-    processed_results = []
+    output = []
     for row in results:
-        meta = row['metadata'] or {}
-        if not meta.get('name') or not meta.get('role'):
-            extracted = extract_candidate_info(row['text'])
-            meta.update(extracted)
+        row = dict(row)
+        reasons = []
+        if row['vector_rank'] is not None:
+            reasons.append(f"Vector Rank #{row['vector_rank']}")
+        if row['text_rank'] is not None:
+            reasons.append(f"Full-text Rank #{row['text_rank']}")
             
-        processed_results.append({
-            "id": row['id'],
+        output.append({
+            "id": str(row['id']),
             "text": row['text'],
-            "metadata": meta,
+            "metadata": card_metadata(row),
             "score": row['score'],
-            "match_reason": f"Fuzzy similarity ({row['score']:.2f}) to '{search_term}'"
+            "matched_keywords": keywords,
+            "match_reason": f"Hybrid Match: {', '.join(reasons)}"
         })
-    return {"results": processed_results}
-
-@router.post("/hybrid")
-async def search_hybrid(request: SearchRequest):
-    """
-    Strategy 3: Hybrid Search (RRF)
-    Combine vector + keyword using Reciprocal Rank Fusion
-    """
-    # 1. Get Vector Results
-    vector_results = await search_vector(request)
-    vector_results = vector_results["results"]
-    
-    # 2. Get Keyword Results
-    keyword_results = await search_keyword(request)
-    keyword_results = keyword_results["results"]
-    
-    # 3. RRF Fusion
-    rrf_scores = {}
-    
-    # Process vector results
-    for rank, res in enumerate(vector_results):
-        doc_id = res['id']
-        if doc_id not in rrf_scores:
-            rrf_scores[doc_id] = {"data": res, "score": 0, "reasons": []}
-        rrf_scores[doc_id]["score"] += 1 / (request.rrf_k + rank + 1)
-        rrf_scores[doc_id]["reasons"].append(f"Vector Rank #{rank+1}")
-        
-    # Process keyword results
-    for rank, res in enumerate(keyword_results):
-        doc_id = res['id']
-        if doc_id not in rrf_scores:
-            rrf_scores[doc_id] = {"data": res, "score": 0, "reasons": []}
-        rrf_scores[doc_id]["score"] += 1 / (request.rrf_k + rank + 1)
-        rrf_scores[doc_id]["reasons"].append(f"Keyword Rank #{rank+1}")
-        
-    # Sort by RRF score
-    final_results = sorted(rrf_scores.values(), key=lambda x: x['score'], reverse=True)
-    
-    # Format output
-    output = []
-    for item in final_results[:request.limit]:
-        data = item["data"]
-        data["match_reason"] = f"Hybrid Match: {', '.join(item['reasons'])}"
-        output.append(data)
 
     return {"results": output}
 
 @router.post("/filter")
+@cached_strategy("filter", fields=FILTER_FIELDS)
+@single_flight("filter", fields=FILTER_FIELDS)
 async def search_filter(request: SearchRequest):
     """
-    Strategy 4: Metadata Filtering (Simulated via Text Regex)
-    Filter by extracted metadata: skills, role, location, experience
-    Since metadata column might be empty, we use regex on text column.
+    Strategy 4: Metadata Filtering (Indexed Columns)
+    Filter by extracted metadata: role, skills and skill scores.
+    role_norm (trigram GIN) and skills (GIN) are populated at ingest by profile_index.
     """
     # Build dynamic SQL query based on filters
     conditions = ["1=1"] # Default true condition
@@ -280,84 +331,153 @@ async def search_filter(request: SearchRequest):
     reasons = []
     
     if request.role:
-        # Regex to match "Role: ... request.role ..."
-        # Case insensitive match
-        conditions.append("text ~* %s")
-        params.append(f"Role:.*{request.role}")
+        # Substring match ("developer" finds "senior backend developer"), served by the trigram index
+        role = normalize_term(request.role)
+        conditions.append("role_norm LIKE %s")
+        params.append("%" + escape_like(role) + "%")
         reasons.append(f"Role matches '{request.role}'")
         
-    if request.skills:
-        for skill in request.skills:
-            # Regex to match "Skills: ... skill ..."
-            conditions.append("text ~* %s")
-            params.append(f"Skills:.*{skill}")
-            reasons.append(f"Skill matches '{skill}'")
+    # `skills` and `required_skills` are both hard requirements
+    required = []
+    for skill in list(request.skills or []) + list(request.required_skills or []):
+        norm = normalize_term(skill)
+        if norm and norm not in required:
+            required.append(norm)
+    preferred = [normalize_term(s) for s in (request.preferred_skills or []) if normalize_term(s)]
+    
+    if required:
+        # Array containment is answered by the GIN index on skills
+        conditions.append("skills @> %s::text[]")
+        params.append(required)
+        reasons.append(f"Has skills: {', '.join(required)}")
+        
+        if request.min_skill_score > 0:
+            # Rechecked only on rows the GIN index already matched
+            for skill in required:
+                conditions.append("(skill_scores->>%s)::float >= %s")
+                params.extend([skill, request.min_skill_score])
+            reasons.append(f"Skill score >= {request.min_skill_score}")
+    elif preferred:
+        # Only preferred skills given: require at least one (GIN overlap)
+        conditions.append("skills && %s::text[]")
+        params.append(preferred)
+        
+    # Rank by the share of preferred skills present, otherwise a flat score
+    if preferred:
+        score_sql = """
+            cardinality(ARRAY(
+                SELECT unnest(skills) INTERSECT SELECT unnest(%s::text[])
+            ))::float / %s
+        """
+        score_params = [preferred, len(preferred)]
+        reasons.append(f"Preferred skills: {', '.join(preferred)}")
+    else:
+        score_sql = "1.0"
+        score_params = []
             
     where_clause = " AND ".join(conditions)
     
     sql = f"""
-        SELECT id, text, metadata
+        SELECT id, text, metadata, profile_card, {score_sql} as score
         FROM student_profiles
         WHERE {where_clause}
+        ORDER BY score DESC
         LIMIT %s
     """
+    params = score_params + params
     params.append(request.limit)
     
     results = execute_query(sql, tuple(params))
     
-    # Extract info for display
+    # Display fields come from the persisted profile card
     processed_results = []
     for row in results:
-        meta = row['metadata'] or {}
-        if not meta.get('name') or not meta.get('role'):
-            extracted = extract_candidate_info(row['text'])
-            meta.update(extracted)
-            
+        meta = card_metadata(row)
+        
         processed_results.append({
             "id": row['id'],
             "text": row['text'],
             "metadata": meta,
-            "score": 1.0, # Default score for filter
+            "score": float(row['score']),
             "match_reason": f"Filters matched: {', '.join(reasons)}"
         })
         
     return {"results": processed_results}
 
 @router.post("/pattern")
+@cached_strategy("pattern", fields=PATTERN_FIELDS)
+@single_flight("pattern", fields=PATTERN_FIELDS)
 async def search_pattern(request: SearchRequest):
     """
     Strategy 5: Pattern Matching (Regex)
-    Use regex to find specific patterns
+    Predefined patterns (email, phone, ...) are index lookups on profile_entities.
+    Custom regexes are trigram-prefiltered and run under a statement timeout and row budget.
     """
     pattern = request.custom_pattern
     if not pattern and request.pattern_type:
-        # Predefined patterns
-        if request.pattern_type == "email":
-            pattern = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
-        elif request.pattern_type == "phone":
-            pattern = r"\b\d{3}[-.]?\d{3}[-.]?\d{4}\b"
+        if request.pattern_type not in ENTITY_PATTERNS:
+            return {"results": []}
+        return search_entities(request)
             
     if not pattern:
         return {"results": []}
         
-    # Use POSIX regex operator ~ in PostgreSQL
-    sql = """
-        SELECT id, text, metadata
-        FROM student_profiles
+    # Narrow candidates with literals the regex must contain (trigram index),
+    # then run the POSIX regex (~) only on those, within a bounded scan.
+    prefilter_sql, prefilter_params, literals = build_prefilter_sql(pattern, escape=escape_like)
+    candidate_where = prefilter_sql or "TRUE"
+    row_budget = min(request.limit, REGEX_ROW_BUDGET)
+    
+    sql = f"""
+        SELECT id, text, metadata, profile_card
+        FROM (
+            SELECT id, text, metadata, profile_card
+            FROM student_profiles
+            WHERE {candidate_where}
+            LIMIT %s
+        ) candidates
         WHERE text ~ %s
         LIMIT %s
     """
+    params = tuple(prefilter_params) + (REGEX_SCAN_BUDGET, pattern, row_budget)
     
-    results = execute_query(sql, (pattern, request.limit))
-    
-    # Extract info for display
+    timed_out = False
+    try:
+        results = execute_query(
+            sql,
+            params,
+            settings={"statement_timeout": REGEX_STATEMENT_TIMEOUT_MS},
+            raise_errors=True
+        )
+    except (psycopg2.errors.QueryCanceled, deadline.DeadlineExceeded):
+        results = []
+        timed_out = True
+    except psycopg2.errors.InvalidRegularExpression as e:
+        raise HTTPException(status_code=400, detail=f"Invalid regular expression: {e}")
+    
+    # A short result set may just mean the scan budget cut the candidates off
+    scan_budget_exhausted = False
+    if not timed_out and len(results) < row_budget:
+        # Same guards as the regex query: a slow prefilter must not outlive the budget
+        try:
+            scanned = execute_query(f"""
+                SELECT COUNT(*) AS scanned
+                FROM (SELECT 1 FROM student_profiles WHERE {candidate_where} LIMIT %s) candidates
+            """, tuple(prefilter_params) + (REGEX_SCAN_BUDGET,),
+                settings={"statement_timeout": REGEX_STATEMENT_TIMEOUT_MS},
+                raise_errors=True
+            )
+            scan_budget_exhausted = bool(scanned) and scanned[0]['scanned'] >= REGEX_SCAN_BUDGET
+        except (psycopg2.errors.QueryCanceled, deadline.DeadlineExceeded):
+            timed_out = True
+    if scan_budget_exhausted:
+        deadline.mark_degraded("regex_scan_budget")
+    
+    # Display fields come from the persisted profile card
     processed_results = []
     for row in results:
-        meta = row['metadata'] or {}
-        if not meta.get('name') or not meta.get('role'):
-            extracted = extract_candidate_info(row['text'])
-            meta.update(extracted)
-            
+        meta = card_metadata(row)
+        
         processed_results.append({
             "id": row['id'],
             "text": row['text'],
@@ -366,24 +486,73 @@ async def search_pattern(request: SearchRequest):
             "match_reason": f"Matches pattern: {request.pattern_type or 'Custom Regex'}"
         })
         
+    return {
+        "results": processed_results,
+        "prefilter": {
+            "usable": prefilter_sql is not None,
+            "literals": literals,
+            "scan_budget": REGEX_SCAN_BUDGET,
+            "row_budget": row_budget,
+            "statement_timeout_ms": REGEX_STATEMENT_TIMEOUT_MS,
+            "timed_out": timed_out,
+            "scan_budget_exhausted": scan_budget_exhausted
+        }
+    }
+
+def search_entities(request: SearchRequest):
+    """Predefined pattern search served from the profile_entities index"""
+    sql = """
+        WITH hits AS (
+            SELECT DISTINCT profile_id
+            FROM profile_entities
+            WHERE entity_type = %s
+            ORDER BY profile_id
+            LIMIT %s
+        )
+        SELECT p.id, p.text, p.metadata, p.profile_card,
+               ARRAY(
+                   SELECT e.value FROM profile_entities e
+                   WHERE e.profile_id = p.id AND e.entity_type = %s
+                   ORDER BY e.value
+               ) as matches
+        FROM hits
+        JOIN student_profiles p ON p.id = hits.profile_id
+    """
+    
+    results = execute_query(sql, (request.pattern_type, request.limit, request.pattern_type))
+    
+    processed_results = []
+    for row in results:
+        meta = card_metadata(row)
+        
+        processed_results.append({
+            "id": row['id'],
+            "text": row['text'],
+            "metadata": meta,
+            "score": 1.0,
+            "matched_entities": row['matches'],
+            "match_reason": f"Matches pattern: {request.pattern_type} ({', '.join(row['matches'][:3])})"
+        })
+        
     return {"results": processed_results}
 
 @router.post("/compare")
+@single_flight("compare")
 async def search_compare(request: SearchRequest):
     """
     Comparison Endpoint
     Run multiple strategies and return combined results.
     Includes Query Optimization step.
     """
-    from app.api.utils.llm import analyze_query_intent
+    from app.api.utils.llm import plan_query
     
     try:
         results = {}
         
         # --- 1. Query Optimization ---
-        # We optimize the query once and use it for relevant strategies
+        # One planner call per query: the agentic strategies below reuse this plan from the LLM cache
         print(f"DEBUG: Optimizing query: '{request.query}'")
-        analysis = analyze_query_intent(request.query)
+        analysis = await run_blocking(plan_query, request.query)
         optimized_query = analysis.get("rewritten_query", request.query)
         filters = analysis.get("filters", {})
         optimization_insight = f"Optimized: '{request.query}' -> '{optimized_query}'"
@@ -448,6 +617,8 @@ async def search_compare(request: SearchRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/bm25")
+@cached_strategy("bm25", fields=QUERY_FIELDS)
+@single_flight("bm25", fields=QUERY_FIELDS)
 async def search_bm25(request: SearchRequest):
     """
     Strategy 11: BM25 Probabilistic Search
@@ -476,16 +647,18 @@ async def optimize_query(request: SearchRequest):
     Query Optimization Endpoint
     Analyzes the query and returns the optimized version + filters.
     """
-    from app.api.utils.llm import analyze_query_intent
+    from app.api.utils.llm import plan_query
     
     try:
-        analysis = analyze_query_intent(request.query)
+        analysis = await run_blocking(plan_query, request.query)
         return {"optimization": analysis}
     except Exception as e:
         print(f"Error in optimize_query: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/fts")
+@cached_strategy("fts", fields=QUERY_FIELDS)
+@single_flight("fts", fields=QUERY_FIELDS)
 async def search_fts(request: SearchRequest):
     """
     Strategy 7: Full Text Search (FTS)
@@ -503,7 +676,7 @@ async def search_fts(request: SearchRequest):
     # plainto_tsquery handles simple text, websearch_to_tsquery handles operators like "quoted text" or -exclude
     # We use to_tsquery with our constructed OR string for maximum flexibility on natural language
     sql = """
-        SELECT id, text, metadata,
+        SELECT id, text, metadata, profile_card,
                ts_rank(to_tsvector('english', text), to_tsquery('english', %s)) as score
         FROM student_profiles
         WHERE to_tsvector('english', text) @@ to_tsquery('english', %s)
@@ -516,11 +689,8 @@ async def search_fts(request: SearchRequest):
     # Add highlighting manually or use ts_headline (optional, keeping it simple for now)
     processed_results = []
     for row in results:
-        meta = row['metadata'] or {}
-        if not meta.get('name') or not meta.get('role'):
-            extracted = extract_candidate_info(row['text'])
-            meta.update(extracted)
-            
+        meta = card_metadata(row)
+        
         processed_results.append({
             "id": row['id'],
             "text": row['text'],
@@ -531,10 +701,12 @@ async def search_fts(request: SearchRequest):
     return {"results": processed_results}
 
 @router.post("/fuzzy")
+@cached_strategy("fuzzy", fields=FUZZY_FIELDS)
+@single_flight("fuzzy", fields=FUZZY_FIELDS)
 async def search_fuzzy(request: SearchRequest):
     """
     Strategy 8: Fuzzy Search (Trigram)
-    Use pg_trgm for approximate matching
+    Use pg_trgm for approximate matching against the indexed search_blob column
     """
     # Clean query to get the most significant terms
     # Fuzzy matching a whole sentence against a whole document usually yields low scores.
@@ -551,25 +723,32 @@ async def search_fuzzy(request: SearchRequest):
     else:
         search_term = request.query
 
-    # similarity() returns a value between 0 and 1
-    # We filter by a threshold (default 0.1 to get some results, can be tuned)
+    threshold = request.similarity_threshold
+    if threshold is None:
+        threshold = DEFAULT_SIMILARITY_THRESHOLD
+
+    # search_blob is a stored generated column (Role + Skills + Name + Text) with a
+    # gin_trgm_ops index (see update_profile_schema.py). The % operator is answered by
+    # that index, and <-> (1 - similarity) gives KNN ordering over the matches.
+    # The % cutoff is pg_trgm.similarity_threshold, set per request for this transaction.
     sql = """
-        SELECT id, text, metadata, similarity(text, %s) as score
+        SELECT id, text, metadata, profile_card, similarity(search_blob, %s) as score
         FROM student_profiles
-        WHERE text %% %s
-        ORDER BY score DESC
+        WHERE search_blob %% %s
+        ORDER BY search_blob <-> %s
         LIMIT %s
     """
     
-    results = execute_query(sql, (search_term, search_term, request.limit))
+    results = execute_query(
+        sql,
+        (search_term, search_term, search_term, request.limit),
+        settings={"pg_trgm.similarity_threshold": threshold}
+    )
     
     processed_results = []
     for row in results:
-        meta = row['metadata'] or {}
-        if not meta.get('name') or not meta.get('role'):
-            extracted = extract_candidate_info(row['text'])
-            meta.update(extracted)
-            
+        meta = card_metadata(row)
+        
         processed_results.append({
             "id": row['id'],
             "text": row['text'],
@@ -580,6 +759,8 @@ async def search_fuzzy(request: SearchRequest):
     return {"results": processed_results}
 
 @router.post("/agentic")
+@cached_strategy("agentic", fields=HYBRID_FIELDS)
+@single_flight("agentic", fields=HYBRID_FIELDS)
 async def search_agentic(request: SearchRequest):
     """
     Strategy 9: Agentic Search (LLM Re-ranking)
@@ -603,30 +784,48 @@ async def search_agentic(request: SearchRequest):
         return {"results": []}
         
     # 2. LLM Re-ranking
-    ranked_results = analyze_and_rerank(request.query, candidates, request.limit)
+    ranked_results = await run_blocking(analyze_and_rerank, request.query, candidates, request.limit)
     
     return {"results": ranked_results}
 
 @router.post("/agentic_tool")
+@cached_strategy("agentic_tool")
+@single_flight("agentic_tool")
 async def search_agentic_tool(request: SearchRequest):
     """
     Strategy 10: Agentic Search (Tool Use) with Semantic Caching
-    1. Check Cache (Similarity > 0.95)
+    Exact repeats are served by @cached_strategy; the tool's parameters come from the
+    plan but it otherwise runs with this request, so every request field is part of the key.
+    1. Check the semantic cache for a similar query (Similarity > 0.95)
     2. If miss, LLM decides tool, executes, and re-ranks.
     3. Save to Cache.
     """
-    from app.api.utils.llm import decide_search_tool, analyze_and_rerank
-    from app.api.utils.caching import check_cache, save_to_cache
+    from app.api.utils.llm import plan_query, analyze_and_rerank, QUERY_MODEL, QUERY_PLAN_PROMPT_VERSION
+    from app.api.utils.llm_cache import llm_cache
+    from app.api.utils.caching import check_cache, save_to_cache, cache_namespace
     
     # --- 1. Cache Lookup ---
-    cached = check_cache(request.query)
+    namespace = await cache_namespace("agentic_tool", request.limit)
+    cached = await check_cache(request.query, namespace)
     if cached:
         return {"results": cached["results"]}
 
     # --- 2. Agentic Search (Existing Logic) ---
     
-    # 2.1 Decide Tool
-    decision = decide_search_tool(request.query)
+    # 2.1 Decide Tool: the local router when it's confident, otherwise the shared LLM query plan
+    local = route_query(request.query)
+    if confident(local):
+        decision = local
+        metrics.incr("query_router.decisions.local")
+        # Free agreement check when the LLM already planned this query (e.g. via /compare)
+        planned = llm_cache.peek("query_plan", request.query, QUERY_PLAN_PROMPT_VERSION, QUERY_MODEL)
+        if planned is not None:
+            record_agreement(local, planned["tool"], "confident")
+    else:
+        decision = await run_blocking(plan_query, request.query)
+        metrics.incr("query_router.decisions.llm")
+        if not decision.get("fallback"):
+            record_agreement(local, decision["tool"], "fallback")
     tool = decision.get("tool", "vector")
     params = decision.get("parameters", {})
     reasoning = decision.get("reasoning", "Defaulting to vector search.")
@@ -669,7 +868,7 @@ async def search_agentic_tool(request: SearchRequest):
         return {"results": []}
 
     # 2.3 Re-rank results
-    ranked_results = analyze_and_rerank(request.query, candidates[:20], request.limit)
+    ranked_results = await run_blocking(analyze_and_rerank, request.query, candidates[:20], request.limit)
     
     # Add the tool decision insight
     for res in ranked_results:
@@ -677,26 +876,31 @@ async def search_agentic_tool(request: SearchRequest):
         res["ai_reasoning"] = f"[{tool_insight}] {current_reason}"
 
     # --- 3. Save to Cache ---
-    save_to_cache(request.query, ranked_results, tool, tool_insight)
+    # Results degraded by the request deadline aren't worth serving to later queries
+    if not deadline.degraded_steps():
+        save_to_cache(request.query, ranked_results, tool, tool_insight, namespace)
         
     return {"results": ranked_results}
 
 @router.post("/agentic_analysis")
+@cached_strategy("agentic_analysis", fields=QUERY_FIELDS)
+@single_flight("agentic_analysis", fields=QUERY_FIELDS)
 async def search_agentic_analysis(request: SearchRequest):
     """
     Strategy 11: Agentic Search (Query Analysis)
     LLM analyzes query to extract filters and rewrite, then searches (Hybrid) and re-ranks.
     """
-    from app.api.utils.llm import analyze_query_intent, analyze_and_rerank
-    from app.api.utils.caching import check_cache, save_to_cache
+    from app.api.utils.llm import plan_query, analyze_and_rerank
+    from app.api.utils.caching import check_cache, save_to_cache, cache_namespace
     
-    # --- 1. Cache Lookup ---
-    cached = check_cache(request.query)
+    # --- 1. Cache Lookup (similar queries; exact repeats never get here) ---
+    namespace = await cache_namespace("agentic_analysis", request.limit)
+    cached = await check_cache(request.query, namespace)
     if cached:
         return {"results": cached["results"]}
     
-    # --- 2. Analyze Query ---
-    analysis = analyze_query_intent(request.query)
+    # --- 2. Analyze Query (from the shared query plan) ---
+    analysis = await run_blocking(plan_query, request.query)
     rewritten_query = analysis.get("rewritten_query", request.query)
     filters = analysis.get("filters", {})
     reasoning = analysis.get("reasoning", "")
@@ -713,7 +917,7 @@ async def search_agentic_analysis(request: SearchRequest):
         return {"results": []}
         
     # 4. Re-rank
-    ranked_results = analyze_and_rerank(request.query, candidates[:20], request.limit)
+    ranked_results = await run_blocking(analyze_and_rerank, request.query, candidates[:20], request.limit)
     
     analysis_insight = f"Query Analysis: Rewrote '{request.query}' to '{rewritten_query}'. Reason: {reasoning}"
     
@@ -722,11 +926,14 @@ async def search_agentic_analysis(request: SearchRequest):
         res["ai_reasoning"] = f"[{analysis_insight}] {current_reason}"
         
     # --- 5. Save to Cache ---
-    save_to_cache(request.query, ranked_results, "agentic_analysis", analysis_insight)
+    if not deadline.degraded_steps():
+        save_to_cache(request.query, ranked_results, "agentic_analysis", analysis_insight, namespace)
         
     return {"results": ranked_results}
 
 @router.post("/stm")
+@cached_strategy("stm", fields=QUERY_FIELDS)
+@single_flight("stm", fields=QUERY_FIELDS)
 async def search_stm(request: SearchRequest):
     """
     Strategy 12: STM (Short Term Memory) Search
@@ -736,32 +943,28 @@ async def search_stm(request: SearchRequest):
     # In a real scenario, this would interact with a specific STM module
     
     # For now, we'll do a vector search and add some "STM" flavor
-    from app.api.utils.embeddings import get_embedding
-    
     try:
         # 1. Get embedding for the query
-        embedding = get_embedding(request.query)
-        if not embedding:
+        embedding = to_vector(await aget_embedding(request.query))
+        if embedding is None:
             return {"results": []}
             
         # 2. Search (using vector search logic for now)
         sql = """
-            SELECT id, text, metadata, 1 - (embedding <=> %s) as score
+            SELECT id, text, metadata, profile_card, 1 - (embedding <=> $1) as score
             FROM student_profiles
-            ORDER BY embedding <=> %s
-            LIMIT %s
+            ORDER BY embedding <=> $1
+            LIMIT $2
         """
-        results = execute_query(sql, (str(embedding), str(embedding), request.limit))
+        pool = await get_db_pool()
+        results = [dict(r) for r in await pool.fetch(sql, embedding, request.limit, timeout=deadline.call_timeout())]
         
         processed_results = []
         for row in results:
-            meta = row['metadata'] or {}
-            if not meta.get('name') or not meta.get('role'):
-                extracted = extract_candidate_info(row['text'])
-                meta.update(extracted)
-                
+            meta = card_metadata(row)
+            
             processed_results.append({
-                "id": row['id'],
+                "id": str(row['id']),
                 "text": row['text'],
                 "metadata": meta,
                 "score": row['score'],
@@ -770,6 +973,8 @@ async def search_stm(request: SearchRequest):
             
         return {"results": processed_results}
 
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
     except Exception as e:
         print(f"Error in search_stm: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -6,7 +6,10 @@ from psycopg2.extras import RealDictCursor
 import os
 import json
 from app.api.utils.stm_utils import generate_stm_chunks
-from app.api.routes.search import get_embedding  # Reuse existing embedding function
+from app.api.utils.embeddings import aget_embedding
+from app.api.utils.vectors import pg_vector
+from app.api.utils.generation import bump_generation
+from app.api.utils.gemini_scheduler import INGESTION, gemini_priority, run_blocking
 
 router = APIRouter()
 
@@ -23,6 +26,11 @@ def get_db_connection():
 
 @router.post("/evaluate/{student_id}")
 async def evaluate_student(student_id: str, request: STMEvaluationRequest):
+    # Ingestion shares the Gemini quota with search: queue its calls behind interactive ones
+    with gemini_priority(INGESTION):
+        return await _evaluate_student(student_id, request)
+
+async def _evaluate_student(student_id: str, request: STMEvaluationRequest):
     print(f"DEBUG: Received student_id: '{student_id}'")
     print(f"DEBUG: DATABASE_URL: {DATABASE_URL}")
     conn = get_db_connection()
@@ -47,7 +55,7 @@ async def evaluate_student(student_id: str, request: STMEvaluationRequest):
             pass
 
         # 2. AI Processing (Gemini)
-        chunks = generate_stm_chunks(student_data)
+        chunks = await run_blocking(generate_stm_chunks, student_data)
 
         # 3. Vectorization & Storage
         # Delete old chunks for this user
@@ -61,19 +69,21 @@ async def evaluate_student(student_id: str, request: STMEvaluationRequest):
             # Handle list content (projects, awards)
             if isinstance(content, list):
                 for item in content:
-                    embedding = get_embedding(item)
+                    embedding = pg_vector(await aget_embedding(item))
                     cur.execute("""
                         INSERT INTO user_profile_chunks (user_id, chunk_type, content, embedding)
                         VALUES (%s, %s, %s, %s)
-                    """, (student_id, chunk_type, item, str(embedding)))
+                    """, (student_id, chunk_type, item, embedding))
             else:
                 # Handle string content (personal, skills)
-                embedding = get_embedding(content)
+                embedding = pg_vector(await aget_embedding(content))
                 cur.execute("""
                     INSERT INTO user_profile_chunks (user_id, chunk_type, content, embedding)
                     VALUES (%s, %s, %s, %s)
-                """, (student_id, chunk_type, content, str(embedding)))
+                """, (student_id, chunk_type, content, embedding))
 
+        # New chunks change adaptive-fusion results
+        bump_generation(cur)
         conn.commit()
         return {"status": "success", "message": "STM evaluation completed", "chunks": chunks}
 
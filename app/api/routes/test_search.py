@@ -0,0 +1,201 @@
+import re
+import json
+import asyncio
+import inspect
+
+import pytest
+
+from app.api.routes import search
+from app.api.utils import (
+    caching, deadline, llm, llm_cache as llm_cache_module,
+    result_cache as result_cache_module, single_flight as single_flight_module
+)
+from app.api.utils.llm_cache import LLMResultCache
+from app.api.utils.result_cache import ResultCache
+
+PLAN = {
+    "rewritten_query": "python developer",
+    "filters": {},
+    "tool": "vector",
+    "parameters": {"query": "python developer"},
+    "reasoning": "semantic query",
+}
+
+
+async def generation_zero():
+    return 0
+
+
+class Response:
+    def __init__(self, payload):
+        self.text = json.dumps(payload)
+
+
+class FakeGemini:
+    """Answers planner and rerank prompts; records which kind each call was"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, model, prompt):
+        if "query planner" in prompt:
+            self.calls.append("plan")
+            return Response(PLAN)
+        self.calls.append("rerank")
+        return Response({"ranked_candidates": [{"original_index": 0, "reasoning": "match"}]})
+
+
+class DiscardWrites:
+    def put(self, key, value):
+        pass
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    monkeypatch.setattr(single_flight_module, "aget_generation", generation_zero)
+    monkeypatch.setattr(result_cache_module, "aget_generation", generation_zero)
+    monkeypatch.setattr(result_cache_module, "result_cache", ResultCache())
+
+    fake = FakeGemini()
+    monkeypatch.setattr(llm.genai, "GenerativeModel", lambda name: object())
+    monkeypatch.setattr(llm, "generate_content", fake)
+    plans = LLMResultCache()
+    monkeypatch.setattr(plans, "_from_db", lambda key: None)
+    monkeypatch.setattr(llm, "llm_cache", plans)
+    monkeypatch.setattr(llm_cache_module, "llm_cache", plans)
+    monkeypatch.setattr(llm_cache_module, "llm_cache_writes", DiscardWrites())
+    return fake
+
+
+@pytest.fixture
+def offline_routes(monkeypatch):
+    async def search_vector(request):
+        return {"results": [{"id": "1", "text": "python developer", "metadata": {}, "score": 0.9}]}
+
+    async def no_cache_hit(query, namespace="", threshold=0.95):
+        return None
+
+    async def namespace(strategy, limit):
+        return f"{strategy}:{limit}"
+
+    monkeypatch.setattr(search, "search_vector", search_vector)
+    # Force the LLM path for /agentic_tool
+    monkeypatch.setattr(search, "confident", lambda decision: False)
+    monkeypatch.setattr(caching, "check_cache", no_cache_hit)
+    monkeypatch.setattr(caching, "cache_namespace", namespace)
+    monkeypatch.setattr(caching, "save_to_cache", lambda *args, **kwargs: None)
+
+
+def in_request(coro_fn):
+    async def main():
+        tokens = deadline.begin_request()
+        try:
+            return await coro_fn()
+        finally:
+            deadline.end_request(tokens)
+    return asyncio.run(main())
+
+
+def test_compare_plans_each_query_once(gemini, offline_routes):
+    request = search.SearchRequest(query="python developer", strategies=["vector", "agentic_tool", "agentic_analysis"])
+    payload = in_request(lambda: search.search_compare(request))
+    assert set(payload["results"]) == {"vector", "agentic_tool", "agentic_analysis"}
+    # One plan shared by /compare and both agentic strategies; each agentic strategy re-ranks
+    assert gemini.calls.count("plan") == 1
+    assert gemini.calls.count("rerank") == 2
+
+
+class RecordingPool:
+    """asyncpg pool stand-in: records the statement and returns rows as Postgres would order them"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.sql = None
+        self.params = None
+
+    async def fetch(self, sql, *params, timeout=None):
+        self.sql, self.params = sql, list(params)
+        return self.rows
+
+
+def fused_row(id, score, vector_rank, text_rank):
+    return {"id": id, "text": "python developer", "metadata": {}, "profile_card": {},
+            "score": score, "vector_rank": vector_rank, "text_rank": text_rank}
+
+
+@pytest.fixture
+def hybrid(monkeypatch):
+    pool = RecordingPool([])
+
+    async def get_db_pool():
+        return pool
+
+    async def embed(text):
+        return [0.5] * 768
+
+    monkeypatch.setattr(search, "get_db_pool", get_db_pool)
+    monkeypatch.setattr(search, "aget_embedding", embed)
+    run = inspect.unwrap(search.search_hybrid)
+    return pool, lambda **fields: asyncio.run(run(search.SearchRequest(**fields)))
+
+
+def placeholders(sql):
+    return {int(n) for n in re.findall(r"\$(\d+)", sql)}
+
+
+def test_hybrid_rrf_binds_params_in_sql_order(hybrid):
+    pool, run = hybrid
+    run(query="python developer", limit=5, candidate_depth=20, rrf_k=60)
+    depth, embedding, tsquery, k, limit = pool.params
+    assert (depth, tsquery, k, limit) == (20, "python | developer", 60, 5)
+    assert len(embedding) == 768
+    assert placeholders(pool.sql) == {1, 2, 3, 4, 5}
+    assert "embedding <=> $2" in pool.sql and "LIMIT $1" in pool.sql
+    assert "to_tsquery('english', $3)" in pool.sql
+    assert "1.0::float8 / ($4::int + v.vector_rank)" in pool.sql
+    assert "1.0::float8 / ($4::int + t.text_rank)" in pool.sql
+    assert pool.sql.rstrip().endswith("LIMIT $5")
+    assert "%s" not in pool.sql
+
+
+def test_hybrid_weighted_mode_binds_the_vector_weight(hybrid):
+    pool, run = hybrid
+    run(query="python developer", limit=5, fusion_method="weighted", vector_weight=0.7)
+    assert pool.params[3] == 0.7
+    assert "$4::float8 * COALESCE(v.vector_score, 0)" in pool.sql
+    assert "(1 - $4::float8)" in pool.sql
+    assert "::int +" not in pool.sql
+    assert placeholders(pool.sql) == set(range(1, len(pool.params) + 1))
+
+
+def test_hybrid_without_keywords_drops_the_text_arm(hybrid):
+    pool, run = hybrid
+    run(query="who is the", limit=5)
+    # depth, embedding, rrf_k, limit: nothing bound for the empty text arm
+    assert len(pool.params) == 4
+    assert "to_tsquery" not in pool.sql
+    assert placeholders(pool.sql) == {1, 2, 3, 4}
+    assert "($3::int + v.vector_rank)" in pool.sql and pool.sql.rstrip().endswith("LIMIT $4")
+
+
+def test_hybrid_depth_is_at_least_the_limit(hybrid):
+    pool, run = hybrid
+    run(query="python", limit=40, candidate_depth=10)
+    assert pool.params[0] == 40
+
+
+def test_hybrid_keeps_fused_order_and_explains_each_arm(hybrid):
+    pool, run = hybrid
+    k = 60
+    # RRF over vector ranks a=1, b=2 and text ranks b=1, c=2, as the fused CTE scores them
+    pool.rows = sorted([
+        fused_row("b", 1 / (k + 2) + 1 / (k + 1), 2, 1),
+        fused_row("a", 1 / (k + 1), 1, None),
+        fused_row("c", 1 / (k + 2), None, 2),
+    ], key=lambda row: row["score"], reverse=True)
+    payload = run(query="python developer", limit=3, rrf_k=k)
+    assert [res["id"] for res in payload["results"]] == ["b", "a", "c"]
+    assert payload["results"][0]["match_reason"] == "Hybrid Match: Vector Rank #2, Full-text Rank #1"
+    assert payload["results"][1]["match_reason"] == "Hybrid Match: Vector Rank #1"
+    assert payload["results"][2]["match_reason"] == "Hybrid Match: Full-text Rank #2"
+    assert payload["results"][0]["matched_keywords"] == ["python", "developer"]
@@ -8,7 +8,7 @@ import math
 from typing import List, Dict, Tuple, Any
 from collections import Counter
 from app.api.utils.database import execute_query, get_db_connection
-from app.api.utils.nlp import extract_candidate_info
+from app.api.utils.profile_index import card_metadata
 import time
 from psycopg2.extras import RealDictCursor
 
@@ -143,26 +143,8 @@ class BM25Search:
                         )
                         
                         if score > 0:
-                            # METADATA FALLBACK FIX
-                            meta = doc.get('metadata') or {}
-                            if not meta.get('name') or not meta.get('role'):
-                                # Try parsing text as JSON first (common in this DB)
-                                import json
-                                try:
-                                    json_content = json.loads(content)
-                                    if isinstance(json_content, dict):
-                                        # Map common JSON keys to metadata
-                                        if not meta.get('name'): meta['name'] = json_content.get('name') or json_content.get('Name')
-                                        if not meta.get('role'): meta['role'] = json_content.get('role') or json_content.get('Role') or json_content.get('job_title')
-                                        if not meta.get('location'): meta['location'] = json_content.get('location') or json_content.get('Location')
-                                        if not meta.get('email'): meta['email'] = json_content.get('email')
-                                except:
-                                    pass
-                                    
-                                # Fallback to regex if still missing
-                                if not meta.get('name') or not meta.get('role'):
-                                    extracted = extract_candidate_info(content)
-                                    meta.update(extracted)
+                            # Display fields come from the persisted profile card
+                            meta = card_metadata(doc)
 
                             scored_docs.append({
                                 'id': doc['id'],
@@ -232,7 +214,7 @@ class BM25Search:
             
         where_clause = " OR ".join(conditions)
         query = f"""
-            SELECT id, SUBSTRING(text, 1, 50000) as text, metadata
+            SELECT id, SUBSTRING(text, 1, 50000) as text, metadata, profile_card
             FROM student_profiles
             WHERE {where_clause}
             LIMIT 200
@@ -1,67 +1,222 @@
-import json
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from app.api.utils.embeddings import get_embedding
-from app.api.routes.search import get_db_connection
+"""
+Query Cache
+L1: in-process LRU keyed on the normalized query string, holding the query
+embedding and (once known) its results, so repeated queries skip Gemini entirely.
+Results are stored compactly (ids, scores, reasoning) and hydrated with current
+profile data on a hit.
+L2: the in-memory semantic cache (semantic_cache.py), reusing the L1 embedding;
+search_query_cache only persists entries across restarts.
+Saves update L1 inline; the rest is written behind by a background worker.
+"""
 
-def check_cache(query: str, threshold: float = 0.95):
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.api.utils.embeddings import get_embedding, aget_embedding
+from app.api.utils.gemini_scheduler import MAINTENANCE, gemini_priority
+from app.api.utils.generation import aget_generation
+from app.api.utils.hydration import compact_ranked, hydrate_ranked
+from app.api.utils.metrics import metrics
+from app.api.utils.nlp import STOP_WORDS
+from app.api.utils.semantic_cache import semantic_cache, persist_entries
+from app.api.utils.vectors import to_vector
+from app.api.utils.write_behind import WriteBehindQueue
+
+L1_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_L1_SIZE", "2048"))
+L1_TTL_SECONDS = int(os.getenv("QUERY_CACHE_L1_TTL", "3600"))
+
+
+# Terms keep the symbols that change their meaning: c++, c#, .net, node.js
+KEY_TERM = re.compile(r"[\w+#.]+")
+
+
+def _key_terms(query: str) -> List[str]:
+    """Lowercased terms with their +, # and . kept; sentence punctuation dropped"""
+    terms = []
+    for term in KEY_TERM.findall(query.lower()):
+        term = term.rstrip(".")
+        if re.search(r"\w", term):
+            terms.append(term)
+    return terms
+
+
+def normalize_query(query: str) -> str:
+    """Lowercased, stopword-stripped, sorted unique terms ("Python dev for AWS" -> "aws dev python")"""
+    terms = sorted({term for term in _key_terms(query) if term not in STOP_WORDS})
+    return " ".join(terms) if terms else " ".join(query.lower().split())
+
+
+def normalize_query_text(query: str) -> str:
+    """
+    Lowercased terms in their original order, stop words kept ("Python OR Java?" -> "python or java"),
+    for keys whose value depends on phrasing (LLM query understanding)
     """
-    Checks the search_query_cache for a semantically similar query.
+    terms = _key_terms(query)
+    return " ".join(terms) if terms else " ".join(query.lower().split())
+
+
+class QueryCache:
+    """Bounded LRU of normalized query -> {"embedding", "results", "insight"} with a TTL"""
+
+    def __init__(self, max_entries: int = L1_MAX_ENTRIES, ttl: int = L1_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires_at"] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, **fields) -> Dict[str, Any]:
+        """Create or update an entry; fields not given keep their current values"""
+        with self._lock:
+            entry = self._entries.get(key) or {"embedding": None, "results": None, "insight": ""}
+            entry.update(fields)
+            entry["expires_at"] = time.time() + self.ttl
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+l1_cache = QueryCache()
+
+
+def get_query_embedding(query: str, key: Optional[str] = None):
+    """Query embedding, served from L1 when this (normalized) query was seen before"""
+    key = key or normalize_query(query)
+    entry = l1_cache.get(key)
+    if entry is not None and entry["embedding"] is not None:
+        metrics.incr("cache.l1_embedding_hits")
+        return entry["embedding"]
+    embedding = to_vector(get_embedding(query))
+    if embedding is not None:
+        l1_cache.put(key, embedding=embedding)
+    return embedding
+
+
+async def aget_query_embedding(query: str, key: Optional[str] = None):
+    """get_query_embedding for async callers; the embedding call doesn't block the event loop"""
+    key = key or normalize_query(query)
+    entry = l1_cache.get(key)
+    if entry is not None and entry["embedding"] is not None:
+        metrics.incr("cache.l1_embedding_hits")
+        return entry["embedding"]
+    embedding = to_vector(await aget_embedding(query))
+    if embedding is not None:
+        l1_cache.put(key, embedding=embedding)
+    return embedding
+
+
+async def cache_namespace(strategy: str, limit: int) -> str:
+    """Cached results are only shared by the same strategy, limit and corpus generation"""
+    return f"{strategy}:{limit}:g{await aget_generation()}"
+
+
+def _results_key(namespace: str, key: str) -> str:
+    # Embeddings are shared across namespaces (keyed by the bare query), results are not
+    return f"{namespace}|{key}"
+
+
+def _as_hit(items: list, insight: str) -> Dict[str, Any]:
+    """Hydrate cached (compact) entries with current profile data and tag them as cache hits"""
+    results = hydrate_ranked(compact_ranked(items))
+    metrics.incr("cache.hydrated_rows", len(results))
+    for res in results:
+        res['match_reason'] = f"[CACHE HIT] {res.get('match_reason', '')}"
+    return {"results": results, "insight": insight}
+
+
+async def check_cache(query: str, namespace: str = "", threshold: float = 0.95):
+    """
+    Checks the exact-match L1, then the in-memory semantic cache for a similar query
+    within `namespace` (see cache_namespace).
     Returns: {"results": [...], "insight": "..."} or None
     """
     print(f"DEBUG: Checking cache for query: '{query}'")
+    key = normalize_query(query)
+    entry = l1_cache.get(_results_key(namespace, key))
+    if entry is not None and entry["results"] is not None:
+        print("DEBUG: L1 cache HIT!")
+        metrics.incr("cache.l1_hits")
+        return _as_hit(entry["results"], entry["insight"])
     try:
-        embedding = get_embedding(query)
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT results, insight, 1 - (embedding <=> %s) as similarity
-            FROM search_query_cache
-            WHERE 1 - (embedding <=> %s) > %s
-            ORDER BY similarity DESC
-            LIMIT 1
-        """, (str(embedding), str(embedding), threshold))
-        
-        cached_row = cur.fetchone()
-        cur.close()
-        conn.close()
-        
-        if cached_row:
-            print(f"DEBUG: Cache HIT! Similarity: {cached_row['similarity']:.4f}")
-            results = cached_row['results']
-            insight = cached_row.get('insight', '')
-            
-            # Add cache indicator
-            for res in results:
-                res['match_reason'] = f"[CACHE HIT] {res.get('match_reason', '')}"
-                
-            return {"results": results, "insight": insight}
+        embedding = await aget_query_embedding(query, key)
+        if embedding is None:
+            return None
+
+        cached = semantic_cache.lookup(embedding, threshold, namespace)
+        if cached:
+            print(f"DEBUG: Cache HIT! Similarity: {cached['similarity']:.4f}")
+            metrics.incr("cache.l2_hits")
+            l1_cache.put(_results_key(namespace, key), results=cached['results'], insight=cached['insight'])
+            return _as_hit(cached['results'], cached['insight'])
             
         print("DEBUG: Cache MISS.")
+        metrics.incr("cache.misses")
         return None
         
     except Exception as e:
         print(f"Cache lookup failed: {e}")
         return None
 
-def save_to_cache(query: str, results: list, strategy: str, insight: str = ""):
+def _flush_cache_writes(pending: list):
     """
-    Saves the query, results, and insight to the search_query_cache.
+    Write-behind flush: embed (reusing L1), add to the semantic cache, persist in one transaction.
+    Embedding calls made here are background upkeep and queue behind interactive ones.
     """
-    try:
-        embedding = get_embedding(query)
-        conn = get_db_connection()
-        cur = conn.cursor()
-        print("DEBUG: Saving results to cache...")
-        
-        cur.execute("""
-            INSERT INTO search_query_cache (query_text, embedding, strategy_used, results, insight)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (query, str(embedding), strategy, json.dumps(results), insight))
-        
-        conn.commit()
-        cur.close()
-        conn.close()
-    except Exception as e:
-        print(f"Failed to save to cache: {e}")
+    batch = []
+    for write in pending:
+        with gemini_priority(MAINTENANCE):
+            embedding = get_query_embedding(write["query"], write["key"])
+        if embedding is None:
+            continue
+        entry = {
+            "query_text": write["query"],
+            "strategy": write["strategy"],
+            "results": write["results"],
+            "insight": write["insight"],
+        }
+        replaced = semantic_cache.add(embedding, entry, write["namespace"])
+        batch.append((embedding, entry, replaced))
+    print(f"DEBUG: Flushing {len(batch)} cache writes...")
+    persist_entries(batch)
+
+
+cache_writes = WriteBehindQueue("query_cache", _flush_cache_writes)
+
+
+def save_to_cache(query: str, results: list, strategy: str, insight: str = "", namespace: str = ""):
+    """
+    Saves the query, results, and insight to L1 right away; the semantic cache and
+    search_query_cache are written behind, off the request path.
+    """
+    key = normalize_query(query)
+    # Only ids, scores and reasoning are cached; profile text/metadata are hydrated on hit
+    results = compact_ranked(results)
+    l1_cache.put(_results_key(namespace, key), results=results, insight=insight)
+    cache_writes.put(_results_key(namespace, key), {
+        "query": query,
+        "key": key,
+        "namespace": namespace,
+        "strategy": strategy,
+        "results": results,
+        "insight": insight,
+    })
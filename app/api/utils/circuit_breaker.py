@@ -0,0 +1,116 @@
+"""
+Circuit Breakers
+While a dependency is failing, calls fail fast with CircuitOpen instead of each request
+waiting out its own timeout; callers take their usual fallback (retrieval order, vector
+tool, original query, FTS-only hybrid).
+
+    closed     calls go through; CIRCUIT_FAILURE_THRESHOLD consecutive failures open it
+    open       calls are rejected for CIRCUIT_RESET_SECONDS
+    half_open  one probe call goes through; success closes, failure re-opens
+
+State is published as the gauge circuit.<name>.state in /api/debug/metrics.
+"""
+
+import os
+import time
+import threading
+from typing import Dict
+
+from app.api.utils import deadline
+from app.api.utils.metrics import metrics
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """The dependency is considered unhealthy; the call was not attempted"""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        metrics.set_gauge(f"circuit.{name}.state", CLOSED)
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            print(f"Circuit '{self.name}': {self.state} -> {state}")
+            metrics.incr(f"circuit.{self.name}.transitions.{state}")
+        self.state = state
+        metrics.set_gauge(f"circuit.{self.name}.state", state)
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (claims the probe slot when half-open)"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self._set_state(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def release(self):
+        """The call ended without telling us anything about the dependency (e.g. our own deadline)"""
+        with self._lock:
+            self._probing = False
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn under the breaker; raises CircuitOpen without calling fn while open"""
+        if not self.allow():
+            metrics.incr(f"circuit.{self.name}.rejected")
+            deadline.mark_degraded(f"{self.name}_circuit_open")
+            raise CircuitOpen(f"Circuit '{self.name}' is open")
+        try:
+            result = fn(*args, **kwargs)
+        except deadline.DeadlineExceeded:
+            self.release()
+            raise
+        except Exception:
+            # Past our deadline the client timeout (request_options) was ours, not a dependency failure
+            if deadline.expired():
+                self.release()
+            else:
+                self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Shared breaker per dependency name, e.g. 'gemini_llm.gemini-pro', 'gemini_embedding'"""
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
@@ -1,7 +1,8 @@
 import os
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from app.api.utils import deadline
 
 def get_db_connection():
     """Create a database connection"""
@@ -12,16 +13,51 @@ def get_db_connection():
         print(f"Error connecting to database: {e}")
         raise e
 
-def execute_query(query: str, params: tuple = None) -> List[Dict[str, Any]]:
-    """Execute a read query and return results as a list of dicts"""
+def apply_settings(cur, settings: Optional[Dict[str, Any]]):
+    """Apply transaction-local GUC settings (e.g. pg_trgm.similarity_threshold)"""
+    for name, value in (settings or {}).items():
+        # is_local=true scopes the setting to the current transaction
+        cur.execute("SELECT set_config(%s, %s, true)", (name, str(value)))
+
+def deadline_settings(settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Cap statement_timeout at the request's remaining budget"""
+    merged = dict(settings or {})
+    budget_ms = deadline.statement_timeout_ms()
+    if budget_ms is not None:
+        current = merged.get("statement_timeout")
+        merged["statement_timeout"] = min(int(current), budget_ms) if current else budget_ms
+    return merged
+
+def execute_query(
+    query: str,
+    params: tuple = None,
+    settings: Optional[Dict[str, Any]] = None,
+    raise_errors: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Execute a read query and return results as a list of dicts.
+    Errors are logged and yield [] unless raise_errors is set (e.g. to detect statement timeouts).
+    Runs under the request deadline's statement_timeout, if one is set.
+    Skipped or failed queries mark the request degraded ("db"), so their [] is never cached.
+    """
+    if deadline.expired():
+        print("Skipping query: request deadline exceeded")
+        deadline.mark_degraded("db")
+        if raise_errors:
+            raise deadline.DeadlineExceeded("Request deadline exceeded before query")
+        return []
     conn = get_db_connection()
     try:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            apply_settings(cur, deadline_settings(settings))
             cur.execute(query, params)
             results = cur.fetchall()
             return results
     except Exception as e:
         print(f"Error executing query: {e}")
+        deadline.mark_degraded("db")
+        if raise_errors:
+            raise
         return []
     finally:
         conn.close()
@@ -0,0 +1,120 @@
+"""
+Request Deadlines
+A per-request time budget (X-Request-Deadline-Ms header or `deadline_ms` body field)
+carried in a contextvar, so DB statement timeouts, asyncpg command timeouts and
+Gemini call timeouts all draw from the same budget.
+"""
+
+import os
+import time
+import contextvars
+from typing import Any, Dict, List, Optional
+
+from app.api.utils.metrics import metrics
+
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+# 0 disables the default; requests can still opt in per call
+DEFAULT_DEADLINE_MS = int(os.getenv("DEFAULT_REQUEST_DEADLINE_MS", "0"))
+# Below this much remaining budget an LLM call is skipped in favor of the non-LLM result
+LLM_MIN_BUDGET_MS = int(os.getenv("LLM_MIN_BUDGET_MS", "750"))
+# Upper bound for Gemini calls even without a request deadline
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+EMBEDDING_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_TIMEOUT_SECONDS", "10"))
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+# Steps skipped or cut short because the budget ran out, per request
+_degraded: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar("request_degraded", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before this step could start"""
+
+
+def set_deadline(budget_ms: Optional[float]):
+    """Start a budget of `budget_ms` from now; keeps an existing, tighter deadline"""
+    if not budget_ms or budget_ms <= 0:
+        return None
+    new_deadline = time.monotonic() + budget_ms / 1000.0
+    current = _deadline.get()
+    if current is not None and current <= new_deadline:
+        return None
+    return _deadline.set(new_deadline)
+
+
+def reset_deadline(token):
+    if token is not None:
+        _deadline.reset(token)
+
+
+def begin_request(header_value: Optional[str] = None):
+    """Start the request budget from the deadline header (or the default); returns tokens for end_request"""
+    try:
+        budget_ms = float(header_value) if header_value else DEFAULT_DEADLINE_MS
+    except ValueError:
+        budget_ms = DEFAULT_DEADLINE_MS
+    return set_deadline(budget_ms), _degraded.set([])
+
+
+def end_request(tokens):
+    deadline_token, degraded_token = tokens
+    reset_deadline(deadline_token)
+    _degraded.reset(degraded_token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the budget, or None if the request has no deadline"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def remaining_ms() -> Optional[int]:
+    left = remaining()
+    return None if left is None else int(left * 1000)
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def call_timeout(default: Optional[float] = None) -> Optional[float]:
+    """Timeout (seconds) for a downstream call: the smaller of the budget left and `default`"""
+    left = remaining()
+    if left is None:
+        return default
+    left = max(left, 0.001)
+    return min(left, default) if default else left
+
+
+def statement_timeout_ms() -> Optional[int]:
+    """Value for Postgres statement_timeout, at least 1ms (0 would mean 'no limit')"""
+    left = remaining_ms()
+    return None if left is None else max(left, 1)
+
+
+def mark_degraded(step: str):
+    steps = _degraded.get()
+    if steps is not None and step not in steps:
+        steps.append(step)
+    metrics.incr(f"deadline.degraded.{step}")
+
+
+def degraded_steps() -> List[str]:
+    return list(_degraded.get() or [])
+
+
+def has_budget_for_llm(step: str) -> bool:
+    """False when the remaining budget is too small to be worth starting an LLM call"""
+    left = remaining_ms()
+    if left is not None and left < LLM_MIN_BUDGET_MS:
+        print(f"DEBUG: Skipping {step}, {left}ms left in request budget")
+        mark_degraded(step)
+        return False
+    return True
+
+
+def llm_request_options(default: float = LLM_TIMEOUT_SECONDS) -> Dict[str, Any]:
+    """request_options for genai calls so they can't outlive the request"""
+    return {"timeout": call_timeout(default)}
@@ -0,0 +1,242 @@
+"""
+Embedding Cache
+Shared by every embedding caller (search routes, query cache, STM ingestion, adaptive
+fusion). Entries are keyed by (model, task_type, dimensionality, sha256(text)):
+- L1: in-process LRU of float32 vectors
+- L2: local SQLite file (EMBEDDING_CACHE_PATH), surviving restarts; set it to "" to disable.
+  Capped at EMBEDDING_CACHE_DISK_MAX_ROWS: past the cap the oldest entries are pruned.
+Async callers read the disk tier on a dedicated thread and write it behind
+(embedding_cache_writes), so SQLite I/O never runs on the event loop.
+"""
+
+import os
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.api.utils.metrics import metrics
+from app.api.utils.write_behind import WriteBehindQueue
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    str(Path(__file__).resolve().parent.parent.parent / "data" / "embedding_cache.sqlite")
+)
+# 0 leaves the disk tier unbounded
+EMBEDDING_CACHE_DISK_MAX_ROWS = int(os.getenv("EMBEDDING_CACHE_DISK_MAX_ROWS", "200000"))
+# A prune deletes down to this share of the cap, so it runs once per many writes
+DISK_PRUNE_TARGET = 0.9
+
+CacheKey = Tuple[str, str, int, str]
+
+
+def embedding_key(model: str, task_type: str, dim: int, text: str) -> CacheKey:
+    return (model, task_type, int(dim), hashlib.sha256(text.encode("utf-8")).hexdigest())
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: LRU in memory, SQLite on disk"""
+
+    def __init__(
+        self,
+        max_entries: int = EMBEDDING_CACHE_SIZE,
+        path: Optional[str] = EMBEDDING_CACHE_PATH,
+        max_disk_rows: int = EMBEDDING_CACHE_DISK_MAX_ROWS
+    ):
+        self.max_entries = max_entries
+        self.path = path
+        self.max_disk_rows = max_disk_rows
+        self._memory: "OrderedDict[CacheKey, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Separate from the L1 lock, so event-loop L1 lookups never wait on SQLite I/O
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_failed = False
+        # Rows on disk, counted at open and on each write (replaced rows count too until the next prune)
+        self._disk_rows = 0
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """Open the SQLite tier lazily; on failure keep running memory-only"""
+        if self._db is not None or self._db_failed or not self.path:
+            return self._db
+        try:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    task_type TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    text_sha256 TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (model, task_type, dim, text_sha256)
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_created_at ON embeddings (created_at)")
+            db.commit()
+            self._disk_rows = db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self._db = db
+        except Exception as e:
+            print(f"Embedding cache disk tier disabled: {e}")
+            self._db_failed = True
+        return self._db
+
+    def _prune(self, db: sqlite3.Connection):
+        """Delete the oldest rows down to DISK_PRUNE_TARGET of the cap (caller holds the db lock)"""
+        self._disk_rows = db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = self._disk_rows - int(self.max_disk_rows * DISK_PRUNE_TARGET)
+        if self._disk_rows <= self.max_disk_rows or excess <= 0:
+            return
+        db.execute(
+            "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY created_at, rowid LIMIT ?)",
+            (excess,)
+        )
+        db.commit()
+        self._disk_rows -= excess
+        metrics.incr("embedding_cache.disk_pruned", excess)
+
+    def _remember(self, key: CacheKey, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    @property
+    def has_disk(self) -> bool:
+        return bool(self.path) and not self._db_failed
+
+    def get_memory(self, key: CacheKey) -> Optional[np.ndarray]:
+        """L1 only: cheap enough for the event loop"""
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                metrics.incr("embedding_cache.memory_hits")
+            return vector
+
+    def get_disk(self, key: CacheKey) -> Optional[np.ndarray]:
+        """SQLite tier only (blocking); a hit is promoted to L1"""
+        row = None
+        with self._db_lock:
+            db = self._connection()
+            if db is not None:
+                try:
+                    row = db.execute(
+                        "SELECT vector FROM embeddings WHERE model = ? AND task_type = ? AND dim = ? AND text_sha256 = ?",
+                        key
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    print(f"Embedding cache read failed: {e}")
+        if row is None:
+            metrics.incr("embedding_cache.misses")
+            return None
+        vector = np.frombuffer(row[0], dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+        metrics.incr("embedding_cache.disk_hits")
+        return vector
+
+    def get(self, key: CacheKey) -> Optional[np.ndarray]:
+        vector = self.get_memory(key)
+        return vector if vector is not None else self.get_disk(key)
+
+    def remember(self, key: CacheKey, embedding: Sequence[float]) -> Optional[np.ndarray]:
+        """L1 only; returns the stored vector (None for an empty embedding)"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        if vector.size == 0:
+            return None
+        with self._lock:
+            self._remember(key, vector)
+        return vector
+
+    def write_disk(self, items: Sequence[Tuple[CacheKey, np.ndarray]]):
+        """Persist vectors to the SQLite tier in one transaction (blocking)"""
+        if not items:
+            return
+        with self._db_lock:
+            db = self._connection()
+            if db is None:
+                return
+            try:
+                now = time.time()
+                db.executemany(
+                    "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?, ?)",
+                    [key + (vector.tobytes(), now) for key, vector in items]
+                )
+                db.commit()
+                self._disk_rows += len(items)
+                if self.max_disk_rows > 0 and self._disk_rows > self.max_disk_rows:
+                    self._prune(db)
+            except sqlite3.Error as e:
+                print(f"Embedding cache write failed: {e}")
+
+    def put(self, key: CacheKey, embedding: Sequence[float]):
+        vector = self.remember(key, embedding)
+        if vector is not None:
+            self.write_disk([(key, vector)])
+
+
+embedding_cache = EmbeddingCache()
+# One thread: reads are serialized on the connection lock anyway
+_disk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-cache")
+
+
+def _flush_embedding_writes(pending: List[Tuple[CacheKey, np.ndarray]]):
+    embedding_cache.write_disk(pending)
+
+
+def _overflow_embedding_writes(pending: List[Tuple[CacheKey, np.ndarray]]):
+    # A dropped vector is a paid re-embed later: persist it on the cache thread instead
+    _disk_executor.submit(embedding_cache.write_disk, pending)
+
+
+embedding_cache_writes = WriteBehindQueue(
+    "embedding_cache", _flush_embedding_writes, overflow=_overflow_embedding_writes
+)
+
+
+def cached_embedding(model: str, task_type: str, dim: int, text: str) -> Optional[List[float]]:
+    vector = embedding_cache.get(embedding_key(model, task_type, dim, text))
+    return None if vector is None else vector.tolist()
+
+
+async def acached_embedding(model: str, task_type: str, dim: int, text: str) -> Optional[List[float]]:
+    """cached_embedding for async callers: L1 inline, the SQLite tier on the cache thread"""
+    key = embedding_key(model, task_type, dim, text)
+    vector = embedding_cache.get_memory(key)
+    if vector is None:
+        if not embedding_cache.has_disk:
+            metrics.incr("embedding_cache.misses")
+            return None
+        vector = await asyncio.get_running_loop().run_in_executor(_disk_executor, embedding_cache.get_disk, key)
+    return None if vector is None else vector.tolist()
+
+
+def store_embedding(model: str, task_type: str, dim: int, text: str, embedding: Sequence[float]):
+    embedding_cache.put(embedding_key(model, task_type, dim, text), embedding)
+
+
+def store_embeddings_behind(model: str, task_type: str, dim: int, embeddings: Dict[str, Sequence[float]]):
+    """
+    store_embedding for async callers, for a whole batch {text: embedding}: L1 now, the
+    SQLite tier written behind (the flush persists pending vectors with one executemany)
+    """
+    for text, embedding in embeddings.items():
+        key = embedding_key(model, task_type, dim, text)
+        vector = embedding_cache.remember(key, embedding)
+        if vector is not None and embedding_cache.has_disk:
+            embedding_cache_writes.put(key, (key, vector))
+
+
+def store_embedding_behind(model: str, task_type: str, dim: int, text: str, embedding: Sequence[float]):
+    store_embeddings_behind(model, task_type, dim, {text: embedding})
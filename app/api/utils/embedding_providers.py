@@ -0,0 +1,129 @@
+"""
+Embedding Providers
+Every embedding in the app comes from the provider selected by EMBEDDING_PROVIDER:
+- "gemini" (default): remote text-embedding-004
+- "local": hashed n-gram random projection on the CPU, for offline benchmarks, CI and
+  deployments that can't afford a network hop per query
+
+Vectors from different providers are not comparable: stored embeddings (student_profiles,
+user_profile_chunks) must be produced with the same provider that serves queries.
+"""
+
+import os
+import re
+import math
+import hashlib
+from typing import List, Optional
+
+import numpy as np
+import google.generativeai as genai
+
+from app.api.utils import deadline
+from app.api.utils.circuit_breaker import get_breaker
+from app.api.utils.gemini_scheduler import gemini_scheduler
+
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "gemini").lower()
+EMBEDDING_DIM = 768
+
+
+class EmbeddingProvider:
+    """Interface: blocking batch embedding of texts into `dim`-dimensional vectors"""
+
+    name = "base"
+    model = ""
+    dim = EMBEDDING_DIM
+    # Remote providers go through the thread pool, batcher, retries and deadline checks
+    is_remote = True
+
+    def embed_batch(self, texts: List[str], task_type: str) -> List[List[float]]:
+        raise NotImplementedError
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    name = "gemini"
+    model = "models/text-embedding-004"
+
+    def __init__(self):
+        if os.environ.get("GOOGLE_API_KEY"):
+            genai.configure(api_key=os.environ.get("GOOGLE_API_KEY"))
+
+    def embed_batch(self, texts: List[str], task_type: str) -> List[List[float]]:
+        # Fails fast with CircuitOpen while the embedding API is unhealthy
+        return get_breaker(f"{self.name}_embedding").call(self._embed_batch, texts, task_type)
+
+    def _embed_batch(self, texts: List[str], task_type: str) -> List[List[float]]:
+        # One token per API call, however many texts it carries
+        gemini_scheduler.acquire("embedding")
+        result = genai.embed_content(
+            model=self.model,
+            content=texts if len(texts) > 1 else texts[0],
+            task_type=task_type,
+            output_dimensionality=self.dim,
+            request_options=deadline.llm_request_options(deadline.EMBEDDING_TIMEOUT_SECONDS)
+        )
+        embedding = result['embedding']
+        return embedding if len(texts) > 1 else [embedding]
+
+
+class LocalHashEmbeddingProvider(EmbeddingProvider):
+    """
+    Word unigrams/bigrams and character 3-5-grams, each hashed to a few signed positions
+    (a sparse random projection), with sublinear TF weights and L2 normalization.
+    Deterministic across processes; no model download, no network.
+    """
+
+    name = "local"
+    model = "local/hash-ngram-768"
+    is_remote = False
+
+    def __init__(self, dim: int = EMBEDDING_DIM, projections: int = 4):
+        self.dim = dim
+        self.projections = projections
+
+    def _features(self, text: str) -> List[str]:
+        words = re.findall(r"\w+", text.lower())
+        features = [f"w:{w}" for w in words]
+        features += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"<{word}>"
+            for n in (3, 4, 5):
+                features += [f"c:{padded[i:i + n]}" for i in range(max(len(padded) - n + 1, 0))]
+        return features
+
+    def _embed(self, text: str) -> List[float]:
+        counts = {}
+        for feature in self._features(text):
+            counts[feature] = counts.get(feature, 0) + 1
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, count in counts.items():
+            weight = 1.0 + math.log(count)
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=4 * self.projections).digest()
+            for k in range(self.projections):
+                h = int.from_bytes(digest[4 * k:4 * k + 4], "little")
+                vector[h % self.dim] += weight if (h >> 31) & 1 else -weight
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_batch(self, texts: List[str], task_type: str) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+
+PROVIDERS = {
+    "gemini": GeminiEmbeddingProvider,
+    "local": LocalHashEmbeddingProvider,
+}
+
+_provider: Optional[EmbeddingProvider] = None
+
+
+def get_provider() -> EmbeddingProvider:
+    """The configured provider (EMBEDDING_PROVIDER), created once"""
+    global _provider
+    if _provider is None:
+        if EMBEDDING_PROVIDER not in PROVIDERS:
+            raise ValueError(f"Unknown EMBEDDING_PROVIDER '{EMBEDDING_PROVIDER}', expected one of {sorted(PROVIDERS)}")
+        _provider = PROVIDERS[EMBEDDING_PROVIDER]()
+        print(f"DEBUG: Using embedding provider '{_provider.name}' ({_provider.model})")
+    return _provider
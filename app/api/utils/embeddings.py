@@ -1,23 +1,303 @@
 import os
-import google.generativeai as genai
-from typing import List
+import time
+import random
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+from app.api.utils import deadline
+from app.api.utils.circuit_breaker import CLOSED, get_breaker
+from app.api.utils.embedding_cache import (
+    cached_embedding, store_embedding, acached_embedding, store_embedding_behind, store_embeddings_behind
+)
+from app.api.utils.embedding_providers import EmbeddingProvider, get_provider
+from app.api.utils.gemini_scheduler import current_priority, gemini_priority
+from app.api.utils.metrics import metrics
 
-# Configure Gemini API
-# It's better to configure this at app startup, but for now we'll do it here or assume env var is set
-if os.environ.get("GOOGLE_API_KEY"):
-    genai.configure(api_key=os.environ.get("GOOGLE_API_KEY"))
+EMBEDDING_TASK_TYPE = "retrieval_query"
 
-def get_embedding(text: str) -> List[float]:
-    """Get embedding for text using Gemini API"""
+# Remote providers are synchronous SDKs: async callers run them on this bounded pool so
+# the event loop never blocks, with at most EMBEDDING_MAX_CONCURRENCY calls in flight
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "8"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "2"))
+EMBEDDING_RETRY_BASE_SECONDS = float(os.getenv("EMBEDDING_RETRY_BASE_SECONDS", "0.25"))
+# google.api_core errors worth retrying (matched by name to avoid importing api_core here)
+RETRYABLE_ERRORS = {
+    "ResourceExhausted", "ServiceUnavailable", "InternalServerError", "DeadlineExceeded",
+    "TooManyRequests", "TimeoutError", "ConnectionError",
+}
+
+# Micro-batching: concurrent aget_embedding calls are grouped into one API call
+EMBEDDING_BATCHING = os.getenv("EMBEDDING_BATCHING", "true").lower() in ("1", "true", "yes")
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+
+# Hedged requests: if a remote call hasn't returned after the provider's p95 latency,
+# send a second identical call and take whichever answers first
+EMBEDDING_HEDGING = os.getenv("EMBEDDING_HEDGING", "false").lower() in ("1", "true", "yes")
+EMBEDDING_HEDGE_MIN_DELAY_MS = float(os.getenv("EMBEDDING_HEDGE_MIN_DELAY_MS", "50"))
+
+# (task_type, priority class) of a pending micro-batch
+BatchKey = Tuple[str, int]
+
+# Hedges get their own threads so they don't queue behind the calls they're hedging
+_executor = ThreadPoolExecutor(
+    max_workers=EMBEDDING_MAX_CONCURRENCY * (2 if EMBEDDING_HEDGING else 1), thread_name_prefix="embedding"
+)
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _cache_get(provider: EmbeddingProvider, task_type: str, text: str) -> Optional[List[float]]:
+    return cached_embedding(provider.model, task_type, provider.dim, text)
+
+
+def _cache_put(provider: EmbeddingProvider, task_type: str, text: str, embedding: List[float]):
+    store_embedding(provider.model, task_type, provider.dim, text, embedding)
+
+
+async def _acache_get(provider: EmbeddingProvider, task_type: str, text: str) -> Optional[List[float]]:
+    return await acached_embedding(provider.model, task_type, provider.dim, text)
+
+
+def _cache_put_behind(provider: EmbeddingProvider, task_type: str, text: str, embedding: List[float]):
+    store_embedding_behind(provider.model, task_type, provider.dim, text, embedding)
+
+
+def _embed_batch(provider: EmbeddingProvider, texts: List[str], task_type: str) -> List[List[float]]:
+    """One provider call; raises on failure"""
+    start = time.time()
+    embeddings = provider.embed_batch(texts, task_type)
+    # Successful calls only: fast CircuitOpen rejections would drag the hedging p95 down
+    metrics.observe(f"embedding.call_ms.{provider.name}", (time.time() - start) * 1000)
+    return embeddings
+
+
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Jittered exponential backoff, or None if the error/budget doesn't allow another try"""
+    if attempt >= EMBEDDING_MAX_RETRIES or type(error).__name__ not in RETRYABLE_ERRORS:
+        return None
+    delay = random.uniform(0, EMBEDDING_RETRY_BASE_SECONDS * (2 ** attempt))
+    left = deadline.remaining()
+    if left is not None and left < delay + 0.1:
+        return None
+    metrics.incr("embedding.retries")
+    return delay
+
+
+def get_embedding(text: str, task_type: str = EMBEDDING_TASK_TYPE) -> List[float]:
+    """
+    Get embedding for text from the configured provider (cached; bounded by the request deadline).
+    Blocking. Returns [] if the provider fails.
+    """
+    provider = get_provider()
+    cached = _cache_get(provider, task_type, text)
+    if cached is not None:
+        return cached
+    attempt = 0
+    while True:
+        if provider.is_remote and deadline.expired():
+            deadline.mark_degraded("embedding")
+            return []
+        try:
+            embedding = _embed_batch(provider, [text], task_type)[0]
+            _cache_put(provider, task_type, text, embedding)
+            return embedding
+        except Exception as e:
+            delay = _retry_delay(e, attempt)
+            if delay is None:
+                print(f"Error generating embedding: {e}")
+                metrics.incr(f"embedding.failures.{provider.name}")
+                deadline.mark_degraded("embedding")
+                return []
+            time.sleep(delay)
+            attempt += 1
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(EMBEDDING_MAX_CONCURRENCY)
+    return _semaphore
+
+
+def _hedge_delay(provider: EmbeddingProvider) -> Optional[float]:
+    """Seconds to wait before hedging a call to `provider`, or None to not hedge"""
+    if not EMBEDDING_HEDGING or not provider.is_remote:
+        return None
+    # A half-open breaker admits a single probe; a hedge would only be rejected
+    if get_breaker(f"{provider.name}_embedding").state != CLOSED:
+        return None
+    p95 = metrics.percentile(f"embedding.call_ms.{provider.name}", 95)
+    if not p95:
+        return None
+    return max(p95, EMBEDDING_HEDGE_MIN_DELAY_MS) / 1000.0
+
+
+def _consume(future: asyncio.Future):
+    # The losing call of a hedge may still fail; retrieve it so asyncio doesn't warn
+    if not future.cancelled():
+        future.exception()
+
+
+async def _run_hedged(ctx: contextvars.Context, hedge_delay: Optional[float], fn, *args):
+    loop = asyncio.get_running_loop()
+    first = loop.run_in_executor(_executor, ctx.run, fn, *args)
+    if hedge_delay is None:
+        return await first
+    done, _ = await asyncio.wait({first}, timeout=hedge_delay)
+    if done:
+        return first.result()
+    metrics.incr("embedding.hedges")
+    # A Context can only be entered by one thread at a time
+    second = loop.run_in_executor(_executor, ctx.copy().run, fn, *args)
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is second:
+                    metrics.incr("embedding.hedge_wins")
+                for loser in pending:
+                    loser.add_done_callback(_consume)
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+async def _call_in_pool(ctx: contextvars.Context, fn, *args, hedge_delay: Optional[float] = None):
+    """
+    Run a blocking embedding call on the pool under the concurrency limit, with jittered
+    retries; with hedge_delay, a duplicate call goes out if the first is still running by then.
+    """
+    queued_at = time.time()
+    async with _get_semaphore():
+        metrics.observe("embedding.queue_wait_ms", (time.time() - queued_at) * 1000)
+        attempt = 0
+        while True:
+            try:
+                return await _run_hedged(ctx, hedge_delay, fn, *args)
+            except Exception as e:
+                delay = _retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+
+class EmbeddingBatcher:
+    """
+    Collects texts from concurrent callers for up to max_wait_ms (or max_size texts)
+    and embeds them with one batched call, fanning the vectors back out.
+    """
+
+    def __init__(self, max_size: int = EMBEDDING_BATCH_MAX_SIZE, max_wait_ms: float = EMBEDDING_BATCH_MAX_WAIT_MS):
+        self.max_size = max_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: Dict[BatchKey, List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[BatchKey, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def embed(self, text: str, task_type: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Batches never mix priority classes, so ingestion texts can't ride in (or hold up) an interactive call
+        key = (task_type, current_priority())
+        items = self._pending.setdefault(key, [])
+        items.append((text, future))
+        if len(items) >= self.max_size:
+            self._flush(key)
+        elif len(items) == 1:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+        try:
+            # The batch is shared, so each caller only stops waiting at its own deadline
+            return await asyncio.wait_for(asyncio.shield(future), deadline.call_timeout())
+        except asyncio.TimeoutError:
+            deadline.mark_degraded("embedding")
+            return []
+
+    def _flush(self, key: BatchKey):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        items = self._pending.pop(key, [])
+        if items:
+            # Start the task in an empty context: a batch serves several requests, so it
+            # must not inherit (and mark degraded) whichever request happened to flush it
+            task = contextvars.Context().run(asyncio.ensure_future, self._run(key, items))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: BatchKey, items: List[Tuple[str, asyncio.Future]]):
+        task_type, priority = key
+        provider = get_provider()
+        texts = list(dict.fromkeys(text for text, _ in items))
+        metrics.observe("embedding.batch_size", len(texts))
+        try:
+            with gemini_priority(priority):
+                ctx = contextvars.copy_context()
+            embeddings = await _call_in_pool(ctx, _embed_batch, provider, texts, task_type, hedge_delay=_hedge_delay(provider))
+            by_text = dict(zip(texts, embeddings))
+            # One write-behind batch: no SQLite commit per text on the event loop
+            store_embeddings_behind(provider.model, task_type, provider.dim, by_text)
+        except Exception as e:
+            print(f"Error generating batched embeddings: {e}")
+            metrics.incr(f"embedding.failures.{provider.name}")
+            by_text = {}
+        for text, future in items:
+            if not future.done():
+                future.set_result(by_text.get(text, []))
+
+
+_batcher: Optional[EmbeddingBatcher] = None
+
+
+def _get_batcher() -> EmbeddingBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = EmbeddingBatcher()
+    return _batcher
+
+
+async def aget_embedding(text: str, task_type: str = EMBEDDING_TASK_TYPE) -> List[float]:
+    """
+    Non-blocking get_embedding for async routes. Remote providers are micro-batched across
+    concurrent callers into one call on a bounded pool, with jittered retries;
+    local providers are cheap enough to run inline. The SQLite cache tier is read on
+    its own thread and written behind.
+    """
+    provider = get_provider()
+    cached = await _acache_get(provider, task_type, text)
+    if cached is not None:
+        return cached
+    if not provider.is_remote:
+        try:
+            embedding = _embed_batch(provider, [text], task_type)[0]
+        except Exception as e:
+            print(f"Error generating embedding: {e}")
+            metrics.incr(f"embedding.failures.{provider.name}")
+            deadline.mark_degraded("embedding")
+            return []
+        _cache_put_behind(provider, task_type, text, embedding)
+        return embedding
+    if deadline.expired():
+        deadline.mark_degraded("embedding")
+        return []
+    if EMBEDDING_BATCHING:
+        embedding = await _get_batcher().embed(text, task_type)
+        if not embedding:
+            # Failed batch (or open circuit): keep the caller's response out of the caches
+            deadline.mark_degraded("embedding")
+        return embedding
     try:
-        # Use the text-embedding-004 model as requested
-        result = genai.embed_content(
-            model="models/text-embedding-004",
-            content=text,
-            task_type="retrieval_query",
-            output_dimensionality=768
-        )
-        return result['embedding']
+        # copy_context: the worker thread sees this request's deadline
+        embedding = (await _call_in_pool(
+            contextvars.copy_context(), _embed_batch, provider, [text], task_type, hedge_delay=_hedge_delay(provider)
+        ))[0]
     except Exception as e:
         print(f"Error generating embedding: {e}")
+        metrics.incr(f"embedding.failures.{provider.name}")
+        deadline.mark_degraded("embedding")
         return []
+    _cache_put_behind(provider, task_type, text, embedding)
+    return embedding
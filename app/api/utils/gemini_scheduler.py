@@ -0,0 +1,179 @@
+"""
+Gemini Call Scheduler
+Every Gemini call (LLM and embedding) takes a token from its resource's bucket before it
+is sent. Waiters are served strictly by priority class, then arrival order:
+
+    INTERACTIVE  search requests (default)
+    MAINTENANCE  cache warming and other background upkeep
+    INGESTION    STM evaluation, re-embedding, bulk imports
+
+The class comes from a contextvar, so callers mark a whole code path at once:
+
+    with gemini_priority(INGESTION):
+        chunks = await run_blocking(generate_stm_chunks, data)
+
+Buckets are per process and should be sized to the process's share of the API quota
+(GEMINI_LLM_RPM / GEMINI_EMBEDDING_RPM). A waiter gives up when its request deadline runs out.
+run_blocking gives each priority class its own thread pool, so background calls queued
+for tokens can never hold the threads interactive calls need.
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+import contextlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from app.api.utils import deadline
+from app.api.utils.circuit_breaker import get_breaker
+from app.api.utils.metrics import metrics
+
+INTERACTIVE = 0
+MAINTENANCE = 1
+INGESTION = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", MAINTENANCE: "maintenance", INGESTION: "ingestion"}
+
+# Requests per minute and burst size per resource; 0 disables rate limiting for it
+GEMINI_LLM_RPM = float(os.getenv("GEMINI_LLM_RPM", "60"))
+GEMINI_LLM_BURST = int(os.getenv("GEMINI_LLM_BURST", "5"))
+GEMINI_EMBEDDING_RPM = float(os.getenv("GEMINI_EMBEDDING_RPM", "1500"))
+GEMINI_EMBEDDING_BURST = int(os.getenv("GEMINI_EMBEDDING_BURST", "20"))
+# Threads for blocking LLM calls made from async routes (interactive), and for each background class
+GEMINI_LLM_MAX_CONCURRENCY = int(os.getenv("GEMINI_LLM_MAX_CONCURRENCY", "8"))
+GEMINI_LLM_BACKGROUND_CONCURRENCY = int(os.getenv("GEMINI_LLM_BACKGROUND_CONCURRENCY", "2"))
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("gemini_priority", default=INTERACTIVE)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+@contextlib.contextmanager
+def gemini_priority(priority: int):
+    """Run the enclosed Gemini calls (including worker threads started with a copied context) at `priority`"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """`rate` tokens per second up to `burst`; not thread-safe on its own"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token and return 0, or return the seconds until one is available"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class GeminiScheduler:
+    """Priority queue in front of one token bucket per resource ("llm", "embedding")"""
+
+    def __init__(self, limits: Dict[str, Tuple[float, int]]):
+        self._cond = threading.Condition()
+        self._buckets = {name: TokenBucket(rpm / 60.0, burst) for name, (rpm, burst) in limits.items()}
+        self._waiting: Dict[str, List[Tuple[int, int]]] = {name: [] for name in limits}
+        self._seq = itertools.count()
+
+    def _publish_depth(self, resource: str):
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _ in self._waiting[resource]:
+            depth[PRIORITY_NAMES[priority]] += 1
+        for name, value in depth.items():
+            metrics.set_gauge(f"gemini.queue_depth.{resource}.{name}", value)
+
+    def acquire(self, resource: str):
+        """
+        Block until this call may go out. Raises DeadlineExceeded if the request's
+        budget runs out first (the caller falls back as for any failed call).
+        """
+        priority = _priority.get()
+        label = f"{resource}.{PRIORITY_NAMES[priority]}"
+        ticket = (priority, next(self._seq))
+        queued_at = time.monotonic()
+        with self._cond:
+            waiting = self._waiting[resource]
+            heapq.heappush(waiting, ticket)
+            self._publish_depth(resource)
+            try:
+                while True:
+                    wait = None
+                    if waiting[0] == ticket:
+                        wait = self._buckets[resource].take()
+                        if wait == 0:
+                            break
+                    left = deadline.remaining()
+                    if left is not None:
+                        if left <= 0:
+                            metrics.incr(f"gemini.expired_in_queue.{label}")
+                            deadline.mark_degraded(f"gemini_{resource}_queue")
+                            raise deadline.DeadlineExceeded(f"Request deadline passed while queued for Gemini {resource}")
+                        wait = left if wait is None else min(wait, left)
+                    self._cond.wait(wait)
+            finally:
+                waiting.remove(ticket)
+                heapq.heapify(waiting)
+                self._publish_depth(resource)
+                # The next ticket in line may now be at the head
+                self._cond.notify_all()
+        metrics.incr(f"gemini.calls.{label}")
+        metrics.observe(f"gemini.queue_wait_ms.{label}", (time.monotonic() - queued_at) * 1000)
+
+
+gemini_scheduler = GeminiScheduler({
+    "llm": (GEMINI_LLM_RPM, GEMINI_LLM_BURST),
+    "embedding": (GEMINI_EMBEDDING_RPM, GEMINI_EMBEDDING_BURST),
+})
+
+def generate_content(model, prompt: str):
+    """
+    One Gemini LLM call: fails fast with CircuitOpen while the model's breaker is open,
+    otherwise waits for an "llm" token and calls generate_content within the request deadline.
+    """
+    breaker = get_breaker(f"gemini_llm.{model.model_name.split('/')[-1]}")
+
+    def call():
+        gemini_scheduler.acquire("llm")
+        return model.generate_content(prompt, request_options=deadline.llm_request_options())
+
+    return breaker.call(call)
+
+
+# Tokens are taken inside the worker thread (a helper may make zero or several calls), so a
+# shared pool would let queued ingestion calls occupy every thread ahead of interactive ones
+_llm_executors = {
+    INTERACTIVE: ThreadPoolExecutor(max_workers=GEMINI_LLM_MAX_CONCURRENCY, thread_name_prefix="gemini-llm"),
+    MAINTENANCE: ThreadPoolExecutor(max_workers=GEMINI_LLM_BACKGROUND_CONCURRENCY, thread_name_prefix="gemini-llm-maintenance"),
+    INGESTION: ThreadPoolExecutor(max_workers=GEMINI_LLM_BACKGROUND_CONCURRENCY, thread_name_prefix="gemini-llm-ingestion"),
+}
+
+
+async def run_blocking(fn, *args):
+    """
+    Run a blocking LLM helper (analyze_and_rerank, generate_stm_chunks, ...) off the event
+    loop, so queueing for a token never stalls other requests. Runs on the current priority
+    class's pool; the worker thread sees this request's deadline and priority.
+    """
+    loop = asyncio.get_running_loop()
+    executor = _llm_executors[current_priority()]
+    return await loop.run_in_executor(executor, contextvars.copy_context().run, fn, *args)
@@ -0,0 +1,93 @@
+"""
+Corpus Generation
+A counter bumped whenever searchable data changes (profile ingest, STM evaluation).
+Result caches include it in their keys, so entries from before a write simply stop
+matching. Other processes pick up a bump within GENERATION_REFRESH_SECONDS.
+"""
+
+import os
+import time
+import threading
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.api.utils.database import get_db_connection
+
+GENERATION_REFRESH_SECONDS = float(os.getenv("GENERATION_REFRESH_SECONDS", "5"))
+
+_lock = threading.Lock()
+_generation = 0
+_checked_at = 0.0
+
+
+def get_generation() -> int:
+    """Current corpus generation, re-read from Postgres at most every GENERATION_REFRESH_SECONDS"""
+    global _generation, _checked_at
+    if time.time() - _checked_at < GENERATION_REFRESH_SECONDS:
+        return _generation
+    with _lock:
+        if time.time() - _checked_at < GENERATION_REFRESH_SECONDS:
+            return _generation
+        try:
+            conn = get_db_connection()
+            try:
+                cur = conn.cursor()
+                cur.execute("SELECT generation FROM corpus_generation")
+                row = cur.fetchone()
+                cur.close()
+            finally:
+                conn.close()
+            if row:
+                _generation = max(_generation, int(row[0]))
+        except Exception as e:
+            print(f"Error reading corpus generation: {e}")
+        _checked_at = time.time()
+        return _generation
+
+
+async def aget_generation() -> int:
+    """get_generation for async callers: a due refresh reads Postgres in the threadpool, not on the event loop"""
+    if time.time() - _checked_at < GENERATION_REFRESH_SECONDS:
+        return _generation
+    return await run_in_threadpool(get_generation)
+
+
+def bump_generation(cur=None) -> int:
+    """
+    Advance the generation. Pass the writer's cursor to bump atomically with its
+    transaction; otherwise the bump is committed on a connection of its own.
+    """
+    global _generation, _checked_at
+    if cur is not None:
+        cur.execute("""
+            UPDATE corpus_generation
+            SET generation = generation + 1, updated_at = CURRENT_TIMESTAMP
+            RETURNING generation
+        """)
+        row = cur.fetchone()
+        # Not visible until the writer commits: re-read instead of adopting it locally,
+        # otherwise readers could cache pre-commit data under the new generation
+        with _lock:
+            _checked_at = 0.0
+        if not row:
+            return _generation
+        return int(row["generation"] if isinstance(row, dict) else row[0])
+
+    conn = get_db_connection()
+    try:
+        own_cur = conn.cursor()
+        own_cur.execute("""
+            UPDATE corpus_generation
+            SET generation = generation + 1, updated_at = CURRENT_TIMESTAMP
+            RETURNING generation
+        """)
+        row = own_cur.fetchone()
+        conn.commit()
+        own_cur.close()
+    finally:
+        conn.close()
+    with _lock:
+        if row:
+            _generation = max(_generation, int(row[0]))
+        _checked_at = time.time()
+    return _generation
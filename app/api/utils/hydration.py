@@ -0,0 +1,64 @@
+"""
+Result Hydration
+Ranked lists are stored compactly (ids, scores, reasons) by pagination and the
+query cache, and turned back into display rows with one batched query.
+"""
+
+from typing import Any, Dict, List
+from app.api.utils.database import execute_query
+from app.api.utils.nlp import highlight_matches
+from app.api.utils.profile_index import card_metadata
+
+# Small per-result fields kept alongside ids so hydrated results keep their explanations
+RANKED_FIELDS = ("score", "match_reason", "ai_reasoning", "matched_keywords", "matched_entities")
+
+
+def compact_ranked(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Strip results down to {"id", score/reason fields}; text and metadata are re-read on hydration"""
+    items = []
+    for res in results:
+        item = {"id": str(res["id"])}
+        for field in RANKED_FIELDS:
+            if field in res:
+                item[field] = res[field]
+        # highlighted_text is a full copy of the text; keep a flag and rebuild it on hydration
+        if res.get("highlighted_text"):
+            item["highlighted"] = True
+        items.append(item)
+    return items
+
+
+def hydrate_profiles(ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch current text + card-merged metadata for the given ids, keyed by str(id)"""
+    if not ids:
+        return {}
+    rows = execute_query("""
+        SELECT id, text, metadata, profile_card
+        FROM student_profiles
+        WHERE id = ANY(%s::uuid[])
+    """, (list(ids),))
+    return {
+        str(row['id']): {
+            "id": str(row['id']),
+            "text": row['text'],
+            "metadata": card_metadata(row),
+        }
+        for row in rows
+    }
+
+
+def hydrate_ranked(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Merge compact ranked entries ({"id", "score", ...reasons}) with fresh profile rows,
+    preserving rank order and dropping ids that no longer exist.
+    """
+    profiles = hydrate_profiles([item["id"] for item in items])
+    hydrated = []
+    for item in items:
+        profile = profiles.get(str(item["id"]))
+        if profile:
+            result = {**profile, **item, "id": profile["id"]}
+            if result.pop("highlighted", False):
+                result["highlighted_text"] = highlight_matches(profile["text"], item.get("matched_keywords") or [])
+            hydrated.append(result)
+    return hydrated
@@ -2,6 +2,16 @@ import os
 import google.generativeai as genai
 import json
 from typing import List, Dict, Any
+from app.api.utils import deadline
+from app.api.utils.gemini_scheduler import generate_content
+from app.api.utils.llm_cache import llm_cache
+
+# Query understanding results are cached per (prompt version, model):
+# bump a version whenever its prompt or output format changes
+QUERY_MODEL = "gemini-pro"
+QUERY_PLAN_PROMPT_VERSION = "query-plan-v1"
+
+SEARCH_TOOLS = ("vector", "keyword", "pattern", "filter")
 
 # Configure Gemini API
 if os.environ.get("GOOGLE_API_KEY"):
@@ -10,7 +20,11 @@ if os.environ.get("GOOGLE_API_KEY"):
 def analyze_and_rerank(query: str, candidates: List[Dict[str, Any]], top_k: int = 10) -> List[Dict[str, Any]]:
     """
     Use Gemini Pro to analyze candidates and re-rank them based on the query.
+    Falls back to the retrieval order (marking "rerank" degraded) when the request deadline
+    leaves no room for the LLM or the call fails.
     """
+    if not deadline.has_budget_for_llm("rerank"):
+        return candidates[:top_k]
     try:
         model = genai.GenerativeModel('gemini-pro')
         
@@ -63,7 +77,7 @@ def analyze_and_rerank(query: str, candidates: List[Dict[str, Any]], top_k: int
         Ensure the output is valid JSON. Do not include markdown formatting like ```json.
         """
 
-        response = model.generate_content(prompt)
+        response = generate_content(model, prompt)
         
         # Clean response text (remove markdown if present)
         text = response.text.strip()
@@ -92,18 +106,55 @@ def analyze_and_rerank(query: str, candidates: List[Dict[str, Any]], top_k: int
 
     except Exception as e:
         print(f"Error in Agentic Search: {e}")
+        # Retrieval order isn't an LLM ranking; degraded results are never cached
+        deadline.mark_degraded("rerank")
         # Fallback: return original candidates
         return candidates[:top_k]
 
-def decide_search_tool(query: str) -> Dict[str, Any]:
+def _fallback_plan(query: str, reason: str) -> Dict[str, Any]:
+    return {
+        "rewritten_query": query,
+        "filters": {},
+        "tool": "vector",
+        "parameters": {"query": query},
+        "reasoning": f"Fallback: Original query and Vector Search used ({reason}).",
+        # Never cached; tells consumers this isn't an LLM decision
+        "fallback": True,
+    }
+
+def _validate_plan(query: str, plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill in missing fields and reject unknown tools, so consumers can index the plan directly"""
+    tool = plan.get("tool")
+    if tool not in SEARCH_TOOLS:
+        tool = "vector"
+    parameters = plan.get("parameters") if isinstance(plan.get("parameters"), dict) else {}
+    filters = plan.get("filters") if isinstance(plan.get("filters"), dict) else {}
+    return {
+        "rewritten_query": plan.get("rewritten_query") or query,
+        "filters": filters,
+        "tool": tool,
+        "parameters": parameters,
+        "reasoning": plan.get("reasoning", ""),
+    }
+
+def plan_query(query: str) -> Dict[str, Any]:
     """
-    Decide which search tool to use based on the query.
-    Returns: {"tool": "vector"|"keyword"|"pattern"|"filter", "parameters": {...}, "reasoning": "..."}
+    Query planner: one LLM call that both analyzes the query (rewrite, filters) and picks the search tool.
+    Returns: {"rewritten_query": "...", "filters": {...}, "tool": "vector"|"keyword"|"pattern"|"filter",
+              "parameters": {...}, "reasoning": "..."}
+    Served from the LLM result cache, so /compare and both agentic strategies share one plan per query.
     """
+    cached = llm_cache.get("query_plan", query, QUERY_PLAN_PROMPT_VERSION, QUERY_MODEL)
+    if cached is not None:
+        return cached
+    if not deadline.has_budget_for_llm("query_planning"):
+        return _fallback_plan(query, "request deadline too close")
     try:
-        model = genai.GenerativeModel('gemini-pro')
+        model = genai.GenerativeModel(QUERY_MODEL)
         prompt = f"""
-        You are an intelligent search router. Your goal is to select the best search tool for the user's query.
+        You are the query planner of a candidate search engine. Analyze the user's query and plan how to search for it.
+
+        User Query: "{query}"
 
         Available Tools:
         1. "vector": Best for semantic queries, describing skills, roles, or general concepts (e.g., "python developer with cloud experience").
@@ -111,54 +162,14 @@ def decide_search_tool(query: str) -> Dict[str, Any]:
         3. "pattern": Best for finding structured patterns like emails or phone numbers (e.g., "email for...", "phone number of...").
         4. "filter": Best when the query explicitly asks for a specific role or skill without much else (e.g., "Role: Developer", "Skills: Python").
 
-        User Query: "{query}"
-
-        Instructions:
-        1. Analyze the query intent.
-        2. Select the single best tool.
-        3. Extract necessary parameters for that tool.
-           - For "pattern", extract "pattern_type" ("email" or "phone") or "custom_pattern".
-           - For "filter", extract "role" and "skills" (list).
-           - For "vector" and "keyword", just use the query.
-        4. Provide a reasoning for your choice.
-
-        Output JSON:
-        {{
-            "tool": "tool_name",
-            "parameters": {{ ... }},
-            "reasoning": "Explanation..."
-        }}
-        """
-        
-        response = model.generate_content(prompt)
-        text = response.text.strip()
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.endswith("```"):
-            text = text[:-3]
-            
-        return json.loads(text)
-    except Exception as e:
-        print(f"Error in decide_search_tool: {e}")
-        # Fallback to vector search
-        return {"tool": "vector", "parameters": {"query": query}, "reasoning": "Fallback to Vector Search due to error."}
-
-def analyze_query_intent(query: str) -> Dict[str, Any]:
-    """
-    Analyze query to extract filters and rewrite for better retrieval.
-    Returns: {"rewritten_query": "...", "filters": {"role": "...", "skills": [...]}, "reasoning": "..."}
-    """
-    try:
-        model = genai.GenerativeModel('gemini-pro')
-        prompt = f"""
-        You are a query understanding engine. Your goal is to optimize the user's search query.
-
-        User Query: "{query}"
-
         Instructions:
         1. Extract any specific filters (Role, Skills, Location, Experience) mentioned in the query.
         2. Rewrite the query to be more effective for a semantic search engine (remove noise, focus on key concepts).
-        3. Provide a reasoning for your analysis.
+        3. Select the single best tool and extract its parameters.
+           - For "pattern", extract "pattern_type" ("email", "phone", "linkedin", "github" or "url") or "custom_pattern".
+           - For "filter", extract "role" and "skills" (list).
+           - For "vector" and "keyword", set "query" (the original query for exact names, otherwise the rewritten one).
+        4. Provide a reasoning covering both the rewrite and the tool choice.
 
         Output JSON:
         {{
@@ -168,18 +179,24 @@ def analyze_query_intent(query: str) -> Dict[str, Any]:
                 "skills": ["skill1", "skill2"],
                 "location": "extracted location or null"
             }},
+            "tool": "tool_name",
+            "parameters": {{ ... }},
             "reasoning": "Explanation..."
         }}
         """
-        
-        response = model.generate_content(prompt)
+
+        response = generate_content(model, prompt)
         text = response.text.strip()
         if text.startswith("```json"):
             text = text[7:]
         if text.endswith("```"):
             text = text[:-3]
-            
-        return json.loads(text)
+
+        plan = _validate_plan(query, json.loads(text))
+        llm_cache.put("query_plan", query, QUERY_PLAN_PROMPT_VERSION, QUERY_MODEL, plan)
+        return plan
     except Exception as e:
-        print(f"Error in analyze_query_intent: {e}")
-        return {"rewritten_query": query, "filters": {}, "reasoning": "Fallback: Original query used."}
+        print(f"Error in plan_query: {e}")
+        # The vector fallback isn't an LLM plan; degraded results are never cached
+        deadline.mark_degraded("query_planning")
+        return _fallback_plan(query, "error")
@@ -0,0 +1,150 @@
+"""
+LLM Result Cache
+Structured query-understanding outputs (plan_query) keyed by
+(task, normalized query, prompt template version, model), so a query seen before skips
+the Gemini round trip. The query is normalized with normalize_query_text, which keeps word
+order and symbols ("C++", ".NET"), since the LLM's answer depends on both:
+- L1: in-process LRU with the entry's expiry
+- L2: llm_query_cache table, shared across processes and restarts
+Bumping a prompt version or switching models simply stops old entries from matching.
+Stores and hit counts are written behind; hits/last_hit_at make the table the query log
+that warm_llm_cache.py replays.
+"""
+
+import os
+import copy
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.api.utils.caching import normalize_query_text
+from app.api.utils.database import execute_query, get_db_connection
+from app.api.utils.metrics import metrics
+from app.api.utils.write_behind import WriteBehindQueue
+
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_L1_SIZE = int(os.getenv("LLM_CACHE_L1_SIZE", "4096"))
+
+# (task, normalized query, prompt version, model)
+LLMCacheKey = Tuple[str, str, str, str]
+
+
+def llm_cache_key(task: str, query: str, prompt_version: str, model: str) -> LLMCacheKey:
+    return (task, normalize_query_text(query), prompt_version, model)
+
+
+class LLMResultCache:
+    def __init__(self, max_entries: int = LLM_CACHE_L1_SIZE, ttl: int = LLM_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[LLMCacheKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Hits not yet added to llm_query_cache.hits
+        self._pending_hits: Dict[LLMCacheKey, int] = {}
+
+    def _remember(self, key: LLMCacheKey, expires_at: float, result: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = (expires_at, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _from_memory(self, key: LLMCacheKey) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _from_db(self, key: LLMCacheKey) -> Optional[Dict[str, Any]]:
+        rows = execute_query("""
+            SELECT result, EXTRACT(EPOCH FROM expires_at) AS expires_at
+            FROM llm_query_cache
+            WHERE task = %s AND query_norm = %s AND prompt_version = %s AND model = %s
+              AND expires_at > NOW()
+        """, key)
+        if not rows:
+            return None
+        self._remember(key, float(rows[0]['expires_at']), rows[0]['result'])
+        return rows[0]['result']
+
+    def _count_hit(self, key: LLMCacheKey):
+        with self._lock:
+            self._pending_hits[key] = self._pending_hits.get(key, 0) + 1
+        llm_cache_writes.put(("hit",) + key, {"op": "hit", "key": key})
+
+    def take_hits(self, key: LLMCacheKey) -> int:
+        with self._lock:
+            return self._pending_hits.pop(key, 0)
+
+    def get(self, task: str, query: str, prompt_version: str, model: str) -> Optional[Dict[str, Any]]:
+        """A copy of the cached result, or None"""
+        key = llm_cache_key(task, query, prompt_version, model)
+        result = self._from_memory(key)
+        if result is not None:
+            metrics.incr(f"llm_cache.l1_hits.{task}")
+        else:
+            result = self._from_db(key)
+            if result is None:
+                metrics.incr(f"llm_cache.misses.{task}")
+                return None
+            metrics.incr(f"llm_cache.l2_hits.{task}")
+        self._count_hit(key)
+        return copy.deepcopy(result)
+
+    def peek(self, task: str, query: str, prompt_version: str, model: str) -> Optional[Dict[str, Any]]:
+        """L1-only lookup that doesn't count as a hit (for shadow comparisons)"""
+        return self._from_memory(llm_cache_key(task, query, prompt_version, model))
+
+    def put(self, task: str, query: str, prompt_version: str, model: str, result: Dict[str, Any]):
+        key = llm_cache_key(task, query, prompt_version, model)
+        result = copy.deepcopy(result)
+        expires_at = time.time() + self.ttl
+        self._remember(key, expires_at, result)
+        metrics.incr(f"llm_cache.stores.{task}")
+        llm_cache_writes.put(("store",) + key, {
+            "op": "store", "key": key, "query": query, "result": result, "expires_at": expires_at,
+        })
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _flush_llm_cache_writes(pending: List[Dict[str, Any]]):
+    """Write-behind flush: upsert stored results and add hit counts, in one transaction"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            for write in pending:
+                if write["op"] == "store":
+                    cur.execute("""
+                        INSERT INTO llm_query_cache (task, query_norm, prompt_version, model, query_text, result, expires_at)
+                        VALUES (%s, %s, %s, %s, %s, %s, TO_TIMESTAMP(%s))
+                        ON CONFLICT (task, query_norm, prompt_version, model) DO UPDATE
+                        SET query_text = EXCLUDED.query_text, result = EXCLUDED.result,
+                            created_at = NOW(), expires_at = EXCLUDED.expires_at
+                    """, write["key"] + (write["query"], json.dumps(write["result"]), write["expires_at"]))
+                else:
+                    hits = llm_cache.take_hits(write["key"])
+                    if hits:
+                        cur.execute("""
+                            UPDATE llm_query_cache SET hits = hits + %s, last_hit_at = NOW()
+                            WHERE task = %s AND query_norm = %s AND prompt_version = %s AND model = %s
+                        """, (hits,) + write["key"])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+llm_cache = LLMResultCache()
+llm_cache_writes = WriteBehindQueue("llm_cache", _flush_llm_cache_writes)
@@ -0,0 +1,92 @@
+"""
+In-process Metrics
+Lightweight counters, gauges and summaries exposed at /api/debug/metrics.
+"""
+
+import random
+import threading
+from typing import Any, Dict, List
+
+# Observations kept per summary for percentile estimates
+RESERVOIR_SIZE = 512
+
+
+class _Summary:
+    """Running count/sum/min/max plus a reservoir sample for p50/p95"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.samples: List[float] = []
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(value)
+        else:
+            idx = random.randint(0, self.count - 1)
+            if idx < RESERVOIR_SIZE:
+                self.samples[idx] = value
+
+    def percentile(self, pct: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[idx]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 3) if self.count else 0.0,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+        }
+
+
+class Metrics:
+    """Thread-safe registry; names are free-form, e.g. 'payload_bytes./keyword'"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, Any] = {}
+        self._summaries: Dict[str, _Summary] = {}
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: Any):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            summary = self._summaries.get(name)
+            if summary is None:
+                summary = self._summaries[name] = _Summary()
+            summary.observe(value)
+
+    def percentile(self, name: str, pct: float, default: float = 0.0) -> float:
+        with self._lock:
+            summary = self._summaries.get(name)
+            return summary.percentile(pct) if summary and summary.count else default
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "summaries": {name: s.to_dict() for name, s in self._summaries.items()},
+            }
+
+
+metrics = Metrics()
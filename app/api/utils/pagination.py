@@ -0,0 +1,154 @@
+"""
+Cursor Pagination
+Ranked result lists (ids + scores + reasons) are cached in-process for a short TTL
+under an opaque cursor. Later pages are served from that list with batched
+hydration of only the page's rows; pages past the cached depth re-run the
+strategy once with a deeper limit and append the new ids.
+"""
+
+import os
+import json
+import time
+import base64
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from app.api.utils.hydration import compact_ranked, hydrate_ranked
+from app.api.utils.metrics import metrics
+from app.api.utils.result_cache import normalize_params
+
+CURSOR_TTL_SECONDS = int(os.getenv("PAGINATION_CURSOR_TTL", "300"))
+MAX_CACHED_LISTS = int(os.getenv("PAGINATION_MAX_LISTS", "1000"))
+PREFETCH_PAGES = int(os.getenv("PAGINATION_PREFETCH_PAGES", "3"))
+MAX_DEPTH = int(os.getenv("PAGINATION_MAX_DEPTH", "500"))
+
+
+class RankedListCache:
+    """Bounded, TTL'd map of cursor key -> ranked list state"""
+
+    def __init__(self, ttl: int = CURSOR_TTL_SECONDS, max_entries: int = MAX_CACHED_LISTS):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, entry: Dict[str, Any]) -> str:
+        key = secrets.token_urlsafe(12)
+        entry["expires_at"] = time.time() + self.ttl
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return key
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires_at"] < time.time():
+                del self._entries[key]
+                return None
+            # Sliding TTL while the client keeps paging
+            entry["expires_at"] = time.time() + self.ttl
+            self._entries.move_to_end(key)
+            return entry
+
+
+ranked_lists = RankedListCache()
+
+
+def encode_cursor(key: str, offset: int, strategy: str) -> str:
+    raw = json.dumps({"k": key, "o": offset, "s": strategy}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def request_fingerprint(request) -> str:
+    """Ranking params a cursor was issued for; limit is ignored since the cached list sets the depth"""
+    params = normalize_params({"request": request})
+    params.pop("limit", None)
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+async def _run(endpoint: Callable, request, limit: int) -> Dict[str, Any]:
+    deeper = request.copy(update={"limit": limit, "cursor": None, "page_size": None})
+    return await endpoint(request=deeper)
+
+
+async def paginate(endpoint: Callable, request, strategy: str) -> Dict[str, Any]:
+    """Serve one page of `endpoint`'s ranking, starting a new cursor or continuing one"""
+    if request.cursor:
+        state = decode_cursor(request.cursor)
+        if state.get("s") != strategy:
+            raise HTTPException(status_code=400, detail="Cursor belongs to a different strategy")
+        entry = ranked_lists.get(state.get("k", ""))
+        if entry is None:
+            raise HTTPException(status_code=410, detail="Cursor expired, re-run the search")
+        if entry["params"] != request_fingerprint(request):
+            raise HTTPException(status_code=400, detail="Cursor belongs to a different request")
+        key, offset = state["k"], int(state.get("o", 0))
+        page_size = request.page_size or entry["page_size"]
+        extra = {}
+
+        # Extend the cached list once if this page runs past what we've ranked so far
+        if offset + page_size > len(entry["items"]) and not entry["exhausted"]:
+            depth = min(max(entry["depth"] * 2, offset + page_size), MAX_DEPTH)
+            payload = await _run(endpoint, entry["request"], depth)
+            results = payload.get("results") if isinstance(payload, dict) else None
+            if isinstance(results, list):
+                seen = {item["id"] for item in entry["items"]}
+                entry["items"].extend(i for i in compact_ranked(results) if i["id"] not in seen)
+                entry["exhausted"] = len(results) < depth or depth >= MAX_DEPTH
+                entry["depth"] = depth
+            metrics.incr("pagination.extensions")
+
+        page = hydrate_ranked(entry["items"][offset:offset + page_size])
+        metrics.incr("pagination.cached_pages")
+    else:
+        # First page: rank a few pages deep so the next ones come straight from the cache
+        page_size = request.page_size
+        offset = 0
+        depth = min(max(request.limit, page_size * PREFETCH_PAGES), MAX_DEPTH)
+        payload = await _run(endpoint, request, depth)
+        results = payload.get("results") if isinstance(payload, dict) else None
+        if not isinstance(results, list):
+            # e.g. /compare's dict of lists: nothing to page over
+            return payload
+        entry = {
+            "request": request.copy(update={"cursor": None, "page_size": None}),
+            "params": request_fingerprint(request),
+            "items": compact_ranked(results),
+            "depth": depth,
+            "page_size": page_size,
+            "exhausted": len(results) < depth,
+        }
+        key = ranked_lists.put(entry)
+        page = results[:page_size]
+        extra = {k: v for k, v in payload.items() if k != "results"}
+        metrics.incr("pagination.first_pages")
+
+    next_offset = offset + page_size
+    has_more = next_offset < len(entry["items"]) or not entry["exhausted"]
+    return {
+        **extra,
+        "results": page,
+        "next_cursor": encode_cursor(key, next_offset, strategy) if has_more else None,
+        "page": {
+            "offset": offset,
+            "page_size": page_size,
+            "ranked": len(entry["items"]),
+            "exhausted": entry["exhausted"],
+        },
+    }
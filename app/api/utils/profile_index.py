@@ -0,0 +1,295 @@
+"""
+Profile Indexing
+Derives structured, indexable columns from a student profile once, at ingest time,
+so search routes can use index-friendly predicates instead of regex scans, and
+read a persisted profile_card instead of re-parsing text on every request.
+"""
+
+import re
+import json
+from typing import Any, Dict, List, Optional
+from app.api.utils.nlp import extract_candidate_info
+from app.api.utils.generation import bump_generation
+
+# Entities extracted once at ingest into profile_entities, keyed by /pattern's pattern_type.
+# email/phone match the regexes /pattern has always used, so results are unchanged.
+ENTITY_PATTERNS = {
+    "email": re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"),
+    "phone": re.compile(r"\b\d{3}[-.]?\d{3}[-.]?\d{4}\b"),
+    "linkedin": re.compile(r"(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/[^\s\"'<>,)]+", re.IGNORECASE),
+    "github": re.compile(r"(?:https?://)?(?:www\.)?github\.com/[^\s\"'<>,)]+", re.IGNORECASE),
+    "url": re.compile(r"https?://[^\s\"'<>,)]+", re.IGNORECASE),
+}
+
+
+def normalize_term(value: Optional[str]) -> str:
+    """Lowercase and collapse whitespace so filters compare like with like"""
+    if not value:
+        return ""
+    return re.sub(r'\s+', ' ', str(value)).strip().lower()
+
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input only ever matches literally"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def normalize_skill_names(name: str) -> List[str]:
+    """
+    Normalize a skill name into its indexed forms.
+    "Python (Tkinter)" -> ["python (tkinter)", "python"], so a filter on "python"
+    still matches qualified skills the way the old substring regex did.
+    """
+    full = normalize_term(name)
+    if not full:
+        return []
+    names = [full]
+    base = normalize_term(re.sub(r'\(.*?\)', '', full))
+    if base and base != full:
+        names.append(base)
+    return names
+
+
+def parse_profile_json(text: str) -> Dict[str, Any]:
+    """Most profiles store the raw student JSON in the text column"""
+    if not text or not text.lstrip().startswith('{'):
+        return {}
+    try:
+        data = json.loads(text)
+        return data if isinstance(data, dict) else {}
+    except ValueError:
+        return {}
+
+
+def _split_top_level(value: str) -> List[str]:
+    """Split on commas that are not inside parentheses"""
+    parts, depth, current = [], 0, []
+    for ch in value:
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth = max(0, depth - 1)
+        if ch == ',' and depth == 0:
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(ch)
+    parts.append(''.join(current))
+    return [p.strip() for p in parts if p.strip()]
+
+
+def parse_skills_text(skills_text: str) -> Dict[str, Optional[float]]:
+    """
+    Parse "Skill (Domain: ... | Score), Skill 2 (Score)" style skill lines.
+    Returns {normalized_skill: score_or_None}.
+    """
+    skills: Dict[str, Optional[float]] = {}
+    if not skills_text:
+        return skills
+    # STM chunks prefix each domain group: "Skills-[Domain]: a (6), b (5)"
+    skills_text = re.sub(r'Skills(-[^:]*)?:', ',', skills_text)
+    for item in _split_top_level(skills_text):
+        name = item.split('(')[0]
+        score = None
+        details = re.search(r'\(([^()]*)\)\s*$', item)
+        if details:
+            numbers = re.findall(r'\d+(?:\.\d+)?', details.group(1).split('|')[-1])
+            if numbers:
+                score = float(numbers[-1])
+        for norm in normalize_skill_names(name):
+            skills[norm] = score
+    return skills
+
+
+def extract_skill_scores(text: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Optional[float]]:
+    """Collect skills with their scores from metadata, the JSON profile, or the Skills: line"""
+    metadata = metadata or {}
+    profile = parse_profile_json(text)
+
+    skill_items = metadata.get('skills') or profile.get('skills')
+    if isinstance(skill_items, list) and skill_items:
+        skills: Dict[str, Optional[float]] = {}
+        for item in skill_items:
+            if isinstance(item, dict):
+                name = item.get('tool_name') or item.get('name')
+                score = item.get('average_normalized_score')
+            else:
+                name, score = item, None
+            try:
+                score = float(score) if score is not None else None
+            except (TypeError, ValueError):
+                score = None
+            for norm in normalize_skill_names(name):
+                # Keep the best score when a base name is shared by several tools
+                if skills.get(norm) is None or (score is not None and score > skills[norm]):
+                    skills[norm] = score
+        return skills
+
+    skills_text = metadata.get('skills_text') or extract_candidate_info(text or '').get('skills_text', '')
+    return parse_skills_text(skills_text)
+
+
+def extract_role(text: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+    """Role from metadata, the JSON profile (branch), or the Role: line"""
+    metadata = metadata or {}
+    profile = parse_profile_json(text)
+    role = (
+        metadata.get('role')
+        or profile.get('role')
+        or profile.get('branch')
+        or metadata.get('branch')
+        or extract_candidate_info(text or '').get('role')
+    )
+    return normalize_term(role)
+
+
+def normalize_entity(entity_type: str, value: str) -> str:
+    """Canonical form used for lookups and de-duplication"""
+    if entity_type == "phone":
+        return re.sub(r'\D', '', value)
+    return value.strip().rstrip('/.').lower()
+
+
+def extract_entities(text: str) -> List[Dict[str, str]]:
+    """Find emails, phone numbers and profile links in a profile's text"""
+    entities = []
+    seen = set()
+    for entity_type, pattern in ENTITY_PATTERNS.items():
+        for match in pattern.finditer(text or ''):
+            value = match.group(0)
+            value_norm = normalize_entity(entity_type, value)
+            if not value_norm or (entity_type, value_norm) in seen:
+                continue
+            seen.add((entity_type, value_norm))
+            entities.append({"entity_type": entity_type, "value": value, "value_norm": value_norm})
+    return entities
+
+
+PROFILE_CARD_FIELDS = (
+    'name', 'role', 'location', 'email', 'experience', 'skills_text', 'projects_text', 'awards_text'
+)
+
+
+def _join_items(items, keys) -> str:
+    """Flatten a list of dicts/strings into a '; '-separated summary"""
+    if not isinstance(items, list):
+        return ""
+    parts = []
+    for item in items:
+        if isinstance(item, dict):
+            value = next((item.get(k) for k in keys if item.get(k)), None)
+            if value:
+                parts.append(str(value).strip())
+        elif item:
+            parts.append(str(item).strip())
+    return "; ".join(parts)
+
+
+def build_profile_card(text: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    """
+    Parse a profile once into the display fields every strategy returns.
+    Precedence: explicit metadata, then the JSON profile, then the Role:/Skills: text lines.
+    """
+    metadata = metadata or {}
+    profile = parse_profile_json(text)
+    extracted = extract_candidate_info(text or '') if not profile else {}
+
+    skills = profile.get('skills') or metadata.get('skills')
+    skills_text = ""
+    if isinstance(skills, list):
+        rendered = []
+        for s in skills:
+            if isinstance(s, dict) and s.get('tool_name'):
+                score = s.get('average_normalized_score')
+                rendered.append(f"{s['tool_name']} ({score})" if score is not None else s['tool_name'])
+            elif isinstance(s, str):
+                rendered.append(s)
+        skills_text = ", ".join(rendered)
+
+    semester = profile.get('semester')
+    candidates = {
+        # Older imports use capitalised keys and job_title
+        'name': profile.get('name') or profile.get('Name'),
+        'role': profile.get('role') or profile.get('Role') or profile.get('job_title') or profile.get('branch'),
+        'location': profile.get('location') or profile.get('Location') or profile.get('tenant_address'),
+        'email': profile.get('email') or profile.get('Email'),
+        'experience': f"Semester {semester}" if semester else None,
+        'skills_text': skills_text,
+        'projects_text': _join_items(profile.get('portfolios') or profile.get('projects'), ('title', 'name')),
+        'awards_text': _join_items(profile.get('events_participated') or profile.get('awards'), ('title', 'name')),
+    }
+
+    card = {}
+    for field in PROFILE_CARD_FIELDS:
+        value = metadata.get(field) or candidates.get(field) or extracted.get(field)
+        if value:
+            card[field] = str(value).strip()
+    return card
+
+
+def merge_profile_card(metadata: Optional[Dict[str, Any]], card: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fill display fields missing from metadata with the persisted profile_card"""
+    merged = dict(metadata or {})
+    for key, value in (card or {}).items():
+        if value and not merged.get(key):
+            merged[key] = value
+    return merged
+
+
+def card_metadata(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Display metadata for a student_profiles row selected with its profile_card.
+    Rows not yet indexed (profile_card NULL) are parsed on the fly when their text was selected;
+    an indexed profile with an empty card is never re-parsed.
+    """
+    card = row.get('profile_card')
+    if card is None and row.get('text'):
+        card = build_profile_card(row['text'], row.get('metadata'))
+    return merge_profile_card(row.get('metadata'), card)
+
+
+def build_index_fields(text: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Compute the indexed columns for one profile"""
+    skill_scores = extract_skill_scores(text, metadata)
+    return {
+        "role_norm": extract_role(text, metadata) or None,
+        "skills": sorted(skill_scores.keys()),
+        "skill_scores": {k: v for k, v in skill_scores.items() if v is not None},
+    }
+
+
+def index_profile(
+    cur,
+    profile_id: str,
+    text: str,
+    metadata: Optional[Dict[str, Any]] = None,
+    bump: bool = True
+) -> Dict[str, Any]:
+    """
+    Ingest hook: persist the structured columns for a profile.
+    Call this whenever student_profiles.text or metadata is written.
+    Bumps the corpus generation in the same transaction unless `bump` is False
+    (bulk writers bump once themselves).
+    """
+    fields = build_index_fields(text, metadata)
+    card = build_profile_card(text, metadata)
+    cur.execute("""
+        UPDATE student_profiles
+        SET role_norm = %s, skills = %s, skill_scores = %s, profile_card = %s
+        WHERE id = %s
+    """, (fields["role_norm"], fields["skills"], json.dumps(fields["skill_scores"]), json.dumps(card), profile_id))
+    fields["profile_card"] = card
+
+    # Replace the profile's entity rows wholesale so removed contacts disappear too
+    entities = extract_entities(text)
+    cur.execute("DELETE FROM profile_entities WHERE profile_id = %s", (profile_id,))
+    if entities:
+        cur.executemany("""
+            INSERT INTO profile_entities (profile_id, entity_type, value, value_norm)
+            VALUES (%s, %s, %s, %s)
+        """, [(profile_id, e["entity_type"], e["value"], e["value_norm"]) for e in entities])
+    fields["entities"] = entities
+
+    if bump:
+        bump_generation(cur)
+    return fields
@@ -0,0 +1,221 @@
+"""
+Local Query Router
+Picks the /agentic_tool search tool without an LLM call when the choice is obvious:
+1. Rules on surface features: literal emails/phones/URLs or "email of ..." -> pattern,
+   "Role:"/"Skills:" -> filter, a quoted or symbol-bearing exact term ("C++") -> keyword
+2. A multinomial naive Bayes classifier over query tokens and shape features, trained by
+   train_query_router.py from logged LLM tool decisions (llm_query_cache)
+Only a decision at or above QUERY_ROUTER_MIN_CONFIDENCE is used; otherwise the LLM query
+plan decides, and the router's guess is scored against it (query_router.agreed/compared).
+"""
+
+import os
+import re
+import json
+import math
+import time
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.api.utils.metrics import metrics
+from app.api.utils.nlp import tokenize_query
+from app.api.utils.profile_index import ENTITY_PATTERNS
+
+QUERY_ROUTER_ENABLED = os.getenv("QUERY_ROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+QUERY_ROUTER_MIN_CONFIDENCE = float(os.getenv("QUERY_ROUTER_MIN_CONFIDENCE", "0.85"))
+QUERY_ROUTER_MODEL_PATH = os.getenv(
+    "QUERY_ROUTER_MODEL_PATH",
+    str(Path(__file__).resolve().parent.parent.parent / "data" / "query_router.json")
+)
+
+# Explicit contact lookups ("email of the react developer", "phone number for Priya").
+# Bare words don't count: "mobile app developer", "github expert" and "website developer"
+# ask for people, not contact details.
+_OF = r"\s+(?:of|for)\b"
+CONTACT_PHRASES = [
+    (re.compile(r"\be-?mails?(?:\s+(?:address(?:es)?|ids?))?" + _OF + r"|\be-?mail\s+address(?:es)?\b", re.IGNORECASE), "email"),
+    (re.compile(r"\bcontact(?:\s+(?:details|info|information))?" + _OF, re.IGNORECASE), "email"),
+    (re.compile(r"\b(?:phone|mobile|contact|cell)\s+(?:numbers?|nos?\.?)\b|\bphones?" + _OF, re.IGNORECASE), "phone"),
+    (re.compile(r"\blinkedin(?:\s+(?:profiles?|urls?|links?|handles?))?" + _OF, re.IGNORECASE), "linkedin"),
+    (re.compile(r"\bgithub\s+(?:profiles?|urls?|links?|handles?|accounts?)" + _OF, re.IGNORECASE), "github"),
+    # "for" alone often states a purpose here ("websites for startups"): only "of" or "link for"
+    (re.compile(r"\b(?:websites?|portfolios?|urls?)\s+of\b|\b(?:website|portfolio)\s+(?:links?|urls?)" + _OF, re.IGNORECASE), "url"),
+]
+FIELD_PREFIX = re.compile(r"\b(role|skills?)\s*:\s*([^:]+?)(?=\s+\b(?:role|skills?)\s*:|$)", re.IGNORECASE)
+QUOTED = re.compile(r"^\s*[\"']([^\"']+)[\"']\s*$")
+# Terms whose punctuation is meaningful and lost by tokenization: C++, C#, .NET, node.js.
+# Needs a letter and a + / # or a dot before a letter, so "3.5", "." and "v1.2" don't qualify
+SYMBOL_TERM = re.compile(r"^(?=.*[A-Za-z])(?=.*(?:[+#]|\.[A-Za-z]))\s*[\w.]*[+#.][\w.+#]*\s*$")
+
+
+def _decision(tool: str, parameters: Dict[str, Any], confidence: float, source: str, reasoning: str) -> Dict[str, Any]:
+    return {
+        "tool": tool,
+        "parameters": parameters,
+        "confidence": round(confidence, 4),
+        "source": source,
+        "reasoning": f"Local router ({source}, confidence {confidence:.2f}): {reasoning}",
+    }
+
+
+def apply_rules(query: str) -> Optional[Dict[str, Any]]:
+    for entity_type in ("email", "linkedin", "github", "url", "phone"):
+        match = ENTITY_PATTERNS[entity_type].search(query)
+        if match:
+            return _decision("pattern", {"custom_pattern": re.escape(match.group(0))}, 0.99, "rules",
+                             f"query contains a literal {entity_type}")
+
+    fields = FIELD_PREFIX.findall(query)
+    if fields:
+        parameters: Dict[str, Any] = {"role": None, "skills": []}
+        for name, value in fields:
+            if name.lower() == "role":
+                parameters["role"] = value.strip()
+            else:
+                parameters["skills"] = [s.strip() for s in re.split(r"[,/]", value) if s.strip()]
+        return _decision("filter", parameters, 0.95, "rules", "explicit Role:/Skills: fields")
+
+    pattern_types = {pattern_type for phrase, pattern_type in CONTACT_PHRASES if phrase.search(query)}
+    if len(pattern_types) == 1:
+        pattern_type = pattern_types.pop()
+        return _decision("pattern", {"pattern_type": pattern_type}, 0.9, "rules", f"asks for {pattern_type} details")
+
+    quoted = QUOTED.match(query)
+    if quoted:
+        return _decision("keyword", {"query": quoted.group(1)}, 0.95, "rules", "quoted exact term")
+    if SYMBOL_TERM.match(query):
+        return _decision("keyword", {"query": query.strip()}, 0.9, "rules", "exact term with symbols")
+    return None
+
+
+def query_features(query: str) -> List[str]:
+    """Classifier features: stop-word-free tokens plus coarse shape features"""
+    words = tokenize_query(query)
+    raw = query.split()
+    features = [f"w:{w}" for w in words]
+    features.append(f"len:{min(len(words), 6)}")
+    if raw and all(w[:1].isupper() for w in raw):
+        features.append("shape:all_capitalized")
+    if any(ch.isdigit() for ch in query):
+        features.append("shape:digit")
+    if ":" in query:
+        features.append("shape:colon")
+    if re.search(r"[+#@/]", query):
+        features.append("shape:symbol")
+    return features
+
+
+class NaiveBayesRouter:
+    """Multinomial naive Bayes with Laplace smoothing; model is plain JSON (see train_query_router.py)"""
+
+    def __init__(self, model: Dict[str, Any]):
+        self.classes: List[str] = model["classes"]
+        self.log_priors: Dict[str, float] = model["log_priors"]
+        self.log_likelihoods: Dict[str, Dict[str, float]] = model["log_likelihoods"]
+        self.log_unseen: Dict[str, float] = model["log_unseen"]
+        self.vocabulary = set(model["vocabulary"])
+
+    @classmethod
+    def train(cls, examples: List[Dict[str, str]], alpha: float = 1.0) -> Dict[str, Any]:
+        """examples: [{"query": ..., "tool": ...}] -> model dict"""
+        counts: Dict[str, Dict[str, int]] = {}
+        docs: Dict[str, int] = {}
+        vocabulary = set()
+        for example in examples:
+            tool = example["tool"]
+            docs[tool] = docs.get(tool, 0) + 1
+            class_counts = counts.setdefault(tool, {})
+            for feature in query_features(example["query"]):
+                class_counts[feature] = class_counts.get(feature, 0) + 1
+                vocabulary.add(feature)
+        classes = sorted(docs)
+        total_docs = sum(docs.values())
+        model = {"classes": classes, "log_priors": {}, "log_likelihoods": {}, "log_unseen": {},
+                 "vocabulary": sorted(vocabulary), "examples": total_docs}
+        for tool in classes:
+            total = sum(counts[tool].values()) + alpha * len(vocabulary)
+            model["log_priors"][tool] = math.log(docs[tool] / total_docs)
+            model["log_likelihoods"][tool] = {f: math.log((c + alpha) / total) for f, c in counts[tool].items()}
+            model["log_unseen"][tool] = math.log(alpha / total)
+        return model
+
+    def predict(self, query: str) -> Dict[str, float]:
+        """Posterior probability per tool"""
+        features = [f for f in query_features(query) if f in self.vocabulary]
+        scores = {}
+        for tool in self.classes:
+            likelihoods = self.log_likelihoods[tool]
+            unseen = self.log_unseen[tool]
+            scores[tool] = self.log_priors[tool] + sum(likelihoods.get(f, unseen) for f in features)
+        top = max(scores.values())
+        exp = {tool: math.exp(score - top) for tool, score in scores.items()}
+        norm = sum(exp.values())
+        return {tool: value / norm for tool, value in exp.items()}
+
+
+_classifier: Optional[NaiveBayesRouter] = None
+_classifier_loaded = False
+
+
+def get_classifier() -> Optional[NaiveBayesRouter]:
+    """The trained classifier, loaded once; None (rules only) if no model file exists"""
+    global _classifier, _classifier_loaded
+    if not _classifier_loaded:
+        _classifier_loaded = True
+        try:
+            with open(QUERY_ROUTER_MODEL_PATH) as f:
+                _classifier = NaiveBayesRouter(json.load(f))
+            print(f"DEBUG: Loaded query router model ({QUERY_ROUTER_MODEL_PATH})")
+        except FileNotFoundError:
+            print("DEBUG: No query router model; routing with rules only")
+        except Exception as e:
+            print(f"Query router model failed to load: {e}")
+    return _classifier
+
+
+def _classify(query: str) -> Optional[Dict[str, Any]]:
+    classifier = get_classifier()
+    if classifier is None:
+        return None
+    posterior = classifier.predict(query)
+    tool = max(posterior, key=posterior.get)
+    confidence = posterior[tool]
+    # The classifier picks a tool but can't extract pattern/filter parameters: leave those to the LLM
+    if tool not in ("vector", "keyword"):
+        confidence = 0.0
+    return _decision(tool, {"query": query}, confidence, "classifier", f"learned from past tool decisions ({tool})")
+
+
+def route_query(query: str) -> Optional[Dict[str, Any]]:
+    """
+    Best local guess: {"tool", "parameters", "confidence", "source", "reasoning"}, or None when
+    neither rules nor classifier have an opinion. Callers act on it only if confident().
+    """
+    start = time.perf_counter()
+    decision = apply_rules(query) or _classify(query)
+    metrics.observe("query_router.route_us", (time.perf_counter() - start) * 1e6)
+    return decision
+
+
+def confident(decision: Optional[Dict[str, Any]]) -> bool:
+    return QUERY_ROUTER_ENABLED and decision is not None and decision["confidence"] >= QUERY_ROUTER_MIN_CONFIDENCE
+
+
+_agreement = {"compared": 0, "agreed": 0}
+_agreement_lock = threading.Lock()
+
+
+def record_agreement(decision: Optional[Dict[str, Any]], llm_tool: str, band: str):
+    """Score the router's guess against an LLM decision; band is "confident" or "fallback" """
+    if decision is None:
+        return
+    agreed = decision["tool"] == llm_tool
+    metrics.incr(f"query_router.compared.{band}")
+    if agreed:
+        metrics.incr(f"query_router.agreed.{band}")
+    with _agreement_lock:
+        _agreement["compared"] += 1
+        _agreement["agreed"] += int(agreed)
+        rate = _agreement["agreed"] / _agreement["compared"]
+    metrics.set_gauge("query_router.agreement_rate", round(rate, 4))
@@ -0,0 +1,115 @@
+"""
+Trigram Prefilter for Regex Search
+Extracts literal strings a regex is guaranteed to match, in the style of a
+code-search engine, so Postgres can narrow candidates with the pg_trgm index
+(LIKE '%literal%') before running the regex itself.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+try:
+    import re._parser as sre_parse  # Python 3.11+
+    from re._constants import (
+        LITERAL, SUBPATTERN, MAX_REPEAT, MIN_REPEAT, BRANCH, AT, ATOMIC_GROUP, POSSESSIVE_REPEAT
+    )
+except ImportError:  # Python < 3.11
+    import sre_parse
+    from sre_constants import LITERAL, SUBPATTERN, MAX_REPEAT, MIN_REPEAT, BRANCH, AT
+    ATOMIC_GROUP = POSSESSIVE_REPEAT = None
+
+# pg_trgm can only use literals that produce at least one full trigram
+MIN_LITERAL_LENGTH = 3
+
+# Postgres ARE syntax that sre_parse reads differently (or not at all): bracket classes
+# ([[:alpha:]], [[.x.]], [[=x=]]), word/string anchors (\m \M \y \Y \A \Z), back-references,
+# embedded options ((?i), (?i:...), ***:). Extracting literals from these could miss real matches.
+ARE_ONLY_SYNTAX = re.compile(r"\[\[[:.=]|\\[mMyYAZ1-9]|\(\?[a-zA-Z]+[):]|^\*\*\*")
+
+# A clause is a list of alternatives (OR); a prefilter is a list of clauses (AND)
+Clause = List[str]
+
+
+def _required_clauses(items) -> List[Clause]:
+    """Walk a parsed regex and collect literal clauses every match must satisfy"""
+    clauses: List[Clause] = []
+    run: List[str] = []
+
+    def flush():
+        if len(run) >= MIN_LITERAL_LENGTH:
+            clauses.append([''.join(run)])
+        run.clear()
+
+    for op, av in items:
+        if op == LITERAL:
+            run.append(chr(av))
+            continue
+
+        flush()
+        if op == SUBPATTERN:
+            # (group, add_flags, del_flags, pattern)
+            clauses.extend(_required_clauses(av[-1]))
+        elif op == ATOMIC_GROUP:
+            clauses.extend(_required_clauses(av))
+        elif op in (MAX_REPEAT, MIN_REPEAT, POSSESSIVE_REPEAT):
+            min_count, _, sub = av
+            # Only a repeat that must happen at least once contributes requirements
+            if min_count >= 1:
+                clauses.extend(_required_clauses(sub))
+        elif op == BRANCH:
+            # One of the alternatives must match, so one of their best literals must appear
+            alternatives = []
+            for branch in av[1]:
+                branch_clauses = [c for c in _required_clauses(branch) if len(c) == 1]
+                if not branch_clauses:
+                    alternatives = []
+                    break
+                alternatives.append(max((c[0] for c in branch_clauses), key=len))
+            if alternatives:
+                clauses.append(sorted(set(alternatives)))
+        elif op == AT:
+            # Anchors don't consume characters; keep literals on either side separate
+            continue
+        # Anything else (classes, ANY, backrefs, ...) just breaks the literal run
+
+    flush()
+    return clauses
+
+
+def extract_prefilter(pattern: str) -> List[Clause]:
+    """
+    Literal clauses every match must satisfy. Empty when the pattern has no usable literals,
+    can't be parsed, or uses ARE-only syntax (including embedded options such as (?i)),
+    in which case the caller has to fall back to a full scan.
+    """
+    if ARE_ONLY_SYNTAX.search(pattern):
+        return []
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return []
+    return _required_clauses(list(parsed))
+
+
+def build_prefilter_sql(
+    pattern: str,
+    column: str = "text",
+    escape=None
+) -> Tuple[Optional[str], list, List[Clause]]:
+    """
+    Compile the prefilter into SQL served by a gin_trgm_ops index on `column`.
+    Returns (sql_or_None, params, clauses).
+    """
+    clauses = extract_prefilter(pattern)
+    if not clauses:
+        return None, [], []
+
+    conditions = []
+    params = []
+    for clause in clauses:
+        ors = []
+        for literal in clause:
+            ors.append(f"{column} LIKE %s")
+            params.append(f"%{escape(literal) if escape else literal}%")
+        conditions.append("(" + " OR ".join(ors) + ")")
+    return " AND ".join(conditions), params, clauses
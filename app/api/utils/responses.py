@@ -0,0 +1,231 @@
+"""
+Search Responses
+Fast JSON serialization, request-level field projection / snippet mode, and a
+route class that applies them (and cursor pagination) to HTTP responses only;
+internal strategy calls such as hybrid -> vector still see full results.
+The route class also starts the request deadline (header or `deadline_ms`).
+"""
+
+import os
+import re
+import time
+import decimal
+import functools
+import inspect
+from typing import Any, Callable, Dict, List, Optional
+
+import orjson
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+
+from app.api.utils import deadline
+from app.api.utils.metrics import metrics
+from app.api.utils.nlp import tokenize_query
+from app.api.utils.pagination import paginate
+
+SNIPPET_CHARS = int(os.getenv("SNIPPET_CHARS", "240"))
+
+# Top-level keys a strategy result can carry; `fields` may name these or dotted paths under them
+RESULT_FIELDS = (
+    "id", "rank", "text", "metadata", "score", "match_reason", "matched_keywords",
+    "highlighted_text", "matched_entities", "ai_reasoning", "match_details",
+)
+
+
+def _orjson_default(obj: Any):
+    """Types orjson doesn't handle natively (DB numerics, numpy scalars, sets)"""
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if hasattr(obj, 'item'):  # numpy scalar
+        return obj.item()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """orjson-backed JSON response"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_orjson_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+
+
+# ==================== PROJECTION ====================
+
+def make_snippet(text: str, keywords: List[str], size: int = SNIPPET_CHARS) -> str:
+    """A window of `size` characters around the first matched keyword"""
+    if not text or len(text) <= size:
+        return text or ""
+    start = 0
+    for keyword in keywords or []:
+        if len(keyword) < 2:
+            continue
+        match = re.search(re.escape(keyword), text, re.IGNORECASE)
+        if match:
+            start = max(0, match.start() - size // 3)
+            break
+    end = min(len(text), start + size)
+    snippet = text[start:end]
+    return ("..." if start > 0 else "") + snippet + ("..." if end < len(text) else "")
+
+
+def _get_path(item: Dict[str, Any], path: List[str]):
+    value = item
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None, False
+        value = value[key]
+    return value, True
+
+
+def _set_path(target: Dict[str, Any], path: List[str], value: Any):
+    for key in path[:-1]:
+        target = target.setdefault(key, {})
+    target[path[-1]] = value
+
+
+def validate_fields(fields: Optional[List[str]], allowed=RESULT_FIELDS):
+    """Reject projections naming fields no result has, before the strategy runs"""
+    unknown = [f for f in fields or [] if f.split('.')[0] not in allowed or not all(f.split('.'))]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown result field(s): {', '.join(unknown)}; allowed: {', '.join(allowed)}"
+        )
+
+
+def project_result(
+    item: Dict[str, Any],
+    fields: Optional[List[str]] = None,
+    snippet_only: bool = False,
+    keywords: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """Apply snippet mode and then keep only the requested (dotted) fields"""
+    if not isinstance(item, dict):
+        return item
+    if snippet_only:
+        item = dict(item)
+        item.pop('highlighted_text', None)
+        if isinstance(item.get('text'), str):
+            item['text'] = make_snippet(item['text'], item.get('matched_keywords') or keywords)
+    if not fields:
+        return item
+    projected: Dict[str, Any] = {}
+    for field in fields:
+        path = field.split('.')
+        value, found = _get_path(item, path)
+        if found:
+            _set_path(projected, path, value)
+    return projected
+
+
+def project_payload(
+    payload: Any,
+    fields: Optional[List[str]] = None,
+    snippet_only: bool = False,
+    query: str = ""
+) -> Any:
+    """Project every result list in a strategy response ({"results": [...]} or /compare's dict of lists)"""
+    if not (fields or snippet_only) or not isinstance(payload, dict):
+        return payload
+    keywords = tokenize_query(query) if snippet_only and query else []
+    project = functools.partial(project_result, fields=fields, snippet_only=snippet_only, keywords=keywords)
+
+    results = payload.get('results')
+    if isinstance(results, list):
+        results = [project(r) for r in results]
+    elif isinstance(results, dict):
+        results = {k: [project(r) for r in v] if isinstance(v, list) else v for k, v in results.items()}
+    else:
+        return payload
+    return {**payload, 'results': results}
+
+
+# ==================== ROUTE CLASS ====================
+
+def _find_search_request(kwargs: Dict[str, Any]):
+    """The body model carrying response options, if the endpoint has one"""
+    for value in kwargs.values():
+        if hasattr(value, 'fields') and hasattr(value, 'snippet_only'):
+            return value
+    return None
+
+
+def _wants_page(request) -> bool:
+    return request is not None and bool(getattr(request, 'cursor', None) or getattr(request, 'page_size', None))
+
+
+def _wrap_endpoint(endpoint: Callable, path: str) -> Callable:
+    """Post-process an endpoint's payload for HTTP callers only"""
+    if getattr(endpoint, '_search_route_wrapped', False):
+        # include_router re-creates routes from the already wrapped endpoint
+        return endpoint
+    is_async = inspect.iscoroutinefunction(endpoint)
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        request = _find_search_request(kwargs)
+        if request is not None:
+            validate_fields(request.fields)
+        token = deadline.set_deadline(getattr(request, 'deadline_ms', None))
+        try:
+            if is_async and _wants_page(request):
+                payload = await paginate(endpoint, request, path)
+            elif is_async:
+                payload = await endpoint(*args, **kwargs)
+            else:
+                payload = await run_in_threadpool(endpoint, *args, **kwargs)
+        finally:
+            deadline.reset_deadline(token)
+        if isinstance(payload, Response):
+            return payload
+
+        degraded = deadline.degraded_steps()
+        if degraded and isinstance(payload, dict):
+            payload = {**payload, "degraded": degraded}
+
+        if request is not None:
+            payload = project_payload(
+                payload,
+                fields=request.fields,
+                snippet_only=request.snippet_only,
+                query=getattr(request, 'query', '')
+            )
+        # Returning a Response skips FastAPI's jsonable_encoder pass entirely
+        return FastJSONResponse(payload)
+
+    wrapper._search_route_wrapped = True
+    return wrapper
+
+
+class SearchRoute(APIRoute):
+    """APIRoute that enforces the request deadline, paginates, projects, serializes with orjson and records payload size"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _wrap_endpoint(endpoint, path), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        path = self.path
+
+        async def instrumented_handler(request):
+            start = time.time()
+            tokens = deadline.begin_request(request.headers.get(deadline.DEADLINE_HEADER))
+            try:
+                response = await handler(request)
+            finally:
+                deadline.end_request(tokens)
+            body = getattr(response, 'body', None)
+            if body is not None:
+                metrics.observe(f"payload_bytes.{path}", len(body))
+            metrics.observe(f"latency_ms.{path}", (time.time() - start) * 1000)
+            return response
+
+        return instrumented_handler
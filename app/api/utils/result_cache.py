@@ -0,0 +1,134 @@
+"""
+Result Cache
+Response cache for deterministic strategies, applied as a decorator under the route:
+
+    @router.post("/keyword")
+    @cached_strategy("keyword", fields=("query", "limit"))
+    async def search_keyword(request: SearchRequest): ...
+
+Keys are (strategy, normalized request params, corpus generation): entries from
+before an ingest never match again and simply age out of the LRU. `fields` lists
+the request fields the strategy reads, so requests differing only in fields it
+ignores share an entry; without it every field but RESPONSE_ONLY_FIELDS counts.
+"""
+
+import os
+import copy
+import json
+import time
+import hashlib
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from pydantic import BaseModel
+
+from app.api.utils import deadline
+from app.api.utils.generation import aget_generation, get_generation
+from app.api.utils.metrics import metrics
+
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "2000"))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "600"))
+
+# Request fields that only shape the HTTP response, never the ranking
+RESPONSE_ONLY_FIELDS = {"fields", "snippet_only", "page_size", "cursor", "deadline_ms"}
+
+
+class ResultCache:
+    """Bounded LRU of cache key -> payload with a TTL; payloads are copied in and out"""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE, ttl: int = RESULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires_at"] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            payload = entry["payload"]
+        return copy.deepcopy(payload)
+
+    def put(self, key: str, payload: Any):
+        entry = {"payload": copy.deepcopy(payload), "expires_at": time.time() + self.ttl}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            metrics.set_gauge("result_cache.entries", len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+result_cache = ResultCache()
+
+
+def normalize_params(kwargs: Dict[str, Any], fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Ranking-relevant endpoint arguments; dependencies (pools, clients) are dropped.
+    Request models contribute only `fields` when given, else everything but RESPONSE_ONLY_FIELDS.
+    """
+    keep = set(fields) if fields is not None else None
+    params: Dict[str, Any] = {}
+    for name, value in kwargs.items():
+        if isinstance(value, BaseModel):
+            params.update({
+                k: v for k, v in value.dict().items()
+                if (k in keep if keep is not None else k not in RESPONSE_ONLY_FIELDS)
+            })
+        elif isinstance(value, (str, int, float, bool, list, dict)) or value is None:
+            params[name] = value
+    if isinstance(params.get("query"), str):
+        params["query"] = " ".join(params["query"].lower().split())
+    return params
+
+
+def cache_key(strategy: str, params: Dict[str, Any], generation: Optional[int] = None) -> str:
+    generation = get_generation() if generation is None else generation
+    raw = json.dumps([strategy, generation, params], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _cacheable(payload: Any) -> bool:
+    """Skip payloads cut short by the request deadline or a statement timeout"""
+    if not isinstance(payload, dict) or deadline.degraded_steps():
+        return False
+    prefilter = payload.get("prefilter")
+    return not (isinstance(prefilter, dict) and prefilter.get("timed_out"))
+
+
+def cached_strategy(strategy: str, fields: Optional[Iterable[str]] = None) -> Callable:
+    """Cache an async strategy endpoint's payload per (strategy, params, corpus generation)"""
+
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            # Internal callers pass the request positionally (search_hybrid(hybrid_request))
+            arguments = signature.bind_partial(*args, **kwargs).arguments
+            key = cache_key(strategy, normalize_params(arguments, fields), await aget_generation())
+            cached = result_cache.get(key)
+            if cached is not None:
+                metrics.incr(f"result_cache.hits.{strategy}")
+                return cached
+            metrics.incr(f"result_cache.misses.{strategy}")
+            payload = await func(*args, **kwargs)
+            if _cacheable(payload):
+                result_cache.put(key, payload)
+            return payload
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,261 @@
+"""
+In-memory Semantic Cache
+Cached query embeddings live in one contiguous, L2-normalized float32 matrix, so a
+lookup is a single matrix-vector product over at most SEMANTIC_CACHE_SIZE rows.
+Entries expire after a TTL and are evicted LRU (or LFU) when the cache is full;
+near-duplicate queries update their existing slot instead of taking a new one.
+Each entry belongs to a namespace (strategy, limit, corpus generation) and only
+matches lookups from the same namespace.
+search_query_cache in Postgres is an optional persistence tier (SEMANTIC_CACHE_PERSIST):
+it warms the matrix at startup and is compacted periodically.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from psycopg2.extras import RealDictCursor
+
+from app.api.utils.database import get_db_connection
+from app.api.utils.hydration import compact_ranked
+from app.api.utils.metrics import metrics
+from app.api.utils.vectors import pg_vector
+
+CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "5000"))
+CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+EVICTION_POLICY = os.getenv("SEMANTIC_CACHE_EVICTION", "lru").lower()  # "lru" or "lfu"
+# Above this similarity a new entry replaces the existing one instead of adding a row
+DEDUPE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_DEDUPE_THRESHOLD", "0.98"))
+EMBEDDING_DIM = 768
+
+PERSIST = os.getenv("SEMANTIC_CACHE_PERSIST", "true").lower() in ("1", "true", "yes")
+COMPACT_INTERVAL_SECONDS = int(os.getenv("SEMANTIC_CACHE_COMPACT_INTERVAL", "3600"))
+
+
+def namespace_id(namespace: str) -> int:
+    """Stable 63-bit id so namespaces can be compared as one int64 column"""
+    return int.from_bytes(hashlib.blake2b(namespace.encode(), digest_size=8).digest(), "big") >> 1
+
+
+def _normalize(vec) -> Optional[np.ndarray]:
+    vec = np.asarray(vec, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vec)
+    if vec.shape[0] != EMBEDDING_DIM or norm == 0:
+        return None
+    return vec / norm
+
+
+class SemanticCache:
+    """Fixed-capacity cosine-similarity cache over query embeddings"""
+
+    def __init__(self, capacity: int = CACHE_SIZE, ttl: int = CACHE_TTL_SECONDS, policy: str = EVICTION_POLICY):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.policy = policy
+        self.matrix = np.zeros((capacity, EMBEDDING_DIM), dtype=np.float32)
+        self.expires_at = np.zeros(capacity, dtype=np.float64)   # 0 = free slot
+        self.last_access = np.zeros(capacity, dtype=np.float64)
+        self.hits = np.zeros(capacity, dtype=np.int64)
+        self.namespaces = np.zeros(capacity, dtype=np.int64)
+        self.entries: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.expires_at > time.time()))
+
+    def _similarities(self, vec: np.ndarray, now: float, ns_id: int) -> np.ndarray:
+        sims = self.matrix @ vec
+        sims[(self.expires_at <= now) | (self.namespaces != ns_id)] = -np.inf
+        return sims
+
+    def lookup(self, embedding, threshold: float, namespace: str = "") -> Optional[Dict[str, Any]]:
+        """Best entry in `namespace` with cosine similarity above `threshold`, as {"similarity", **entry}"""
+        vec = _normalize(embedding)
+        if vec is None:
+            return None
+        now = time.time()
+        with self._lock:
+            sims = self._similarities(vec, now, namespace_id(namespace))
+            slot = int(np.argmax(sims))
+            similarity = float(sims[slot])
+            if similarity <= threshold:
+                return None
+            self.last_access[slot] = now
+            self.hits[slot] += 1
+            return {"similarity": similarity, **self.entries[slot]}
+
+    def _victim(self, now: float) -> int:
+        free = np.flatnonzero(self.expires_at <= now)
+        if free.size:
+            return int(free[0])
+        if self.policy == "lfu":
+            # Least hits, oldest access breaks ties
+            return int(np.lexsort((self.last_access, self.hits))[0])
+        return int(np.argmin(self.last_access))
+
+    def add(
+        self,
+        embedding,
+        entry: Dict[str, Any],
+        namespace: str = "",
+        dedupe_threshold: float = DEDUPE_THRESHOLD
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Insert an entry (query_text, results, insight, strategy, ...). Returns the entry it
+        replaced as a near-duplicate, if any, so the persistence tier can update that row.
+        """
+        vec = _normalize(embedding)
+        if vec is None:
+            return None
+        now = time.time()
+        ns_id = namespace_id(namespace)
+        entry["namespace"] = namespace
+        with self._lock:
+            sims = self._similarities(vec, now, ns_id)
+            slot = int(np.argmax(sims))
+            replaced = None
+            if sims[slot] > dedupe_threshold:
+                replaced = self.entries[slot]
+                metrics.incr("semantic_cache.dedupes")
+            else:
+                slot = self._victim(now)
+                if self.expires_at[slot] > now:
+                    metrics.incr("semantic_cache.evictions")
+                self.hits[slot] = 0
+            self.matrix[slot] = vec
+            self.namespaces[slot] = ns_id
+            self.entries[slot] = entry
+            self.expires_at[slot] = now + self.ttl
+            self.last_access[slot] = now
+            metrics.set_gauge("semantic_cache.entries", len(self))
+            return replaced
+
+    def clear(self):
+        with self._lock:
+            self.expires_at[:] = 0
+            self.entries = [None] * self.capacity
+
+
+semantic_cache = SemanticCache()
+
+# ==================== PERSISTENCE TIER ====================
+
+_warm_lock = threading.Lock()
+_warmed = False
+_last_compaction = 0.0
+
+
+def warm_from_db():
+    """Load the newest non-expired rows of search_query_cache into the matrix, once"""
+    global _warmed
+    if not PERSIST or _warmed:
+        return
+    with _warm_lock:
+        if _warmed:
+            return
+        _warmed = True
+        try:
+            conn = get_db_connection()
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute("""
+                SELECT id, query_text, embedding::text AS embedding, strategy_used, results, insight,
+                       COALESCE(namespace, '') AS namespace
+                FROM search_query_cache
+                WHERE created_at > now() - make_interval(secs => %s)
+                ORDER BY created_at DESC
+                LIMIT %s
+            """, (CACHE_TTL_SECONDS, CACHE_SIZE))
+            rows = cur.fetchall()
+            cur.close()
+            conn.close()
+        except Exception as e:
+            print(f"Semantic cache warm-up failed: {e}")
+            return
+        # Oldest first, so the newest entries end up most recently used
+        for row in reversed(rows):
+            embedding = np.array(json.loads(row['embedding']), dtype=np.float32)
+            semantic_cache.add(embedding, {
+                "db_id": str(row['id']),
+                "query_text": row['query_text'],
+                "strategy": row['strategy_used'],
+                # Rows written before entries were compacted still carry full profiles
+                "results": compact_ranked(row['results'] or []),
+                "insight": row['insight'] or '',
+            }, row['namespace'])
+        print(f"DEBUG: Semantic cache warmed with {len(rows)} entries")
+
+
+def persist_entries(batch: List[Tuple[Any, Dict[str, Any], Optional[Dict[str, Any]]]]):
+    """
+    Write (embedding, entry, replaced) tuples to search_query_cache in one transaction,
+    updating a near-duplicate's row instead of adding one
+    """
+    if not PERSIST or not batch:
+        return
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        for embedding, entry, replaced in batch:
+            db_id = replaced.get("db_id") if replaced else None
+            params = (entry["query_text"], pg_vector(embedding), entry["strategy"],
+                      json.dumps(entry["results"]), entry["insight"], entry.get("namespace", ""))
+            if db_id:
+                cur.execute("""
+                    UPDATE search_query_cache
+                    SET query_text = %s, embedding = %s, strategy_used = %s, results = %s, insight = %s,
+                        namespace = %s, created_at = CURRENT_TIMESTAMP
+                    WHERE id = %s
+                    RETURNING id
+                """, params + (db_id,))
+            else:
+                cur.execute("""
+                    INSERT INTO search_query_cache (query_text, embedding, strategy_used, results, insight, namespace)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    RETURNING id
+                """, params)
+            row = cur.fetchone()
+            entry["db_id"] = str(row[0]) if row else None
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+    maybe_compact()
+
+
+def compact(max_rows: int = CACHE_SIZE, ttl: int = CACHE_TTL_SECONDS) -> int:
+    """Drop expired rows and everything beyond the newest `max_rows`; returns rows deleted"""
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            DELETE FROM search_query_cache
+            WHERE created_at < now() - make_interval(secs => %s)
+               OR id NOT IN (
+                    SELECT id FROM search_query_cache ORDER BY created_at DESC LIMIT %s
+               )
+        """, (ttl, max_rows))
+        deleted = cur.rowcount
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+    metrics.incr("semantic_cache.compacted_rows", deleted)
+    return deleted
+
+
+def maybe_compact():
+    """Run compact() at most once per COMPACT_INTERVAL_SECONDS"""
+    global _last_compaction
+    now = time.time()
+    if now - _last_compaction < COMPACT_INTERVAL_SECONDS:
+        return
+    _last_compaction = now
+    try:
+        deleted = compact()
+        print(f"DEBUG: Compacted search_query_cache ({deleted} rows removed)")
+    except Exception as e:
+        print(f"Semantic cache compaction failed: {e}")
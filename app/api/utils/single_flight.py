@@ -0,0 +1,85 @@
+"""
+Single-flight Request Coalescing
+Concurrent identical strategy calls (same strategy + normalized params) share one
+execution: the first caller runs the strategy, the rest await its future and get
+their own copy of the payload and of the leader's degraded steps. Applied under the route (and under @cached_strategy,
+so only cache misses coalesce):
+
+    @router.post("/agentic")
+    @single_flight("agentic")
+    async def search_agentic(request: SearchRequest): ...
+
+Routes under @cached_strategy pass it the same `fields` allowlist.
+"""
+
+import copy
+import asyncio
+import inspect
+import functools
+from typing import Callable, Dict, Iterable, Optional
+
+from app.api.utils import deadline
+from app.api.utils.metrics import metrics
+from app.api.utils.generation import aget_generation
+from app.api.utils.result_cache import cache_key, normalize_params
+
+# In-flight futures per key; only touched from the event loop thread
+_in_flight: Dict[str, asyncio.Future] = {}
+
+
+def single_flight(strategy: str, fields: Optional[Iterable[str]] = None) -> Callable:
+    """Coalesce concurrent identical calls of an async strategy endpoint"""
+
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            arguments = signature.bind_partial(*args, **kwargs).arguments
+            key = cache_key(strategy, normalize_params(arguments, fields), await aget_generation())
+
+            pending = _in_flight.get(key)
+            if pending is not None:
+                metrics.incr(f"single_flight.coalesced.{strategy}")
+                try:
+                    # shield: a waiter going away (or timing out) must not cancel the shared call
+                    payload, degraded = await asyncio.wait_for(asyncio.shield(pending), deadline.call_timeout())
+                except asyncio.TimeoutError:
+                    # Our own deadline ran out before the leader finished
+                    deadline.mark_degraded(f"single_flight_{strategy}")
+                    return {"results": []}
+                except asyncio.CancelledError:
+                    if not pending.cancelled():
+                        raise
+                    # The leader was cancelled (client went away): run it ourselves
+                    return await wrapper(*args, **kwargs)
+                # The shared payload is as degraded for us as it was for the leader
+                for step in degraded:
+                    deadline.mark_degraded(step)
+                return copy.deepcopy(payload)
+
+            future = asyncio.get_running_loop().create_future()
+            _in_flight[key] = future
+            metrics.incr(f"single_flight.leaders.{strategy}")
+            degraded_before = set(deadline.degraded_steps())
+            try:
+                payload = await func(*args, **kwargs)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except BaseException as e:
+                future.set_exception(e)
+                # Waiters re-raise it; mark it retrieved so it isn't logged when nobody waited
+                future.exception()
+                raise
+            else:
+                # Waiters get copies of a snapshot, since callers mutate results in place
+                degraded = [step for step in deadline.degraded_steps() if step not in degraded_before]
+                future.set_result((copy.deepcopy(payload), degraded))
+                return payload
+            finally:
+                _in_flight.pop(key, None)
+
+        return wrapper
+
+    return decorator
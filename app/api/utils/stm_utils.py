@@ -2,6 +2,7 @@ import google.generativeai as genai
 import os
 import json
 from dotenv import load_dotenv
+from app.api.utils.gemini_scheduler import generate_content
 
 load_dotenv()
 
@@ -38,7 +39,7 @@ def generate_stm_chunks(student_data: dict) -> dict:
     """
 
     try:
-        response = model.generate_content(prompt)
+        response = generate_content(model, prompt)
         # Clean response if it contains markdown code blocks
         text = response.text.replace('```json', '').replace('```', '').strip()
         return json.loads(text)
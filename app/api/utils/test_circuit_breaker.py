@@ -0,0 +1,118 @@
+import pytest
+
+from app.api.utils import circuit_breaker, deadline
+from app.api.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen, get_breaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def fail():
+    raise ConnectionError("unavailable")
+
+
+def test_consecutive_failures_open_the_circuit(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=30)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    assert breaker.state == CLOSED
+    # A success resets the count
+    assert breaker.call(lambda: "ok") == "ok"
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    assert breaker.state == OPEN
+
+
+def test_open_circuit_rejects_without_calling_and_marks_degraded(clock):
+    breaker = CircuitBreaker("test_open", failure_threshold=1, reset_seconds=30)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    calls = []
+    tokens = deadline.begin_request()
+    try:
+        with pytest.raises(CircuitOpen):
+            breaker.call(calls.append, "x")
+        assert deadline.degraded_steps() == ["test_open_circuit_open"]
+    finally:
+        deadline.end_request(tokens)
+    assert calls == []
+
+
+def test_half_open_admits_one_probe(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=30)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    clock.now += 30
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # The probe is in flight: everyone else is still rejected
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=30)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    clock.now += 30
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    clock.now += 30
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+
+
+def test_own_deadline_releases_the_probe_without_a_verdict(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=30)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    clock.now += 30
+
+    def out_of_time():
+        raise deadline.DeadlineExceeded("budget spent")
+
+    with pytest.raises(deadline.DeadlineExceeded):
+        breaker.call(out_of_time)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_timeout_from_our_own_deadline_is_not_a_failure(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=30)
+
+    def times_out_at_our_deadline():
+        # What a client timeout of min(remaining, 30) looks like once the budget is spent
+        clock.now += 1
+        raise TimeoutError("deadline exceeded")
+
+    tokens = deadline.begin_request("500")
+    try:
+        with pytest.raises(TimeoutError):
+            breaker.call(times_out_at_our_deadline)
+    finally:
+        deadline.end_request(tokens)
+    assert breaker.state == CLOSED
+    assert breaker.failures == 0
+
+
+def test_get_breaker_is_shared_per_name():
+    assert get_breaker("test_shared") is get_breaker("test_shared")
+    assert get_breaker("test_shared") is not get_breaker("test_other")
@@ -0,0 +1,102 @@
+import asyncio
+from typing import List, Optional
+
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from app.api.utils import pagination
+from app.api.utils.pagination import RankedListCache, decode_cursor, paginate
+
+
+class Request(BaseModel):
+    query: str
+    limit: int = 10
+    skills: List[str] = []
+    page_size: Optional[int] = None
+    cursor: Optional[str] = None
+
+
+class RankedEndpoint:
+    """Ranks `total` fake profiles; records the limit of every run"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.limits = []
+
+    async def __call__(self, request):
+        self.limits.append(request.limit)
+        count = min(request.limit, self.total)
+        return {"results": [{"id": f"id{i}", "score": 1 - i / 100, "text": "full"} for i in range(count)]}
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setattr(pagination, "ranked_lists", RankedListCache())
+    monkeypatch.setattr(pagination, "hydrate_ranked", lambda items: [{**item, "text": "fresh"} for item in items])
+
+
+def page(endpoint, request, strategy="/vector"):
+    return asyncio.run(paginate(endpoint, request, strategy))
+
+
+def ids(payload):
+    return [res["id"] for res in payload["results"]]
+
+
+def test_cursor_round_trip_serves_later_pages_from_the_cached_list():
+    endpoint = RankedEndpoint(total=25)
+    first = page(endpoint, Request(query="python", page_size=2))
+    assert ids(first) == ["id0", "id1"]
+    state = decode_cursor(first["next_cursor"])
+    assert (state["o"], state["s"]) == (2, "/vector")
+
+    second = page(endpoint, Request(query="python", cursor=first["next_cursor"]))
+    assert ids(second) == ["id2", "id3"]
+    assert second["results"][0]["text"] == "fresh"
+    assert second["page"] == {"offset": 2, "page_size": 2, "ranked": 10, "exhausted": False}
+    assert endpoint.limits == [10]
+
+
+def test_paging_past_the_cached_depth_reruns_deeper_once():
+    endpoint = RankedEndpoint(total=9)
+    payload = page(endpoint, Request(query="python", limit=2, page_size=2))
+    seen = ids(payload)
+    while payload["next_cursor"]:
+        payload = page(endpoint, Request(query="python", limit=2, cursor=payload["next_cursor"]))
+        seen += ids(payload)
+    assert seen == [f"id{i}" for i in range(9)]
+    # Prefetched 3 pages, then doubled once; 9 < 12 marks the list exhausted
+    assert endpoint.limits == [6, 12]
+    assert payload["page"]["exhausted"]
+
+
+def test_expired_cursor_returns_410(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(pagination.time, "time", lambda: now[0])
+    monkeypatch.setattr(pagination, "ranked_lists", RankedListCache(ttl=60))
+    first = page(RankedEndpoint(total=25), Request(query="python", page_size=2))
+    now[0] += 61
+    with pytest.raises(HTTPException) as exc:
+        page(RankedEndpoint(total=25), Request(query="python", cursor=first["next_cursor"]))
+    assert exc.value.status_code == 410
+
+
+def test_cursor_is_rejected_for_another_strategy_or_request():
+    endpoint = RankedEndpoint(total=25)
+    cursor = page(endpoint, Request(query="python", page_size=2))["next_cursor"]
+    with pytest.raises(HTTPException) as exc:
+        page(endpoint, Request(query="python", cursor=cursor), strategy="/keyword")
+    assert exc.value.status_code == 400
+    for other in (Request(query="java", cursor=cursor), Request(query="python", skills=["aws"], cursor=cursor)):
+        with pytest.raises(HTTPException) as exc:
+            page(endpoint, other)
+        assert exc.value.status_code == 400
+    # Casing, whitespace and limit don't change the ranking the cursor points into
+    assert ids(page(endpoint, Request(query="  Python ", limit=50, cursor=cursor))) == ["id2", "id3"]
+
+
+def test_malformed_cursor_returns_400():
+    with pytest.raises(HTTPException) as exc:
+        page(RankedEndpoint(total=5), Request(query="python", cursor="not-a-cursor"))
+    assert exc.value.status_code == 400
@@ -0,0 +1,106 @@
+import asyncio
+import sqlite3
+
+import numpy as np
+
+from app.api.utils.embedding_cache import EmbeddingCache, embedding_key
+
+
+def disk_rows(path):
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    key = embedding_key("model", "retrieval_query", 3, "python developer")
+    EmbeddingCache(path=path).put(key, [0.1, 0.2, 0.3])
+    vector = EmbeddingCache(path=path).get(key)
+    assert vector is not None and np.allclose(vector, [0.1, 0.2, 0.3])
+
+
+def test_disk_tier_prunes_oldest_rows_past_the_cap(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = EmbeddingCache(max_entries=1, path=path, max_disk_rows=10)
+    keys = [embedding_key("model", "retrieval_query", 2, f"text {i}") for i in range(11)]
+    for key in keys:
+        cache.put(key, [1.0, 2.0])
+    # Pruned to 90% of the cap, oldest first
+    assert disk_rows(path) == 9
+    fresh = EmbeddingCache(max_entries=1, path=path, max_disk_rows=10)
+    assert fresh.get(keys[0]) is None
+    assert fresh.get(keys[-1]) is not None
+
+
+def test_unbounded_disk_tier(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = EmbeddingCache(path=path, max_disk_rows=0)
+    for i in range(5):
+        cache.put(embedding_key("model", "retrieval_query", 2, f"text {i}"), [1.0, 2.0])
+    assert disk_rows(path) == 5
+
+
+def test_async_callers_read_disk_off_loop_and_write_behind(tmp_path, monkeypatch):
+    from app.api.utils import embedding_cache as module
+
+    path = str(tmp_path / "cache.sqlite")
+    monkeypatch.setattr(module, "embedding_cache", EmbeddingCache(path=path))
+    module.store_embedding_behind("model", "retrieval_query", 2, "python", [1.0, 2.0])
+    # L1 has it right away; the disk write happens on the write-behind worker
+    assert asyncio.run(module.acached_embedding("model", "retrieval_query", 2, "python")) == [1.0, 2.0]
+    module.embedding_cache_writes.stop()
+    assert disk_rows(path) == 1
+
+    monkeypatch.setattr(module, "embedding_cache", EmbeddingCache(path=path))
+    assert asyncio.run(module.acached_embedding("model", "retrieval_query", 2, "python")) == [1.0, 2.0]
+    assert asyncio.run(module.acached_embedding("model", "retrieval_query", 2, "java")) is None
+
+
+def test_full_write_queue_persists_on_the_cache_thread(tmp_path, monkeypatch):
+    from app.api.utils import embedding_cache as module
+
+    path = str(tmp_path / "cache.sqlite")
+    monkeypatch.setattr(module, "embedding_cache", EmbeddingCache(path=path))
+    monkeypatch.setattr(module.embedding_cache_writes, "max_pending", 0)
+    module.store_embedding_behind("model", "retrieval_query", 2, "python", [1.0, 2.0])
+    # The overflow write was queued on the single cache thread ahead of this no-op
+    module._disk_executor.submit(lambda: None).result()
+    assert disk_rows(path) == 1
+
+
+class FakeRemoteProvider:
+    name = "fake"
+    model = "fake-model"
+    dim = 2
+    is_remote = True
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_batch(self, texts, task_type):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def test_batched_embeddings_are_persisted_in_one_write(tmp_path, monkeypatch):
+    from app.api.utils import embedding_cache as module, embeddings
+
+    # Fresh worker, so the whole batch lands within one flush interval
+    module.embedding_cache_writes.stop()
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite"))
+    writes = []
+    write_disk = cache.write_disk
+    monkeypatch.setattr(cache, "write_disk", lambda items: (writes.append(len(items)), write_disk(items)))
+    monkeypatch.setattr(module, "embedding_cache", cache)
+    provider = FakeRemoteProvider()
+    monkeypatch.setattr(embeddings, "get_provider", lambda: provider)
+
+    async def main():
+        batcher = embeddings.EmbeddingBatcher(max_size=8, max_wait_ms=20)
+        return await asyncio.gather(*(batcher.embed(text, "retrieval_query") for text in ("a", "bb", "ccc")))
+
+    assert asyncio.run(main()) == [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0]]
+    assert provider.calls == [["a", "bb", "ccc"]]
+    module.embedding_cache_writes.stop()
+    assert writes == [3]
+    assert disk_rows(str(tmp_path / "cache.sqlite")) == 3
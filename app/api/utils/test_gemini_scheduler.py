@@ -0,0 +1,72 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.api.utils import deadline
+from app.api.utils.gemini_scheduler import (
+    INGESTION, INTERACTIVE, MAINTENANCE, GeminiScheduler, TokenBucket, gemini_priority, run_blocking,
+    _llm_executors
+)
+
+
+def test_token_bucket_burst_then_rate():
+    bucket = TokenBucket(rate=10.0, burst=2)
+    assert bucket.take() == 0
+    assert bucket.take() == 0
+    assert 0 < bucket.take() <= 0.1
+    assert TokenBucket(rate=0, burst=1).take() == 0
+
+
+def test_waiters_are_served_by_priority_then_arrival():
+    scheduler = GeminiScheduler({"llm": (60 * 20, 1)})
+    scheduler.acquire("llm")  # drain the burst so the rest have to queue
+    served = []
+
+    def call(priority, name):
+        with gemini_priority(priority):
+            scheduler.acquire("llm")
+        served.append(name)
+
+    threads = []
+    for priority, name in ((INGESTION, "ingestion"), (MAINTENANCE, "maintenance"),
+                           (INTERACTIVE, "interactive-1"), (INTERACTIVE, "interactive-2")):
+        thread = threading.Thread(target=call, args=(priority, name))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.005)
+    for thread in threads:
+        thread.join(5)
+    assert served == ["interactive-1", "interactive-2", "maintenance", "ingestion"]
+
+
+def test_waiter_gives_up_at_its_deadline():
+    scheduler = GeminiScheduler({"llm": (1, 1)})
+    scheduler.acquire("llm")
+    tokens = deadline.begin_request("50")
+    try:
+        with pytest.raises(deadline.DeadlineExceeded):
+            scheduler.acquire("llm")
+        assert deadline.degraded_steps() == ["gemini_llm_queue"]
+    finally:
+        deadline.end_request(tokens)
+
+
+def test_background_calls_cannot_take_interactive_threads():
+    release = threading.Event()
+
+    async def main():
+        with gemini_priority(INGESTION):
+            # Saturate the ingestion pool with calls stuck waiting (as if queued for tokens)
+            stuck = [asyncio.ensure_future(run_blocking(release.wait, 5))
+                     for _ in range(_llm_executors[INGESTION]._max_workers + 2)]
+        await asyncio.sleep(0.01)
+        try:
+            return await asyncio.wait_for(run_blocking(threading.current_thread), 1)
+        finally:
+            release.set()
+            await asyncio.gather(*stuck)
+
+    thread = asyncio.run(main())
+    assert thread.name.startswith("gemini-llm_")
@@ -0,0 +1,42 @@
+import pytest
+
+from app.api.utils import deadline, llm
+
+
+class EmptyLLMCache:
+    def __init__(self):
+        self.saved = []
+
+    def get(self, *key):
+        return None
+
+    def put(self, *key_and_result):
+        self.saved.append(key_and_result)
+
+
+@pytest.fixture
+def failing_model(monkeypatch):
+    cache = EmptyLLMCache()
+    monkeypatch.setattr(llm, "llm_cache", cache)
+    monkeypatch.setattr(llm.genai, "GenerativeModel", lambda name: object())
+
+    def generate_content(model, prompt):
+        raise ConnectionError("503 model overloaded")
+
+    monkeypatch.setattr(llm, "generate_content", generate_content)
+    tokens = deadline.begin_request()
+    yield cache
+    deadline.end_request(tokens)
+
+
+def test_failed_plan_falls_back_to_vector_and_marks_degraded(failing_model):
+    plan = llm.plan_query("python developer")
+    assert plan["tool"] == "vector" and plan["fallback"]
+    assert deadline.degraded_steps() == ["query_planning"]
+    assert failing_model.saved == []
+
+
+def test_failed_rerank_keeps_retrieval_order_and_marks_degraded(failing_model):
+    candidates = [{"id": str(i), "text": "python", "metadata": {}} for i in range(5)]
+    assert llm.analyze_and_rerank("python developer", candidates, top_k=3) == candidates[:3]
+    assert deadline.degraded_steps() == ["rerank"]
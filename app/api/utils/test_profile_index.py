@@ -0,0 +1,59 @@
+from app.api.utils.profile_index import (
+    build_profile_card, card_metadata, escape_like, normalize_skill_names, parse_skills_text
+)
+
+
+def test_parse_skills_text_scores():
+    skills = parse_skills_text("Python (Domain: Backend | 7.5), SQL (6), Go")
+    assert skills == {"python": 7.5, "sql": 6.0, "go": None}
+
+
+def test_parse_skills_text_stm_domain_prefixes():
+    skills = parse_skills_text("Skills-[Web]: React (8), Vue (5) Skills-[Data]: Pandas (7)")
+    assert skills == {"react": 8.0, "vue": 5.0, "pandas": 7.0}
+
+
+def test_parse_skills_text_keeps_commas_inside_parentheses():
+    assert parse_skills_text("Python (Web: Flask, Django | 9)") == {"python": 9.0}
+
+
+def test_parse_skills_text_empty():
+    assert parse_skills_text("") == {}
+
+
+def test_normalize_skill_names_adds_base_name():
+    assert normalize_skill_names("Python (Tkinter)") == ["python (tkinter)", "python"]
+
+
+def test_escape_like():
+    assert escape_like("50%_a\\b") == "50\\%\\_a\\\\b"
+
+
+def test_profile_card_reads_capitalised_keys_job_title_and_email():
+    text = '{"Name": "Asha Rao", "job_title": "Data Engineer", "Location": "Pune", "email": "asha@example.com"}'
+    card = build_profile_card(text)
+    assert card["name"] == "Asha Rao"
+    assert card["role"] == "Data Engineer"
+    assert card["location"] == "Pune"
+    assert card["email"] == "asha@example.com"
+
+
+def test_card_metadata_prefers_metadata_then_card():
+    row = {"metadata": {"name": "From Metadata"}, "profile_card": {"name": "From Card", "role": "Analyst"}}
+    assert card_metadata(row) == {"name": "From Metadata", "role": "Analyst"}
+
+
+def test_card_metadata_parses_rows_not_yet_indexed():
+    row = {"text": '{"name": "Ravi", "role": "Backend Developer"}', "metadata": None, "profile_card": None}
+    assert card_metadata(row) == {"name": "Ravi", "role": "Backend Developer"}
+
+
+def test_card_metadata_does_not_reparse_an_empty_indexed_card(monkeypatch):
+    from app.api.utils import profile_index
+
+    def fail(*args):
+        raise AssertionError("indexed rows must not be parsed on the read path")
+
+    monkeypatch.setattr(profile_index, "build_profile_card", fail)
+    row = {"text": "no card fields here", "metadata": {"role": "Analyst"}, "profile_card": {}}
+    assert card_metadata(row) == {"role": "Analyst"}
@@ -0,0 +1,40 @@
+from app.api.utils.caching import normalize_query, normalize_query_text
+from app.api.utils.llm_cache import llm_cache_key
+
+
+def test_normalize_query_sorts_terms_and_drops_stop_words():
+    assert normalize_query("Python dev for AWS") == "aws dev python"
+    assert normalize_query("aws  python DEV") == normalize_query("Python dev for AWS")
+
+
+def test_normalize_query_keeps_symbols_inside_terms():
+    keys = {
+        normalize_query("C developer"),
+        normalize_query("C++ developer"),
+        normalize_query("C# developer"),
+    }
+    assert keys == {"c developer", "c++ developer", "c# developer"}
+    assert normalize_query(".NET developer") != normalize_query("NET developer")
+    assert normalize_query("node.js developer") == "developer node.js"
+
+
+def test_normalize_query_drops_sentence_punctuation():
+    assert normalize_query("Python developer.") == normalize_query("python, developer?")
+
+
+def test_normalize_query_all_stop_words_falls_back_to_text():
+    assert normalize_query("Who  is THE") == "who is the"
+
+
+def test_normalize_query_text_keeps_order_symbols_and_stop_words():
+    assert normalize_query_text("  Python OR Java?") == "python or java"
+    assert normalize_query_text("python or java") != normalize_query_text("python and java")
+    assert normalize_query_text("java then python") != normalize_query_text("python then java")
+    assert normalize_query_text(".NET developer") == ".net developer"
+
+
+def test_llm_cache_keys_do_not_collide_on_symbols():
+    keys = {llm_cache_key("query_plan", q, "v1", "model") for q in ("C++ developer", "C# developer", "C developer")}
+    assert len(keys) == 3
+    assert llm_cache_key("query_plan", "C++ Developer.", "v1", "model") == \
+        llm_cache_key("query_plan", "c++ developer", "v1", "model")
@@ -0,0 +1,78 @@
+import pytest
+
+from app.api.utils.query_router import NaiveBayesRouter, apply_rules, confident
+
+
+@pytest.mark.parametrize("query, pattern_type", [
+    ("email of the react developer", "email"),
+    ("Email address for Priya Sharma", "email"),
+    ("phone number of the data scientist", "phone"),
+    ("mobile number for Rahul", "phone"),
+    ("contact details for the ML intern", "email"),
+    ("LinkedIn profile of Anjali", "linkedin"),
+    ("github profile of the backend lead", "github"),
+    ("portfolio link for the designer", "url"),
+    ("website of Kiran", "url"),
+])
+def test_contact_lookups_route_to_pattern(query, pattern_type):
+    decision = apply_rules(query)
+    assert decision["tool"] == "pattern"
+    assert decision["parameters"] == {"pattern_type": pattern_type}
+    assert confident(decision)
+
+
+@pytest.mark.parametrize("query", [
+    "mobile app developer",
+    "website developer",
+    "github expert",
+    "python developer with github",
+    "email marketing specialist",
+    "phone support engineer",
+    "linkedin growth hacker",
+    "developers who build websites for startups",
+])
+def test_role_queries_do_not_route_to_pattern(query):
+    decision = apply_rules(query)
+    assert decision is None or decision["tool"] != "pattern"
+
+
+def test_literal_contact_details_become_custom_patterns():
+    decision = apply_rules("who owns priya.s@example.com")
+    assert decision["tool"] == "pattern"
+    assert decision["parameters"]["custom_pattern"] == r"priya\.s@example\.com"
+    decision = apply_rules("https://github.com/octocat")
+    assert decision["tool"] == "pattern"
+    assert "github\\.com/octocat" in decision["parameters"]["custom_pattern"]
+
+
+def test_role_and_skills_fields_route_to_filter():
+    decision = apply_rules("Role: Backend Developer Skills: Python, Django/AWS")
+    assert decision["tool"] == "filter"
+    assert decision["parameters"] == {"role": "Backend Developer", "skills": ["Python", "Django", "AWS"]}
+
+
+def test_quoted_and_symbol_terms_route_to_keyword():
+    assert apply_rules('"John Doe"')["parameters"] == {"query": "John Doe"}
+    for query in ("C++", "C#", ".NET", "node.js"):
+        decision = apply_rules(query)
+        assert decision["tool"] == "keyword", query
+
+
+@pytest.mark.parametrize("query", ["3.5", ".", "v1.2", "..."])
+def test_numbers_and_bare_punctuation_are_not_symbol_terms(query):
+    decision = apply_rules(query)
+    assert decision is None or decision["tool"] != "keyword"
+
+
+def test_semantic_queries_have_no_rule():
+    assert apply_rules("python developer with cloud experience") is None
+
+
+def test_naive_bayes_router_learns_tools():
+    examples = [{"query": q, "tool": "vector"} for q in (
+        "python developer with cloud experience", "machine learning engineer", "backend developer with aws",
+    )] + [{"query": q, "tool": "keyword"} for q in ("John Doe", "Jane Smith", "Priya Sharma")]
+    router = NaiveBayesRouter(NaiveBayesRouter.train(examples))
+    posterior = router.predict("cloud engineer with python")
+    assert max(posterior, key=posterior.get) == "vector"
+    assert abs(sum(posterior.values()) - 1) < 1e-9
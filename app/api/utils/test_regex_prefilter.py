@@ -0,0 +1,51 @@
+from app.api.utils.regex_prefilter import build_prefilter_sql, extract_prefilter
+
+
+def test_required_literals():
+    assert extract_prefilter(r"python\s+developer") == [["python"], ["developer"]]
+
+
+def test_alternation_becomes_or_clause():
+    assert extract_prefilter(r"(react|angular)\s+dev") == [["angular", "react"], ["dev"]]
+
+
+def test_optional_parts_are_not_required():
+    assert extract_prefilter(r"java(script)?") == [["java"]]
+
+
+def test_short_literals_give_no_prefilter():
+    assert extract_prefilter(r"\d{3}-\d{4}") == []
+
+
+def test_unparseable_pattern_gives_no_prefilter():
+    assert extract_prefilter(r"(unclosed") == []
+
+
+def test_are_only_syntax_gives_no_prefilter():
+    for pattern in (
+        r"[[:alpha:]]+son",
+        r"[[.hyphen.]]java",
+        r"\mpython\M",
+        r"\ypython\y",
+        r"\Apython",
+        r"(java)script \1",
+        r"(?i)python",
+        r"(?i:python)",
+        r"***=python",
+    ):
+        assert extract_prefilter(pattern) == [], pattern
+
+
+def test_non_capturing_group_still_prefilters():
+    assert extract_prefilter(r"(?:senior|lead) engineer") == [["lead", "senior"], [" engineer"]]
+
+
+def test_build_prefilter_sql_escapes_literals():
+    sql, params, clauses = build_prefilter_sql(r"100%_done", escape=lambda v: v.replace("%", "\\%"))
+    assert sql == "(text LIKE %s)"
+    assert params == ["%100\\%_done%"]
+    assert clauses == [["100%_done"]]
+
+
+def test_build_prefilter_sql_without_literals():
+    assert build_prefilter_sql(r"\w+") == (None, [], [])
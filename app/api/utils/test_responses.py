@@ -0,0 +1,72 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.utils.responses import make_snippet, project_payload, project_result, validate_fields
+
+RESULT = {
+    "id": "1",
+    "text": "Ravi has five years of Python and AWS experience.",
+    "metadata": {"name": "Ravi", "role": "Backend Developer", "email": "ravi@example.com"},
+    "score": 0.91,
+    "highlighted_text": "Ravi has five years of <mark>Python</mark> and AWS experience.",
+    "matched_keywords": ["python"],
+}
+
+
+def test_dotted_fields_project_nested_values():
+    projected = project_result(RESULT, fields=["id", "score", "metadata.name", "metadata.role"])
+    assert projected == {"id": "1", "score": 0.91, "metadata": {"name": "Ravi", "role": "Backend Developer"}}
+
+
+def test_missing_paths_are_left_out():
+    assert project_result(RESULT, fields=["id", "metadata.location", "ai_reasoning"]) == {"id": "1"}
+
+
+def test_projection_applies_to_every_compare_list():
+    payload = {"results": {"vector": [RESULT], "keyword": [RESULT]}, "optimization": {"tool": "vector"}}
+    projected = project_payload(payload, fields=["id"])
+    assert projected == {"results": {"vector": [{"id": "1"}], "keyword": [{"id": "1"}]}, "optimization": {"tool": "vector"}}
+
+
+def test_no_options_returns_the_payload_untouched():
+    payload = {"results": [RESULT]}
+    assert project_payload(payload) is payload
+
+
+def test_allowed_fields_pass_validation():
+    validate_fields(["id", "score", "metadata.name", "match_details.term_contributions"])
+    validate_fields([])
+
+
+@pytest.mark.parametrize("fields", [["id", "password"], ["metadata."], ["student.name"]])
+def test_fields_outside_the_allowlist_are_a_400(fields):
+    with pytest.raises(HTTPException) as exc:
+        validate_fields(fields)
+    assert exc.value.status_code == 400
+    assert fields[-1] in exc.value.detail
+
+
+def test_snippet_mode_drops_highlights_and_keeps_short_text():
+    projected = project_result(RESULT, snippet_only=True)
+    assert "highlighted_text" not in projected
+    assert projected["text"] == RESULT["text"]
+    assert "highlighted_text" in RESULT
+
+
+def test_snippet_is_a_window_around_the_first_match():
+    text = "x" * 500 + " Python developer " + "y" * 500
+    snippet = make_snippet(text, ["python"], size=60)
+    assert snippet.startswith("...") and snippet.endswith("...")
+    assert "Python developer" in snippet
+    assert len(snippet) == 60 + 6
+
+
+def test_snippet_without_a_match_starts_at_the_top():
+    snippet = make_snippet("a" * 100, ["python"], size=10)
+    assert snippet == "a" * 10 + "..."
+
+
+def test_snippet_mode_uses_query_keywords_when_results_have_none():
+    long_result = {"id": "2", "text": "z" * 400 + " kubernetes operator " + "z" * 400}
+    projected = project_payload({"results": [long_result]}, snippet_only=True, query="kubernetes engineer")
+    assert "kubernetes" in projected["results"][0]["text"]
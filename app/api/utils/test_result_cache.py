@@ -0,0 +1,130 @@
+import asyncio
+import threading
+
+import psycopg2.errors
+from pydantic import BaseModel
+
+from app.api.utils import database, deadline, generation, result_cache as result_cache_module
+from app.api.utils.database import execute_query
+from app.api.utils.result_cache import _cacheable, cached_strategy, normalize_params, result_cache
+
+
+class TimingOutCursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if not query.startswith("SELECT set_config"):
+            raise psycopg2.errors.QueryCanceled("canceling statement due to statement timeout")
+
+
+class TimingOutConnection:
+    def cursor(self, **kwargs):
+        return TimingOutCursor()
+
+    def close(self):
+        pass
+
+
+async def generation_zero():
+    return 0
+
+
+class Request(BaseModel):
+    query: str
+    limit: int = 10
+    role: str = ""
+    page_size: int = 0
+
+
+def test_normalize_params_keeps_only_listed_fields():
+    request = Request(query="  Python   DEV", role="backend", page_size=5)
+    assert normalize_params({"request": request}) == {"query": "python dev", "limit": 10, "role": "backend"}
+    assert normalize_params({"request": request}, ("query", "limit")) == {"query": "python dev", "limit": 10}
+
+
+def test_fields_outside_the_allowlist_share_an_entry(monkeypatch):
+    monkeypatch.setattr(result_cache_module, "aget_generation", generation_zero)
+    result_cache.clear()
+    calls = []
+
+    @cached_strategy("test_fields", fields=("query", "limit"))
+    async def strategy(request: Request):
+        calls.append(request.role)
+        return {"results": []}
+
+    run_request(lambda: strategy(Request(query="python", role="backend")))
+    run_request(lambda: strategy(Request(query="python", role="frontend")))
+    assert calls == ["backend"]
+
+
+def test_due_generation_refresh_runs_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def read():
+        threads.append(threading.get_ident())
+        return 7
+
+    monkeypatch.setattr(generation, "get_generation", read)
+    monkeypatch.setattr(generation, "_checked_at", 0.0)
+    assert asyncio.run(generation.aget_generation()) == 7
+    assert threads and threads[0] != threading.get_ident()
+
+
+def run_request(coro_fn):
+    """Run coro_fn() inside a request context, returning (result, degraded steps)"""
+    async def request():
+        tokens = deadline.begin_request()
+        try:
+            return await coro_fn(), deadline.degraded_steps()
+        finally:
+            deadline.end_request(tokens)
+    return asyncio.run(request())
+
+
+def test_cacheable_refuses_degraded_requests():
+    async def check():
+        assert _cacheable({"results": []})
+        deadline.mark_degraded("db")
+        return _cacheable({"results": []})
+    cacheable, degraded = run_request(check)
+    assert not cacheable
+    assert degraded == ["db"]
+
+
+def test_cacheable_refuses_timed_out_prefilter_and_non_dicts():
+    async def check():
+        return _cacheable({"results": [], "prefilter": {"timed_out": True}}), _cacheable([])
+    (timed_out, not_a_dict), _ = run_request(check)
+    assert not timed_out and not not_a_dict
+
+
+def test_timed_out_query_is_not_cached(monkeypatch):
+    monkeypatch.setattr(database, "get_db_connection", lambda: TimingOutConnection())
+    monkeypatch.setattr(result_cache_module, "aget_generation", generation_zero)
+    result_cache.clear()
+    calls = []
+
+    @cached_strategy("test_timeout")
+    async def strategy(query: str):
+        calls.append(query)
+        return {"results": execute_query("SELECT 1")}
+
+    payload, degraded = run_request(lambda: strategy("python"))
+    assert payload == {"results": []}
+    assert degraded == ["db"]
+    run_request(lambda: strategy("python"))
+    assert calls == ["python", "python"]
+
+
+def test_expired_deadline_marks_degraded():
+    async def check():
+        deadline.set_deadline(0.001)
+        await asyncio.sleep(0.01)
+        return execute_query("SELECT 1")
+    results, degraded = run_request(check)
+    assert results == []
+    assert degraded == ["db"]
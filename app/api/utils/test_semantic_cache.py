@@ -0,0 +1,83 @@
+import numpy as np
+
+from app.api.utils import semantic_cache as module
+from app.api.utils.semantic_cache import EMBEDDING_DIM, SemanticCache
+
+
+def unit(*components):
+    vec = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    vec[:len(components)] = components
+    return vec
+
+
+def entry(name):
+    return {"query_text": name, "strategy": "semantic", "results": [{"id": name}], "insight": ""}
+
+
+def test_lookup_returns_entries_above_the_threshold_only():
+    cache = SemanticCache(capacity=4)
+    cache.add(unit(1.0), entry("python"), "ns")
+    hit = cache.lookup(unit(1.0, 0.1), 0.95, "ns")
+    assert hit["query_text"] == "python" and hit["similarity"] > 0.95
+    assert cache.lookup(unit(1.0, 1.0), 0.95, "ns") is None
+
+
+def test_lookup_is_scoped_to_the_namespace():
+    cache = SemanticCache(capacity=4)
+    cache.add(unit(1.0), entry("python"), "semantic:10:g1")
+    assert cache.lookup(unit(1.0), 0.95, "semantic:10:g2") is None
+
+
+def test_near_duplicates_replace_their_slot():
+    cache = SemanticCache(capacity=4)
+    first = entry("python developer")
+    cache.add(unit(1.0), first, "ns")
+    replaced = cache.add(unit(1.0, 0.01), entry("python developers"), "ns")
+    assert replaced is first
+    assert len(cache) == 1
+    assert cache.lookup(unit(1.0), 0.95, "ns")["query_text"] == "python developers"
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "time", lambda: now[0])
+    cache = SemanticCache(capacity=4, ttl=60)
+    cache.add(unit(1.0), entry("python"), "ns")
+    now[0] += 59
+    assert cache.lookup(unit(1.0), 0.95, "ns") is not None
+    now[0] += 2
+    assert cache.lookup(unit(1.0), 0.95, "ns") is None
+    assert len(cache) == 0
+
+
+def test_lru_evicts_the_least_recently_used_entry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "time", lambda: now[0])
+    cache = SemanticCache(capacity=2, policy="lru")
+    cache.add(unit(1.0), entry("a"), "ns")
+    now[0] += 1
+    cache.add(unit(0.0, 1.0), entry("b"), "ns")
+    now[0] += 1
+    cache.lookup(unit(1.0), 0.95, "ns")
+    now[0] += 1
+    cache.add(unit(0.0, 0.0, 1.0), entry("c"), "ns")
+    assert cache.lookup(unit(1.0), 0.95, "ns")["query_text"] == "a"
+    assert cache.lookup(unit(0.0, 1.0), 0.95, "ns") is None
+    assert len(cache) == 2
+
+
+def test_lfu_evicts_the_least_hit_entry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "time", lambda: now[0])
+    cache = SemanticCache(capacity=2, policy="lfu")
+    cache.add(unit(1.0), entry("a"), "ns")
+    cache.add(unit(0.0, 1.0), entry("b"), "ns")
+    for _ in range(3):
+        now[0] += 1
+        cache.lookup(unit(1.0), 0.95, "ns")
+    now[0] += 1
+    cache.lookup(unit(0.0, 1.0), 0.95, "ns")
+    now[0] += 1
+    cache.add(unit(0.0, 0.0, 1.0), entry("c"), "ns")
+    assert cache.lookup(unit(1.0), 0.95, "ns")["query_text"] == "a"
+    assert cache.lookup(unit(0.0, 1.0), 0.95, "ns") is None
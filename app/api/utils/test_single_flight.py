@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.api.utils import deadline, single_flight as single_flight_module
+from app.api.utils.single_flight import single_flight
+
+
+async def generation_zero():
+    return 0
+
+
+@pytest.fixture(autouse=True)
+def fixed_generation(monkeypatch):
+    monkeypatch.setattr(single_flight_module, "aget_generation", generation_zero)
+
+
+async def in_request(coro_fn, budget_ms=None):
+    """Run coro_fn() in its own request context, returning (result, degraded steps)"""
+    tokens = deadline.begin_request(str(budget_ms) if budget_ms else None)
+    try:
+        return await coro_fn(), deadline.degraded_steps()
+    finally:
+        deadline.end_request(tokens)
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    calls = []
+
+    @single_flight("test_coalesce")
+    async def strategy(query: str):
+        calls.append(query)
+        await asyncio.sleep(0.05)
+        return {"results": [{"id": 1}]}
+
+    async def main():
+        return await asyncio.gather(
+            asyncio.create_task(in_request(lambda: strategy("python"))),
+            asyncio.create_task(in_request(lambda: strategy("python"))),
+            asyncio.create_task(in_request(lambda: strategy("java"))),
+        )
+
+    (first, _), (second, _), (other, _) = asyncio.run(main())
+    assert sorted(calls) == ["java", "python"]
+    assert first == second == {"results": [{"id": 1}]}
+    # Each caller gets its own copy to mutate
+    assert first is not second and first["results"] is not second["results"]
+
+
+def test_waiters_inherit_leader_degraded_steps():
+    @single_flight("test_degraded")
+    async def strategy(query: str):
+        await asyncio.sleep(0.05)
+        deadline.mark_degraded("embedding")
+        return {"results": []}
+
+    async def main():
+        leader = asyncio.create_task(in_request(lambda: strategy("python")))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(in_request(lambda: strategy("python")))
+        return await asyncio.gather(leader, waiter)
+
+    (_, leader_degraded), (_, waiter_degraded) = asyncio.run(main())
+    assert leader_degraded == ["embedding"]
+    assert waiter_degraded == ["embedding"]
+
+
+def test_waiter_gives_up_at_its_own_deadline():
+    @single_flight("test_timeout")
+    async def strategy(query: str):
+        await asyncio.sleep(0.3)
+        return {"results": [{"id": 1}]}
+
+    async def main():
+        leader = asyncio.create_task(in_request(lambda: strategy("python")))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(in_request(lambda: strategy("python"), budget_ms=50))
+        return await asyncio.gather(leader, waiter)
+
+    (leader_payload, _), (waiter_payload, waiter_degraded) = asyncio.run(main())
+    assert leader_payload == {"results": [{"id": 1}]}
+    assert waiter_payload == {"results": []}
+    assert waiter_degraded == ["single_flight_test_timeout"]
+
+
+def test_leader_errors_reach_waiters():
+    @single_flight("test_error")
+    async def strategy(query: str):
+        await asyncio.sleep(0.05)
+        raise ValueError("boom")
+
+    async def main():
+        leader = asyncio.create_task(in_request(lambda: strategy("python")))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(in_request(lambda: strategy("python")))
+        return await asyncio.gather(leader, waiter, return_exceptions=True)
+
+    leader_error, waiter_error = asyncio.run(main())
+    assert isinstance(leader_error, ValueError)
+    assert isinstance(waiter_error, ValueError)
@@ -0,0 +1,33 @@
+from app.api.utils.metrics import metrics
+from app.api.utils.write_behind import WriteBehindQueue
+
+
+def counter(name):
+    return metrics.snapshot()["counters"].get(name, 0)
+
+
+def test_full_queue_drops_and_counts_writes():
+    flushed = []
+    queue = WriteBehindQueue("test_drop", flushed.extend, max_pending=1, batch_size=10, flush_interval=60)
+    dropped = counter("write_behind.test_drop.dropped")
+    assert queue.put("a", 1)
+    assert not queue.put("b", 2)
+    # A pending key is still updated in place
+    assert queue.put("a", 3)
+    queue.stop()
+    assert flushed == [3]
+    assert counter("write_behind.test_drop.dropped") == dropped + 1
+
+
+def test_full_queue_hands_writes_to_overflow():
+    flushed, overflowed = [], []
+    queue = WriteBehindQueue(
+        "test_overflow", flushed.extend, max_pending=1, batch_size=10, flush_interval=60,
+        overflow=overflowed.extend
+    )
+    assert queue.put("a", 1)
+    assert queue.put("b", 2)
+    queue.stop()
+    assert flushed == [1]
+    assert overflowed == [2]
+    assert counter("write_behind.test_overflow.overflowed") == 1
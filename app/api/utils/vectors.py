@@ -0,0 +1,54 @@
+"""
+pgvector Transport
+Embeddings travel as float32 numpy arrays instead of str(list_of_768_floats):
+- asyncpg: pgvector's binary codec (4 bytes per dimension on the wire)
+- psycopg2: psycopg2 only speaks the text protocol, so embeddings wrapped with
+  pg_vector() render the shortest float32 round-trip form ('.9g') instead of
+  Python's 17-digit floats
+"""
+
+import json
+from typing import Optional, Sequence
+
+import numpy as np
+from psycopg2.extensions import register_adapter, AsIs
+from pgvector.asyncpg import register_vector as register_asyncpg_vector
+
+
+def to_vector(embedding: Optional[Sequence[float]]) -> Optional[np.ndarray]:
+    """Normalize an embedding (list/array) to a contiguous float32 array"""
+    if embedding is None or len(embedding) == 0:
+        return None
+    return np.ascontiguousarray(embedding, dtype=np.float32)
+
+
+class PgVector:
+    """A float32 embedding bound as a psycopg2 query parameter (see pg_vector)"""
+
+    __slots__ = ('array',)
+
+    def __init__(self, array: np.ndarray):
+        self.array = array
+
+
+def pg_vector(embedding: Optional[Sequence[float]]) -> Optional[PgVector]:
+    """Wrap an embedding for psycopg2; other ndarray parameters keep psycopg2's default handling"""
+    array = to_vector(embedding)
+    return PgVector(array) if array is not None else None
+
+
+def _adapt_pg_vector(vector: PgVector):
+    """psycopg2 adapter: '[v1,v2,...]'::vector literal with float32 precision"""
+    literal = "[" + ",".join(format(v, '.9g') for v in vector.array.tolist()) + "]"
+    return AsIs(f"'{literal}'::vector")
+
+
+register_adapter(PgVector, _adapt_pg_vector)
+
+
+async def init_asyncpg_connection(conn):
+    """asyncpg pool init: binary vector codec and jsonb decoded to dicts"""
+    await register_asyncpg_vector(conn)
+    await conn.set_type_codec(
+        'jsonb', encoder=json.dumps, decoder=json.loads, schema='pg_catalog'
+    )
@@ -0,0 +1,129 @@
+"""
+Write-behind Queue
+Defers slow writes (embedding + DB persistence) off the request path. Writes are
+keyed, so a newer write for the same key replaces a pending one; a background
+worker flushes pending writes in batches. When the queue is full new writes go to
+the queue's `overflow` handler if it has one (writes too costly to lose); otherwise
+they are dropped, counted and logged rather than slowing down requests.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional
+
+from app.api.utils.metrics import metrics
+
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "1000"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "50"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.5"))
+
+
+class WriteBehindQueue:
+    """Keyed, bounded queue drained in batches by a daemon thread calling `flush(values)`"""
+
+    def __init__(
+        self,
+        name: str,
+        flush: Callable[[List[Any]], None],
+        max_pending: int = WRITE_BEHIND_MAX_PENDING,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+        overflow: Optional[Callable[[List[Any]], None]] = None
+    ):
+        self.name = name
+        self.flush = flush
+        self.overflow = overflow
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: "OrderedDict[Any, Any]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._stopping = False
+        self._full = False
+
+    def start(self):
+        with self._cond:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stopping = False
+            self._worker = threading.Thread(target=self._run, name=f"write-behind-{self.name}", daemon=True)
+            self._worker.start()
+
+    def put(self, key: Any, value: Any) -> bool:
+        """Queue a write; returns False if it was dropped because the queue is full (and has no overflow)"""
+        self.start()
+        with self._cond:
+            if key in self._pending:
+                # Same key still pending: the newer value wins, nothing is written twice
+                self._pending[key] = value
+                metrics.incr(f"write_behind.{self.name}.deduped")
+                return True
+            if len(self._pending) < self.max_pending:
+                self._full = False
+                self._pending[key] = value
+                metrics.set_gauge(f"write_behind.{self.name}.pending", len(self._pending))
+                if len(self._pending) >= self.batch_size:
+                    self._cond.notify()
+                return True
+            newly_full = not self._full
+            self._full = True
+        if self.overflow is not None:
+            # Written synchronously by the handler instead of being lost
+            metrics.incr(f"write_behind.{self.name}.overflowed")
+            self.overflow([value])
+            return True
+        metrics.incr(f"write_behind.{self.name}.dropped")
+        if newly_full:
+            print(f"Write-behind queue {self.name} is full ({self.max_pending} pending), dropping writes")
+        return False
+
+    def _take_batch(self) -> List[Any]:
+        batch = []
+        while self._pending and len(batch) < self.batch_size:
+            batch.append(self._pending.popitem(last=False)[1])
+        metrics.set_gauge(f"write_behind.{self.name}.pending", len(self._pending))
+        return batch
+
+    def _flush_batch(self, batch: List[Any]):
+        start = time.time()
+        try:
+            self.flush(batch)
+            metrics.incr(f"write_behind.{self.name}.written", len(batch))
+        except Exception as e:
+            print(f"Write-behind flush failed ({self.name}): {e}")
+            metrics.incr(f"write_behind.{self.name}.failed", len(batch))
+        metrics.observe(f"write_behind.{self.name}.flush_ms", (time.time() - start) * 1000)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # Let a batch accumulate for up to flush_interval unless it fills first
+                if len(self._pending) < self.batch_size and not self._stopping:
+                    self._cond.wait(self.flush_interval)
+                if self._stopping and not self._pending:
+                    return
+                batch = self._take_batch()
+            if batch:
+                self._flush_batch(batch)
+
+    def drain(self):
+        """Flush everything pending on the calling thread (shutdown, scripts)"""
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+            if not batch:
+                return
+            self._flush_batch(batch)
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the worker after it has flushed what is pending"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+        self._worker = None
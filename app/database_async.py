@@ -10,6 +10,7 @@ load_dotenv(dotenv_path=env_path)
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 import ssl
+from app.api.utils.vectors import init_asyncpg_connection
 
 class DatabasePool:
     _instance = None
@@ -23,7 +24,10 @@ class DatabasePool:
                 ctx.check_hostname = False
                 ctx.verify_mode = ssl.CERT_NONE
                 
-                cls._instance = await asyncpg.create_pool(DATABASE_URL, ssl=ctx)
+                # init registers the binary pgvector codec on every pooled connection
+                cls._instance = await asyncpg.create_pool(
+                    DATABASE_URL, ssl=ctx, init=init_asyncpg_connection
+                )
             except Exception as e:
                 print(f"Error creating asyncpg pool: {e}")
                 raise e
@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from app.api.routes import search
+from app.api.utils.responses import FastJSONResponse
 import os
 from dotenv import load_dotenv
 
@@ -8,7 +10,7 @@ from pathlib import Path
 env_path = Path(__file__).parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
-app = FastAPI(title="Retrieval Strategy Testing API")
+app = FastAPI(title="Retrieval Strategy Testing API", default_response_class=FastJSONResponse)
 
 # Configure CORS
 # Configure CORS
@@ -19,6 +21,10 @@ origins = [
     "*"
 ]
 
+# Compress large result payloads for clients that send Accept-Encoding: gzip
+if os.getenv("ENABLE_GZIP", "true").lower() in ("1", "true", "yes"):
+    app.add_middleware(GZipMiddleware, minimum_size=int(os.getenv("GZIP_MIN_SIZE", "1024")))
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -63,6 +69,27 @@ app.include_router(debug.router, prefix="/api/debug", tags=["debug"])
 from app.api.routes import adaptive_fusion_route
 app.include_router(adaptive_fusion_route.router, prefix="/api/search")
 
+from fastapi.concurrency import run_in_threadpool
+from app.api.utils.caching import cache_writes
+from app.api.utils.embedding_cache import embedding_cache_writes
+from app.api.utils.llm_cache import llm_cache_writes
+from app.api.utils.semantic_cache import warm_from_db
+
+@app.on_event("startup")
+async def start_background_writers():
+    cache_writes.start()
+    llm_cache_writes.start()
+    embedding_cache_writes.start()
+    # Blocking psycopg2 read + JSON parsing of every cached vector; keep it off the loop
+    await run_in_threadpool(warm_from_db)
+
+@app.on_event("shutdown")
+async def flush_background_writers():
+    # Don't lose cache entries still waiting to be persisted
+    cache_writes.stop()
+    llm_cache_writes.stop()
+    embedding_cache_writes.stop()
+
 @app.get("/")
 def read_root():
     return {"message": "Retrieval Strategy Testing API is running"}
@@ -12,6 +12,7 @@ from collections import Counter, defaultdict
 from datetime import datetime
 import asyncpg
 import numpy as np
+from app.api.utils import deadline
 
 
 class AdaptiveFusionStrategy:
@@ -403,7 +404,8 @@ class AdaptiveFusionStrategy:
         
         # Build query
         where_clause = ""
-        params = [str(query_embedding)] # Cast to string for pgvector format
+        # float32 array, sent through the pool's binary pgvector codec
+        params = [np.asarray(query_embedding, dtype=np.float32)]
         
         if chunk_types:
             placeholders = ','.join([f"${i+2}" for i in range(len(chunk_types))])
@@ -427,7 +429,7 @@ class AdaptiveFusionStrategy:
             LIMIT {top_k}
         """
         
-        results = await self.db.fetch(vector_query, *params)
+        results = await self.db.fetch(vector_query, *params, timeout=deadline.call_timeout())
         
         # Aggregate by student
         student_scores = self._aggregate_vector_by_student(results)
@@ -578,7 +580,7 @@ class AdaptiveFusionStrategy:
             WHERE id IN ({placeholders})
         """
         
-        skill_data = await self.db.fetch(query, *student_ids)
+        skill_data = await self.db.fetch(query, *student_ids, timeout=deadline.call_timeout())
         
         import json
         skill_map = {}
@@ -634,7 +636,7 @@ class AdaptiveFusionStrategy:
             WHERE id IN ({placeholders})
         """
         
-        recency_data = await self.db.fetch(query, *student_ids)
+        recency_data = await self.db.fetch(query, *student_ids, timeout=deadline.call_timeout())
         recency_map = {}
         for r in recency_data:
             ts_str = r['ingested_at']
@@ -722,7 +724,7 @@ class AdaptiveFusionStrategy:
             {where_clause}
         """
         
-        filtered_ids = await self.db.fetch(query, *params)
+        filtered_ids = await self.db.fetch(query, *params, timeout=deadline.call_timeout())
         filtered_id_set = {str(row['id']) for row in filtered_ids}
         
         # Filter results
@@ -752,7 +754,7 @@ class AdaptiveFusionStrategy:
             WHERE id IN ({placeholders})
         """
         
-        profiles = await self.db.fetch(query, *student_ids)
+        profiles = await self.db.fetch(query, *student_ids, timeout=deadline.call_timeout())
         profile_map = {}
         for p in profiles:
              import json
@@ -901,9 +903,9 @@ class AdaptiveFusionStrategy:
         
         # Note: If user_profile_chunks is empty, we should fallback or handle it
         if params:
-            result = await self.db.fetchrow(query, *params)
+            result = await self.db.fetchrow(query, *params, timeout=deadline.call_timeout())
         else:
-            result = await self.db.fetchrow(query)
+            result = await self.db.fetchrow(query, timeout=deadline.call_timeout())
         
         return {
             'total_docs': result['total_docs'] if result and result['total_docs'] else 1,
@@ -927,7 +929,7 @@ class AdaptiveFusionStrategy:
             {where_clause}
         """
         
-        result = await self.db.fetchrow(query, *params)
+        result = await self.db.fetchrow(query, *params, timeout=deadline.call_timeout())
         return result['doc_freq']
     
     async def _fetch_candidate_chunks(
@@ -959,7 +961,7 @@ class AdaptiveFusionStrategy:
             {where_clause}
         """
         
-        chunks = await self.db.fetch(query, *params)
+        chunks = await self.db.fetch(query, *params, timeout=deadline.call_timeout())
         return [dict(chunk) for chunk in chunks]
     
     def _detect_intent(self, query_terms: List[str]) -> str:
@@ -0,0 +1,50 @@
+import psycopg2
+from psycopg2.extras import RealDictCursor
+import os
+import sys
+from dotenv import load_dotenv
+from pathlib import Path
+
+env_path = Path(__file__).parent / "app" / ".env"
+load_dotenv(dotenv_path=env_path)
+
+sys.path.append(str(Path(__file__).parent))
+from app.api.utils.profile_index import index_profile
+from app.api.utils.generation import bump_generation
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+BATCH_SIZE = 200
+
+def backfill():
+    """Populate indexed columns, entities and profile cards for every row in student_profiles"""
+    conn = psycopg2.connect(DATABASE_URL)
+    read_cur = conn.cursor(name="profile_backfill", cursor_factory=RealDictCursor)
+    write_conn = psycopg2.connect(DATABASE_URL)
+    write_cur = write_conn.cursor()
+
+    read_cur.itersize = BATCH_SIZE
+    read_cur.execute("SELECT id, text, metadata FROM student_profiles")
+
+    processed = 0
+    try:
+        for row in read_cur:
+            index_profile(write_cur, row['id'], row['text'], row['metadata'], bump=False)
+            processed += 1
+            if processed % BATCH_SIZE == 0:
+                write_conn.commit()
+                print(f"Indexed {processed} profiles...")
+        # One generation bump for the whole run invalidates cached search results
+        bump_generation(write_cur)
+        write_conn.commit()
+        print(f"Backfill complete. Indexed {processed} profiles.")
+    except Exception as e:
+        print(f"Error after {processed} profiles: {e}")
+        write_conn.rollback()
+    finally:
+        read_cur.close()
+        conn.close()
+        write_cur.close()
+        write_conn.close()
+
+if __name__ == "__main__":
+    backfill()
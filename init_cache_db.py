@@ -32,6 +32,29 @@ def init_db():
         ON search_query_cache USING hnsw (embedding vector_cosine_ops);
     """)
     
+    # Structured LLM outputs (query analysis, tool selection); see app/api/utils/llm_cache.py
+    print("Creating llm_query_cache table...")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS llm_query_cache (
+            task TEXT NOT NULL,
+            query_norm TEXT NOT NULL,
+            prompt_version TEXT NOT NULL,
+            model TEXT NOT NULL,
+            query_text TEXT NOT NULL,
+            result JSONB NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            last_hit_at TIMESTAMP WITH TIME ZONE,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            PRIMARY KEY (task, query_norm, prompt_version, model)
+        );
+    """)
+    # Warming replays the most used queries
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_llm_cache_last_hit
+        ON llm_query_cache (task, last_hit_at DESC);
+    """)
+    
     conn.commit()
     cur.close()
     conn.close()
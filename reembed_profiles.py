@@ -0,0 +1,69 @@
+import psycopg2
+from psycopg2.extras import RealDictCursor
+import os
+import sys
+from dotenv import load_dotenv
+from pathlib import Path
+
+env_path = Path(__file__).parent / "app" / ".env"
+load_dotenv(dotenv_path=env_path)
+
+sys.path.append(str(Path(__file__).parent))
+from app.api.utils.embedding_providers import get_provider
+from app.api.utils.generation import bump_generation
+from app.api.utils.gemini_scheduler import INGESTION, gemini_priority
+from app.api.utils.vectors import pg_vector
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+BATCH_SIZE = 50
+
+def reembed():
+    """
+    Recompute student_profiles.embedding with the configured EMBEDDING_PROVIDER.
+    Needed when switching providers (e.g. EMBEDDING_PROVIDER=local for offline benchmarks):
+    query and document vectors must come from the same provider.
+    """
+    provider = get_provider()
+    print(f"Re-embedding profiles with '{provider.name}' ({provider.model})...")
+    conn = psycopg2.connect(DATABASE_URL)
+    read_cur = conn.cursor(name="profile_reembed", cursor_factory=RealDictCursor)
+    write_conn = psycopg2.connect(DATABASE_URL)
+    write_cur = write_conn.cursor()
+
+    read_cur.itersize = BATCH_SIZE
+    read_cur.execute("SELECT id, text FROM student_profiles")
+
+    processed = 0
+    batch = []
+    try:
+        for row in read_cur:
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                processed += _write_batch(provider, write_cur, batch)
+                write_conn.commit()
+                batch = []
+                print(f"Re-embedded {processed} profiles...")
+        if batch:
+            processed += _write_batch(provider, write_cur, batch)
+        bump_generation(write_cur)
+        write_conn.commit()
+        print(f"Done. Re-embedded {processed} profiles.")
+    except Exception as e:
+        print(f"Error after {processed} profiles: {e}")
+        write_conn.rollback()
+    finally:
+        read_cur.close()
+        conn.close()
+        write_cur.close()
+        write_conn.close()
+
+def _write_batch(provider, cur, rows):
+    # Documents use the retrieval_document task type (ignored by the local provider)
+    embeddings = provider.embed_batch([row['text'] or "" for row in rows], "retrieval_document")
+    for row, embedding in zip(rows, embeddings):
+        cur.execute("UPDATE student_profiles SET embedding = %s WHERE id = %s", (pg_vector(embedding), row['id']))
+    return len(rows)
+
+if __name__ == "__main__":
+    with gemini_priority(INGESTION):
+        reembed()
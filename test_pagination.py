@@ -0,0 +1,39 @@
+import requests
+import time
+
+BASE_URL = "http://localhost:8000/api/search"
+
+def test_pagination(endpoint="vector", query="python developer", page_size=5, pages=4):
+    url = f"{BASE_URL}/{endpoint}"
+    payload = {"query": query, "page_size": page_size}
+    seen = set()
+
+    print(f"\n--- Paging through {endpoint} ({page_size} per page) ---")
+    for page_no in range(1, pages + 1):
+        start = time.time()
+        try:
+            res = requests.post(url, json=payload)
+        except Exception as e:
+            print(f"Exception: {e}")
+            return
+        dur = time.time() - start
+
+        if res.status_code != 200:
+            print(f"Error: {res.status_code} - {res.text[:200]}")
+            return
+
+        data = res.json()
+        ids = [r["id"] for r in data.get("results", [])]
+        dupes = seen.intersection(ids)
+        seen.update(ids)
+        print(f"Page {page_no}: {len(ids)} results in {dur:.2f}s | page={data.get('page')} | duplicates={len(dupes)}")
+
+        cursor = data.get("next_cursor")
+        if not cursor:
+            print("No more pages.")
+            return
+        payload = {"query": query, "cursor": cursor}
+
+if __name__ == "__main__":
+    test_pagination("vector")
+    test_pagination("hybrid")
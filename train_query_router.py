@@ -0,0 +1,79 @@
+import psycopg2
+from psycopg2.extras import RealDictCursor
+import os
+import sys
+import json
+import random
+from dotenv import load_dotenv
+from pathlib import Path
+
+env_path = Path(__file__).parent / "app" / ".env"
+load_dotenv(dotenv_path=env_path)
+
+sys.path.append(str(Path(__file__).parent))
+from app.api.utils.query_router import NaiveBayesRouter, QUERY_ROUTER_MODEL_PATH, apply_rules
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+HOLDOUT_FRACTION = 0.2
+TOOLS = ("vector", "keyword", "pattern", "filter")
+
+def load_decisions(cur):
+    """Latest LLM tool decision per normalized query, from logged query plans"""
+    cur.execute("""
+        SELECT DISTINCT ON (query_norm) query_text AS query, result->>'tool' AS tool
+        FROM llm_query_cache
+        WHERE task = 'query_plan'
+        ORDER BY query_norm, created_at DESC
+    """)
+    return [row for row in cur.fetchall() if row['tool'] in TOOLS]
+
+def agreement(model, examples):
+    """Share of examples where the local router (rules, then classifier) picks the LLM's tool"""
+    if not examples:
+        return 0.0
+    classifier = NaiveBayesRouter(model)
+    agreed = 0
+    for example in examples:
+        rule = apply_rules(example['query'])
+        if rule is not None:
+            tool = rule['tool']
+        else:
+            posterior = classifier.predict(example['query'])
+            tool = max(posterior, key=posterior.get)
+        agreed += tool == example['tool']
+    return agreed / len(examples)
+
+def train():
+    """
+    Train the local query router's classifier on logged LLM tool decisions and write it
+    to QUERY_ROUTER_MODEL_PATH (picked up by the API on its next start).
+    """
+    conn = psycopg2.connect(DATABASE_URL)
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        examples = load_decisions(cur)
+    finally:
+        cur.close()
+        conn.close()
+    if not examples:
+        print("No logged tool decisions yet; nothing to train on.")
+        return
+
+    counts = {tool: sum(1 for e in examples if e['tool'] == tool) for tool in TOOLS}
+    print(f"Loaded {len(examples)} decisions: {counts}")
+
+    random.Random(0).shuffle(examples)
+    split = int(len(examples) * (1 - HOLDOUT_FRACTION))
+    train_set, holdout = examples[:split], examples[split:]
+    if train_set and holdout:
+        rate = agreement(NaiveBayesRouter.train(train_set), holdout)
+        print(f"Holdout agreement with the LLM: {rate:.1%} ({len(holdout)} queries)")
+
+    model = NaiveBayesRouter.train(examples)
+    Path(QUERY_ROUTER_MODEL_PATH).parent.mkdir(parents=True, exist_ok=True)
+    with open(QUERY_ROUTER_MODEL_PATH, "w") as f:
+        json.dump(model, f)
+    print(f"Wrote query router model to {QUERY_ROUTER_MODEL_PATH}")
+
+if __name__ == "__main__":
+    train()
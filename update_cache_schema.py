@@ -15,8 +15,11 @@ def update_schema():
     print("Adding 'insight' column to search_query_cache...")
     try:
         cur.execute("ALTER TABLE search_query_cache ADD COLUMN IF NOT EXISTS insight TEXT;")
+        # Strategy + limit + corpus generation; entries only match within their namespace
+        print("Adding 'namespace' column to search_query_cache...")
+        cur.execute("ALTER TABLE search_query_cache ADD COLUMN IF NOT EXISTS namespace TEXT;")
         conn.commit()
-        print("Column added successfully.")
+        print("Columns added successfully.")
     except Exception as e:
         print(f"Error: {e}")
         conn.rollback()
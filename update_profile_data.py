@@ -7,6 +7,10 @@ from pathlib import Path
 env_path = Path(__file__).parent / "app" / ".env"
 load_dotenv(dotenv_path=env_path)
 
+import sys
+sys.path.append(str(Path(__file__).parent))
+from app.api.utils.profile_index import index_profile
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 SAMPLE_DATA = {
@@ -75,7 +79,11 @@ def update_profile():
     cur = conn.cursor()
     
     print(f"Updating metadata for User ID: {user_id}")
-    cur.execute("UPDATE student_profiles SET metadata = %s WHERE id = %s", (json.dumps(SAMPLE_DATA), user_id))
+    cur.execute("UPDATE student_profiles SET metadata = %s WHERE id = %s RETURNING text", (json.dumps(SAMPLE_DATA), user_id))
+    row = cur.fetchone()
+    if row:
+        # Keep the indexed profile columns in sync with the new metadata
+        index_profile(cur, user_id, row[0], SAMPLE_DATA)
     conn.commit()
     print("Update successful.")
     conn.close()
@@ -0,0 +1,173 @@
+import psycopg2
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+env_path = Path(__file__).parent / "app" / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Same fields the original fuzzy query concatenated; metadata without name/role/skills_text
+# (raw imports) falls back to the values parsed into profile_card at ingest
+SEARCH_BLOB_EXPRESSION = """
+    COALESCE(NULLIF(metadata->>'role', ''), profile_card->>'role', '') || ' ' ||
+    COALESCE(NULLIF(metadata->>'skills_text', ''), profile_card->>'skills_text', '') || ' ' ||
+    COALESCE(NULLIF(metadata->>'name', ''), profile_card->>'name', '') || ' ' ||
+    COALESCE(text, '')
+"""
+
+def add_search_blob(cur):
+    """Stored Role + Skills + Name + Text blob for the fuzzy (trigram) strategy (needs profile_card)"""
+    print("Enabling pg_trgm extension...")
+    cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+
+    # Columns created before the profile_card fallback are rebuilt (their index goes with them)
+    cur.execute("""
+        SELECT generation_expression FROM information_schema.columns
+        WHERE table_name = 'student_profiles' AND column_name = 'search_blob'
+    """)
+    row = cur.fetchone()
+    if row and 'profile_card' not in (row[0] or ''):
+        print("Rebuilding 'search_blob' with profile_card fallbacks...")
+        cur.execute("ALTER TABLE student_profiles DROP COLUMN search_blob;")
+
+    print("Adding 'search_blob' generated column to student_profiles...")
+    cur.execute(f"""
+        ALTER TABLE student_profiles
+        ADD COLUMN IF NOT EXISTS search_blob TEXT
+        GENERATED ALWAYS AS ({SEARCH_BLOB_EXPRESSION}) STORED;
+    """)
+
+    # GIN answers the % filter; ORDER BY <-> then only ranks the matched rows
+    print("Creating trigram index on search_blob...")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_student_profiles_search_blob_trgm
+        ON student_profiles USING gin (search_blob gin_trgm_ops);
+    """)
+
+def add_structured_filters(cur):
+    """Role and normalized skills columns for the /filter strategy"""
+    print("Adding 'role_norm', 'skills' and 'skill_scores' columns to student_profiles...")
+    cur.execute("""
+        ALTER TABLE student_profiles
+        ADD COLUMN IF NOT EXISTS role_norm TEXT,
+        ADD COLUMN IF NOT EXISTS skills TEXT[] NOT NULL DEFAULT '{}',
+        ADD COLUMN IF NOT EXISTS skill_scores JSONB NOT NULL DEFAULT '{}'::jsonb;
+    """)
+
+    # /filter matches roles as substrings (LIKE '%x%'), which only a trigram index can serve
+    print("Creating trigram index on role_norm...")
+    cur.execute("DROP INDEX IF EXISTS idx_student_profiles_role_norm;")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_student_profiles_role_norm_trgm
+        ON student_profiles USING gin (role_norm gin_trgm_ops);
+    """)
+
+    print("Creating GIN index on skills...")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_student_profiles_skills
+        ON student_profiles USING gin (skills);
+    """)
+
+def add_profile_entities(cur):
+    """Precomputed entities (emails, phones, links) for predefined /pattern searches"""
+    print("Creating profile_entities table...")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS profile_entities (
+            profile_id UUID NOT NULL REFERENCES student_profiles(id) ON DELETE CASCADE,
+            entity_type VARCHAR(32) NOT NULL,
+            value TEXT NOT NULL,
+            value_norm TEXT NOT NULL,
+            PRIMARY KEY (profile_id, entity_type, value_norm)
+        );
+    """)
+
+    # (entity_type, profile_id) serves "profiles that have an email" as an index-only scan,
+    # (entity_type, value_norm) serves "who has this exact email/phone"
+    print("Creating profile_entities indexes...")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_profile_entities_type_profile
+        ON profile_entities (entity_type, profile_id);
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_profile_entities_type_value
+        ON profile_entities (entity_type, value_norm);
+    """)
+
+def add_text_trigram_index(cur):
+    """Trigram index on text so custom-regex searches can prefilter with LIKE '%literal%'"""
+    print("Creating trigram index on text...")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_student_profiles_text_trgm
+        ON student_profiles USING gin (text gin_trgm_ops);
+    """)
+
+def add_profile_card(cur):
+    """
+    Display fields parsed once at ingest, read directly by every strategy.
+    NULL means "not indexed yet"; an indexed profile with nothing to show stores '{}'.
+    """
+    print("Adding 'profile_card' column to student_profiles...")
+    cur.execute("""
+        ALTER TABLE student_profiles
+        ADD COLUMN IF NOT EXISTS profile_card JSONB;
+    """)
+    # Columns created as NOT NULL DEFAULT '{}' can't tell un-indexed rows apart:
+    # reset them to NULL so backfill_profile_index.py re-indexes them
+    cur.execute("""
+        SELECT is_nullable FROM information_schema.columns
+        WHERE table_name = 'student_profiles' AND column_name = 'profile_card'
+    """)
+    if cur.fetchone()[0] == 'NO':
+        print("Making 'profile_card' nullable (NULL = not indexed)...")
+        cur.execute("""
+            ALTER TABLE student_profiles
+            ALTER COLUMN profile_card DROP NOT NULL,
+            ALTER COLUMN profile_card DROP DEFAULT;
+        """)
+        cur.execute("UPDATE student_profiles SET profile_card = NULL WHERE profile_card = '{}'::jsonb;")
+
+def add_fts_index(cur):
+    """Expression index matching the to_tsvector('english', text) used by /fts and /hybrid"""
+    print("Creating full-text index on text...")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_student_profiles_fts
+        ON student_profiles USING gin (to_tsvector('english', text));
+    """)
+
+def add_corpus_generation(cur):
+    """Single-row counter bumped on every ingest; result caches key on it"""
+    print("Creating corpus_generation table...")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS corpus_generation (
+            id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            generation BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    cur.execute("INSERT INTO corpus_generation (id) VALUES (TRUE) ON CONFLICT (id) DO NOTHING;")
+
+def update_schema():
+    conn = psycopg2.connect(DATABASE_URL)
+    cur = conn.cursor()
+
+    try:
+        add_profile_card(cur)
+        add_search_blob(cur)
+        add_structured_filters(cur)
+        add_profile_entities(cur)
+        add_text_trigram_index(cur)
+        add_fts_index(cur)
+        add_corpus_generation(cur)
+        conn.commit()
+        print("Schema updated successfully. Run backfill_profile_index.py to populate new columns.")
+    except Exception as e:
+        print(f"Error: {e}")
+        conn.rollback()
+
+    cur.close()
+    conn.close()
+
+if __name__ == "__main__":
+    update_schema()
@@ -0,0 +1,64 @@
+import psycopg2
+from psycopg2.extras import RealDictCursor
+import os
+import sys
+from dotenv import load_dotenv
+from pathlib import Path
+
+env_path = Path(__file__).parent / "app" / ".env"
+load_dotenv(dotenv_path=env_path)
+
+sys.path.append(str(Path(__file__).parent))
+from app.api.utils.gemini_scheduler import MAINTENANCE, gemini_priority
+from app.api.utils.llm import plan_query, QUERY_MODEL, QUERY_PLAN_PROMPT_VERSION
+from app.api.utils.llm_cache import llm_cache_writes
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+WARM_LIMIT = int(os.getenv("LLM_CACHE_WARM_LIMIT", "200"))
+WARM_WINDOW_DAYS = int(os.getenv("LLM_CACHE_WARM_WINDOW_DAYS", "30"))
+
+TASK = "query_plan"
+
+def queries_to_warm(cur, task, prompt_version):
+    """
+    Most used recent queries (logged under any task, including retired ones) with no live
+    `task` entry for the current prompt version and model
+    """
+    cur.execute("""
+        SELECT query_norm, (ARRAY_AGG(query_text ORDER BY created_at DESC))[1] AS query_text, SUM(hits) AS hits
+        FROM llm_query_cache
+        WHERE COALESCE(last_hit_at, created_at) > NOW() - make_interval(days => %s)
+        GROUP BY query_norm
+        HAVING NOT BOOL_OR(task = %s AND prompt_version = %s AND model = %s AND expires_at > NOW())
+        ORDER BY SUM(hits) DESC
+        LIMIT %s
+    """, (WARM_WINDOW_DAYS, task, prompt_version, QUERY_MODEL, WARM_LIMIT))
+    return cur.fetchall()
+
+def warm():
+    """
+    Replay the query log (llm_query_cache hits) through plan_query, so queries whose
+    entries expired or predate the current prompt version/model are cached before users ask.
+    Runs at maintenance priority, behind any interactive Gemini calls in this process.
+    """
+    conn = psycopg2.connect(DATABASE_URL)
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    warmed = 0
+    try:
+        with gemini_priority(MAINTENANCE):
+            rows = queries_to_warm(cur, TASK, QUERY_PLAN_PROMPT_VERSION)
+            print(f"Warming {len(rows)} query plans...")
+            for row in rows:
+                # A successful call stores its own cache entry
+                plan_query(row['query_text'])
+                warmed += 1
+        llm_cache_writes.drain()
+        print(f"Done. Warmed {warmed} queries.")
+    except Exception as e:
+        print(f"Error after {warmed} queries: {e}")
+    finally:
+        cur.close()
+        conn.close()
+
+if __name__ == "__main__":
+    warm()